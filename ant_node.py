@@ -0,0 +1,200 @@
+import threading
+import time
+from openant.base.message import Message
+from openant.easy.channel import Channel
+from logger_config import logger
+from config import ANT_NETWORK_KEY, FOOTPOD_DEVICE_ID, FOOTPOD_DEVICE_TYPE, FOOTPOD_TRANSMISSION_TYPE, FOOTPOD_RF_FREQUENCY, FOOTPOD_PERIOD
+from config import ANT_STOP_TIMEOUT_S, ANT_NODE_STALL_TIMEOUT_S, ANT_REOPEN_BACKOFF_S, ANT_REOPEN_MAX_BACKOFF_S
+
+
+def default_node_factory():
+    """Creates an openant Node; every call enumerates the USB bus again, so a re-plugged stick is found."""
+    from openant.easy.node import Node
+    return Node()
+
+
+class ManagedAntNode:
+    """
+    Owns the ANT+ node and the foot pod channel. Nothing touches USB until run() is called on the ant-node thread.
+    When the stick fails to open, raises, or stops producing TX events (openant only logs USB read errors, so an
+    unplugged stick just goes silent), the node is released and reopened with backoff under the same channel ID.
+    The TxScheduler outlives the node, so page rotation, distance and stride count carry on across the gap,
+    and the last page sent is loaded into the new channel before its first TX event.
+    """
+
+    def __init__(self, tx_scheduler, node_factory=default_node_factory, on_tx=None,
+                 channel_id=(FOOTPOD_DEVICE_ID, FOOTPOD_DEVICE_TYPE, FOOTPOD_TRANSMISSION_TYPE),
+                 network_key=ANT_NETWORK_KEY, rf_frequency=FOOTPOD_RF_FREQUENCY, period=FOOTPOD_PERIOD,
+                 stall_timeout=ANT_NODE_STALL_TIMEOUT_S, backoff=ANT_REOPEN_BACKOFF_S, max_backoff=ANT_REOPEN_MAX_BACKOFF_S,
+                 stop_timeout=ANT_STOP_TIMEOUT_S):
+        """
+        Initializes the managed node (without opening it).
+        :param tx_scheduler: TxScheduler supplying the payload of each TX event.
+        :param node_factory: Callable returning a new openant-compatible Node (tests inject a fault-injecting fake).
+        :param on_tx: Optional callable run on every TX event, e.g. the diagnostics interval tracker.
+        :param channel_id: (device ID, device type, transmission type), reused on every reopen.
+        :param stall_timeout: Seconds without a TX event after which the stick is considered lost.
+        :param backoff: First delay before retrying a failed open; doubles up to max_backoff.
+        :param stop_timeout: Deadline for each close step (channel, node).
+        """
+        self.tx_scheduler = tx_scheduler
+        self.node_factory = node_factory
+        self.on_tx = on_tx
+        self.on_data = None  # RX callback for broadcast and acknowledged messages, e.g. PageRequestResponder.on_data
+        self.channel_id = channel_id
+        self.network_key = network_key
+        self.rf_frequency = rf_frequency
+        self.period = period
+        self.stall_timeout = stall_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stop_timeout = stop_timeout
+
+        self.node = None
+        self.channel = None
+        self.up = False
+        self.fault = None  # Why the running node was stopped by the watchdog
+        self.last_tx = 0.0
+        self.last_payload = None  # Latest page sent; primes the channel after a reopen
+        self.down_since = None
+        self.stopping = threading.Event()
+        self.watchdog = None
+        self.stats = {"opens": 0, "open_failures": 0, "faults": 0, "reattaches": 0, "downtime_s": 0.0, "last_downtime_s": 0.0}
+
+    def run(self):
+        """Ant-node thread body: opens the node and runs it, reopening after every fault until stop() is called."""
+        self.watchdog = threading.Thread(target=self._watch, name="ant-watchdog", daemon=True)
+        self.watchdog.start()
+        delay = self.backoff
+        while not self.stopping.is_set():
+            try:
+                self._open()
+            except Exception as e:
+                self.stats["open_failures"] += 1
+                reason = str(e) or type(e).__name__
+                self._mark_down(f"open failed: {reason}")
+                logger.warning(f"⚠️ ANT+ stick not available ({reason}), retrying in {delay:.1f}s")
+                self._release()
+                if self.stopping.wait(delay):
+                    break
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            delay = self.backoff
+            if self.stopping.is_set():
+                break
+            try:
+                self.node.start()  # Returns once the node is stopped, by stop() or by the watchdog
+            except Exception as e:
+                self.fault = f"node failed: {e}"
+            if not self.stopping.is_set():
+                self._mark_down(self.fault or "node stopped")
+                self._release()
+        self._release()
+
+    def stop(self):
+        """Stops reopening, then closes the foot pod channel and the node; each step is abandoned after stop_timeout."""
+        self.stopping.set()
+        self.up = False
+        channel, node = self.channel, self.node
+        if channel is not None:
+            self._run_step("close channel", channel.close)
+        if node is not None:
+            self._run_step("stop node", node.stop)
+
+    def downtime(self):
+        """Total seconds without a working stick since the first open, including an ongoing outage."""
+        ongoing = time.monotonic() - self.down_since if self.down_since is not None and self.stats["opens"] else 0.0
+        return self.stats["downtime_s"] + ongoing
+
+    def send_acknowledged(self, payload):
+        """
+        Makes one acknowledged send on the current channel (blocking until the watch answers or the stick times out).
+        Unlike Channel.send_acknowledged_data, a failed transfer is not retried: TransferFailedException is raised
+        so the caller bounds the retries. Raises RuntimeError while the stick is down.
+        """
+        channel, node = self.channel, self.node
+        if channel is None or node is None or not self.up:
+            raise RuntimeError("ANT+ channel not open")
+        node.ant.send_acknowledged_data(channel.id, payload)
+        channel.wait_for_event([Message.Code.EVENT_TRANSFER_TX_COMPLETED])
+
+    def _open(self):
+        self.fault = None
+        self.node = self.node_factory()
+        channel = self.node.new_channel(Channel.Type.BIDIRECTIONAL_TRANSMIT)
+        self.node.set_network_key(0, self.network_key)
+        channel.set_rf_freq(self.rf_frequency)
+        channel.set_period(self.period)
+        channel.set_id(*self.channel_id)
+        channel.on_broadcast_tx_data = self._on_tx
+        channel.on_acknowledge_data = self._on_data
+        channel.on_broadcast_data = self._on_data
+        channel.open()
+        if self.last_payload is not None:
+            channel.send_broadcast_data(self.last_payload)  # First TX slot repeats the latest page instead of nothing
+        self.channel = channel
+        self.last_tx = time.monotonic()
+        self.up = True
+        self.stats["opens"] += 1
+
+        if self.down_since is None or self.stats["opens"] == 1:
+            logger.info("✅ ANT+ Foot Pod Broadcasting Started")
+        else:
+            downtime = time.monotonic() - self.down_since
+            self.stats["reattaches"] += 1
+            self.stats["downtime_s"] += downtime
+            self.stats["last_downtime_s"] = downtime
+            logger.info(f"🔌 ANT+ stick re-attached after {downtime:.1f}s, broadcasting resumed "
+                        f"(device ID {self.channel_id[0]}, message {self.tx_scheduler.message_count})")
+        self.down_since = None
+
+    def _mark_down(self, reason):
+        self.up = False
+        if self.down_since is None:
+            self.down_since = time.monotonic()
+            if self.stats["opens"]:
+                self.stats["faults"] += 1
+                logger.warning(f"🔌 ANT+ link lost ({reason}), reopening the stick...")
+
+    def _release(self):
+        """Drops the current node after a fault; the channel is not closed, as the stick is usually gone."""
+        node, self.node, self.channel = self.node, None, None
+        if node is not None:
+            self._run_step("stop node", node.stop)
+
+    def _on_tx(self, data):
+        """Handles ANT+ data transmission events: hands the prepared page to the channel."""
+        self.last_tx = time.monotonic()
+        if self.on_tx:
+            self.on_tx()
+        payload = self.tx_scheduler.next_payload()
+        channel = self.channel
+        if payload is not None and channel is not None:  # None: idle, the radio repeats the previous page
+            self.last_payload = payload
+            channel.send_broadcast_data(payload)
+
+    def _on_data(self, data):
+        if self.on_data:
+            self.on_data(data)
+
+    def _watch(self):
+        while not self.stopping.wait(self.stall_timeout / 4):
+            node = self.node
+            if self.up and node is not None and time.monotonic() - self.last_tx > self.stall_timeout:
+                self.up = False
+                self.fault = f"no TX event for {self.stall_timeout:.1f}s"
+                self._run_step("stop node", node.stop)  # node.start() returns and run() reopens the stick
+
+    def _run_step(self, step, action):
+        worker = threading.Thread(target=self._run_step_action, args=(step, action), name=f"ant-{step.replace(' ', '-')}", daemon=True)
+        worker.start()
+        worker.join(self.stop_timeout)
+        if worker.is_alive():
+            logger.warning(f"⚠️ ANT+ {step} did not finish within {self.stop_timeout:.1f}s")
+
+    @staticmethod
+    def _run_step_action(step, action):
+        try:
+            action()
+        except Exception as e:
+            logger.warning(f"⚠️ ANT+ {step} failed: {e}")
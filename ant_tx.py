@@ -0,0 +1,313 @@
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from openant.easy.exception import TransferFailedException
+from clock import system_clock
+from logger_config import logger
+from data_processor import compute_metrics
+from config import MANUFACTURER_ID, SOFTWARE_VERSION, SERIAL_NUMBER, FOOTPOD_PERIOD
+from config import ANT_TX_PRECOMPUTE, ANT_TX_PREPARE_LEAD_S, ANT_TX_CPU_AFFINITY, ANT_TX_SCHED_FIFO_PRIORITY
+from config import ANT_TX_GIL_SWITCH_INTERVAL_S, ANT_IDLE_TX_INTERVAL, ANT_ACK_MAX_ATTEMPTS
+
+TX_PERIOD_S = FOOTPOD_PERIOD / 32768  # ANT channel period is in 1/32768 s units
+DEVICE_INFO_INTERVAL = 65  # Messages between device info pages (~16 seconds at 4Hz)
+
+PAGE_REQUEST = 70  # Common Page 70 (Request Data Page)
+REQUEST_DATA_PAGE = 0x01  # Page 70 command type
+ACK_UNTIL_SUCCESS = 0x80  # Page 70 transmission response: one acknowledged reply, retried until acknowledged
+
+PageRequest = namedtuple("PageRequest", "page count acknowledged command attempts")
+
+
+def page_1(distance_m, speed_mps, stride_count):
+    """Page 1 (Speed & Distance) payload."""
+    return [
+        1, 0xFF, 0xFF, int(distance_m) & 0xFF, (int(distance_m) & 0x0F) << 4 | (int(speed_mps) & 0x0F),
+        int((speed_mps - int(speed_mps)) * 256), int(stride_count) & 0xFF, 0x20
+    ]
+
+
+def page_2(cadence_spm, speed_mps, heart_rate):
+    """Page 2 (Cadence & Stride) payload; cadence is converted from steps to strides per minute."""
+    return [
+        2, 0xFF, 0xFF, int(cadence_spm // 2),
+        ((int(cadence_spm // 2) % 16) << 4) | (int(speed_mps) & 0x0F),
+        int((speed_mps - int(speed_mps)) * 256), int(heart_rate), 0x20
+    ]
+
+
+def page_80(manufacturer_id=MANUFACTURER_ID):
+    """Device Info Page 80 (Manufacturer) payload."""
+    return [80, manufacturer_id & 0xFF, (manufacturer_id >> 8) & 0xFF, 1, 1, 1, 1, 1]
+
+
+def page_81(software_version=SOFTWARE_VERSION, serial_number=SERIAL_NUMBER):
+    """Device Info Page 81 (Product) payload."""
+    return [
+        81, 0xFF, software_version, software_version,
+        serial_number & 0xFF, (serial_number >> 8) & 0xFF,
+        (serial_number >> 16) & 0xFF, (serial_number >> 24) & 0xFF
+    ]
+
+
+class TxScheduler:
+    """
+    Supplies the foot pod payload for each ANT+ TX event.
+    With precompute enabled, metric computation, page building and logging run on an "ant-prepare" thread
+    shortly before the next TX event, so the TX callback only hands over a ready list.
+    While idle (belt auto-paused), only every idle_interval-th TX event gets a new page, reporting a stationary
+    foot pod; the radio repeats the last page on the others.
+    """
+
+    def __init__(self, sensor_data, precompute=ANT_TX_PRECOMPUTE, period=TX_PERIOD_S, lead=ANT_TX_PREPARE_LEAD_S,
+                 clock=system_clock, idle_interval=ANT_IDLE_TX_INTERVAL):
+        """
+        Initializes the scheduler.
+        :param sensor_data: Shared sensor dictionary; updated with computed distance and stride count.
+        :param precompute: Build payloads ahead of time (False builds them inside the TX callback).
+        :param period: Channel period in seconds.
+        :param lead: How long before the next TX event its payload is built (keeps data fresh).
+        :param clock: Time source distance and strides are integrated with (simulations drive it with precompute off).
+        :param idle_interval: While idle, TX events per new page.
+        """
+        self.sensor_data = sensor_data
+        self.precompute = precompute
+        self.period = period
+        self.lead = lead
+        self.clock = clock
+        self.idle_interval = idle_interval
+        self.idle = False
+        self.idle_count = 0
+        self.message_count = 0
+        self.responses = deque()  # Requested pages, sent before the regular rotation
+        self.ready = None
+        self.handed = None  # Last payload handed to the callback, to detect a late prepare
+        self.late = 0
+        self.tx_time = 0.0
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Prepares the first payload and starts the prepare thread (precompute mode only)."""
+        if self.precompute:
+            self.ready = self.build_payload(0)
+            self.thread = threading.Thread(target=self._prepare_loop, name="ant-prepare", daemon=True)
+            self.thread.start()
+        logger.info(f"📡 ANT+ TX timing: {'precomputed payloads' if self.precompute else 'payloads built in TX callback'}")
+        return self
+
+    def stop(self, timeout=1.0):
+        self.stopping.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def queue_response(self, payload, count=1):
+        """Broadcasts a requested page on the next `count` TX events, ahead of the regular rotation."""
+        self.responses.extend([payload] * count)
+
+    def set_idle(self, idle):
+        """Switches to (or from) the low-rate idle pattern, e.g. from a belt state listener."""
+        if idle != self.idle:
+            self.idle, self.idle_count = idle, 0
+            logger.info(f"📡 ANT+ {'idle pattern (belt paused)' if idle else 'regular rotation resumed'}")
+
+    def next_payload(self):
+        """
+        Returns the payload for this TX event; called from the ANT+ TX callback.
+        :return: Page to send, or None while idle to let the radio repeat the previous page.
+        """
+        if self.responses:
+            return self.responses.popleft()  # The prepared rotation page stays ready for the next slot
+        if self.idle:
+            self.idle_count += 1
+            if self.idle_count % self.idle_interval:
+                return None
+
+        count = self.message_count
+        self.message_count += 1
+        if not self.precompute:
+            return self.build_payload(count)
+
+        payload = self.ready
+        if payload is self.handed:
+            self.late += 1  # Prepare thread missed the deadline; resend the previous page
+        self.handed = payload
+        self.tx_time = time.monotonic()
+        self.wake.set()
+        return payload
+
+    def _prepare_loop(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            # Build as late as possible, so the page carries the freshest sensor values
+            period = self.period * (self.idle_interval if self.idle else 1)
+            if self.stopping.wait(max(0.0, self.tx_time + period - self.lead - time.monotonic())):
+                return
+            try:
+                self.ready = self.build_payload(self.message_count)
+            except Exception as e:
+                logger.error(f"❌ ANT+ payload preparation failed: {e}")
+
+    def build_payload(self, count):
+        """
+        Computes metrics and builds the page for message number `count`.
+        Device info pages 80 and 81 go out on consecutive messages every DEVICE_INFO_INTERVAL messages,
+        otherwise page 1 is sent every 3rd message and page 2 in between.
+        """
+        sensor_data = self.sensor_data
+        idle = self.idle
+        sensor_data.update(compute_metrics(sensor_data, self.clock, moving=not idle))
+
+        # A paused runner is reported as a stationary foot pod, whatever the HRM cadence says
+        speed_mps = 0.0 if idle else sensor_data["speed"]
+        cadence_spm = 0 if idle else sensor_data["cadence"]
+        distance_m = sensor_data["distance"]
+        stride_count = sensor_data["stride_count"]
+        heart_rate = sensor_data["heart_rate"]
+
+        slot = count % DEVICE_INFO_INTERVAL
+        if slot == 0:
+            logger.info(f"📡 Sending Device Info (Page 80) - Manufacturer ID: {MANUFACTURER_ID}")
+            return page_80()
+        if slot == 1:
+            logger.info(f"📡 Sending Device Info (Page 81) - Software Version: {SOFTWARE_VERSION}, Serial Number: {SERIAL_NUMBER}")
+            return page_81()
+        if count % 3 == 0:
+            logger.info(f"📡 ANT+ Page 1 -> Distance: {distance_m:.2f}m, Speed: {speed_mps:.2f}m/s, Strides: {stride_count}")
+            return page_1(distance_m, speed_mps, stride_count)
+        logger.info(f"📡 ANT+ Page 2 -> Cadence: {cadence_spm // 2} SPM (Converted from {cadence_spm} Steps), Speed: {speed_mps:.2f}m/s, HR: {heart_rate} BPM")
+        return page_2(cadence_spm, speed_mps, heart_rate)
+
+
+def parse_page_request(data):
+    """
+    Decodes a Common Page 70 (Request Data Page) message.
+    :return: PageRequest, or None if the message is not a page request.
+    """
+    data = bytes(data)
+    if len(data) != 8 or data[0] != PAGE_REQUEST:
+        return None
+    response = data[5]
+    # Bits 0-6: transmission count; bit 7: reply with acknowledged messages
+    if response == ACK_UNTIL_SUCCESS:
+        # One reply, retried a bounded number of times: the watch may have left after asking
+        return PageRequest(page=data[6], count=1, acknowledged=True, command=data[7], attempts=ANT_ACK_MAX_ATTEMPTS)
+    return PageRequest(page=data[6], count=max(response & 0x7F, 1), acknowledged=bool(response & 0x80), command=data[7],
+                       attempts=1)
+
+
+class PageRequestResponder:
+    """
+    Answers Page 70 requests from watches right away with precomputed common pages,
+    instead of making them wait for the next device info slot (up to ~16 s).
+    Broadcast replies take the next TX slots of the scheduler; acknowledged replies are sent
+    on an "ant-ack" thread, because an acknowledged send blocks until the watch acknowledges it.
+    Each transmission gets request.attempts tries (TransferFailedException), so a watch that left cannot hold
+    the channel; openant's Channel.send_acknowledged_data is not used, as it retries without limit.
+    """
+
+    def __init__(self, scheduler, send_acknowledged, pages=None):
+        """
+        Initializes the responder.
+        :param scheduler: TxScheduler whose TX slots carry broadcast replies.
+        :param send_acknowledged: Callable making one acknowledged send attempt (blocking), raising
+            TransferFailedException when the watch does not acknowledge, e.g. ManagedAntNode.send_acknowledged.
+        :param pages: {page number: payload}; defaults to the device info pages 80 and 81.
+        """
+        self.scheduler = scheduler
+        self.send_acknowledged = send_acknowledged
+        self.pages = pages or {80: page_80(), 81: page_81()}
+        self.acks = queue.Queue()
+        self.thread = None
+        self.stats = {"requests": 0, "answered": 0, "unsupported": 0, "ack_failed": 0}
+
+    def on_data(self, data):
+        """RX callback for broadcast and acknowledged messages from a watch; other pages are ignored."""
+        request = parse_page_request(data)
+        if request is None:
+            return
+        self.stats["requests"] += 1
+
+        payload = self.pages.get(request.page)
+        if request.command != REQUEST_DATA_PAGE or payload is None:
+            self.stats["unsupported"] += 1
+            logger.debug(f"Page request not supported: page {request.page}, command {request.command}")
+            return
+
+        if request.acknowledged:
+            self._start_ack_thread()
+            self.acks.put((payload, request.count, request.attempts))
+        else:
+            self.scheduler.queue_response(payload, request.count)
+        self.stats["answered"] += 1
+        logger.info(f"📡 Page {request.page} requested -> {request.count}x {'acknowledged' if request.acknowledged else 'broadcast'}")
+
+    def _start_ack_thread(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._ack_loop, name="ant-ack", daemon=True)
+            self.thread.start()
+
+    def _ack_loop(self):
+        while True:
+            item = self.acks.get()
+            if item is None:
+                return
+            payload, count, attempts = item
+            for _ in range(count):
+                try:
+                    sent = self._send_with_retries(payload, attempts)
+                except Exception as e:  # Channel down or no response from the stick: drop the rest of the reply
+                    self.stats["ack_failed"] += 1
+                    logger.warning(f"⚠️ Acknowledged page {payload[0]} failed: {e}")
+                    break
+                if not sent:
+                    self.stats["ack_failed"] += 1
+                    logger.warning(f"⚠️ Acknowledged page {payload[0]} not acknowledged after {attempts} attempt(s), giving up")
+            self.acks.task_done()
+
+    def _send_with_retries(self, payload, attempts):
+        """:return: True once the watch acknowledged the payload, False after `attempts` failed transfers."""
+        for _ in range(attempts):
+            try:
+                self.send_acknowledged(list(payload))
+                return True
+            except TransferFailedException:
+                continue
+        return False
+
+    def stop(self, timeout=1.0):
+        if self.thread:
+            self.acks.put(None)
+            self.thread.join(timeout)
+
+
+def apply_tx_thread_settings(cpus=ANT_TX_CPU_AFFINITY, fifo_priority=ANT_TX_SCHED_FIFO_PRIORITY,
+                             switch_interval=ANT_TX_GIL_SWITCH_INTERVAL_S):
+    """
+    Applies the opt-in Linux CPU affinity and SCHED_FIFO priority to the calling thread (the ANT+ node thread).
+    Needs CAP_SYS_NICE (or root) for SCHED_FIFO; failures are logged and the thread keeps its defaults.
+    :param cpus: Iterable of CPU numbers, or None to leave the affinity unchanged.
+    :param fifo_priority: SCHED_FIFO priority (1-99), or None to keep the default scheduler.
+    :param switch_interval: Process-wide GIL switch interval in seconds, or None to keep Python's 5 ms.
+    """
+    if switch_interval is not None:
+        sys.setswitchinterval(switch_interval)
+        logger.info(f"📡 GIL switch interval set to {switch_interval * 1000:g} ms")
+    if cpus is not None:
+        try:
+            os.sched_setaffinity(0, set(cpus))
+            logger.info(f"📡 ANT+ TX thread pinned to CPU(s) {sorted(cpus)}")
+        except (AttributeError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cannot set ANT+ TX CPU affinity: {e}")
+    if fifo_priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(fifo_priority))
+            logger.info(f"📡 ANT+ TX thread running with SCHED_FIFO priority {fifo_priority}")
+        except (AttributeError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cannot enable SCHED_FIFO for the ANT+ TX thread: {e}")
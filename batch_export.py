@@ -0,0 +1,258 @@
+import argparse
+import calendar
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import fitparse
+import numpy as np
+from fit_generator import FitFileGenerator
+from sample_journal import read_journal, JOURNAL_SUFFIX
+from session_history import file_sha256
+from workout_image_generator import generate_workout_image
+from logger_config import logger
+from config import SESSION_HISTORY_DIR, EXPORT_DIR
+
+# Bump when decoding or output generation changes, so every session is exported again
+EXPORT_VERSION = 3
+MANIFEST_NAME = "export_manifest.json"
+FORMATS = ("fit", "png", "csv", "parquet")
+COLUMNS = ("timestamp", "distance", "speed", "heart_rate", "cadence", "incline")
+
+Session = namedtuple("Session", ["start_time", "records", "rr_intervals", "timer_events", "has_incline"])
+
+
+def find_sessions(directory):
+    """Lists recorded sessions (FIT files and sample journals) below a directory."""
+    sessions = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.lower().endswith(".fit") or name.endswith(JOURNAL_SUFFIX):
+                sessions.append(os.path.join(root, name))
+    return sorted(sessions)
+
+
+def read_session(path):
+    """
+    Reads a FIT file or sample journal.
+    :return: Session: start UNIX time, record dictionaries, RR intervals (ms), FitFileGenerator timer events
+             ((UNIX time, "stop" | "start") around auto-pauses), and whether the samples carry incline
+             (FIT files written before incline was stored as the record grade field do not).
+    """
+    if path.endswith(JOURNAL_SUFFIX):
+        start_time, records, timer_events = read_journal(path)
+        return Session(start_time, records, [], timer_events, True)
+
+    records, rr_intervals, timer_events = [], [], []
+    has_incline = False
+    for message in fitparse.FitFile(path).get_messages(["record", "hrv", "event"]):
+        values = message.get_values()
+        if message.name == "hrv":
+            rr_intervals.extend(round(rr * 1000) for rr in values.get("time") or () if rr is not None)
+        elif message.name == "event":
+            if values.get("event") == "timer" and values.get("timestamp") is not None:
+                kind = {"start": "start", "stop": "stop", "stop_all": "stop"}.get(values.get("event_type"))
+                if kind:
+                    timer_events.append((calendar.timegm(values["timestamp"].utctimetuple()), kind))
+        elif values.get("timestamp") is not None:
+            grade = values.get("grade")
+            has_incline = has_incline or grade is not None
+            records.append({
+                "timestamp": calendar.timegm(values["timestamp"].utctimetuple()),
+                "distance": values.get("distance") or 0.0,
+                "speed": values.get("speed") or 0.0,
+                "heart_rate": values.get("heart_rate") or 0,
+                "cadence": values.get("cadence") or 0,
+                "incline": grade or 0.0,
+            })
+    return Session(records[0]["timestamp"] if records else 0, records, rr_intervals, timer_events, has_incline)
+
+
+def write_csv(records, path, has_incline=True):
+    """Writes the samples as CSV; without incline data the incline cells are left empty."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for record in records:
+            writer.writerow([record.get(column, 0) if has_incline or column != "incline" else "" for column in COLUMNS])
+
+
+def write_parquet(records, path, has_incline=True):
+    """Writes the samples as Parquet; without incline data the incline column is null."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.table({column: [record.get(column, 0) if has_incline or column != "incline" else None for record in records]
+                      for column in COLUMNS})
+    pq.write_table(table, path)
+
+
+def export_session(path, output_base, formats):
+    """
+    Regenerates the requested outputs of one session.
+    :param output_base: Output path without extension; each format adds its own.
+    :return: Number of samples exported.
+    """
+    session = read_session(path)
+    records = session.records
+    if not records:
+        raise ValueError("no samples")
+    os.makedirs(os.path.dirname(output_base) or ".", exist_ok=True)
+
+    generator = FitFileGenerator(filename=output_base + ".fit", archive_dir=None, journal_dir=None)
+    generator.start_time = int(session.start_time)
+    generator.records = records
+    generator.timer_events = list(session.timer_events)  # Keeps auto-pauses, so moving time and laps survive
+    generator.add_hrv(session.rr_intervals)
+
+    if "fit" in formats:
+        generator.save_fit_file()
+    if "png" in formats:
+        summary = generator.build_summary()
+        if not session.has_incline:
+            summary["avg_incline"] = summary["total_elevation"] = None
+            summary["series"]["incline"] = np.full(len(records), np.nan)  # Not plotted
+        generate_workout_image(summary, output_path=output_base + ".png")
+    if "csv" in formats:
+        write_csv(records, output_base + ".csv", session.has_incline)
+    if "parquet" in formats:
+        write_parquet(records, output_base + ".parquet", session.has_incline)
+    return len(records)
+
+
+def export_chunk(jobs):
+    """Worker entry point: exports a chunk of (input path, output base, formats) jobs; errors are returned, not raised."""
+    results = []
+    for path, output_base, formats in jobs:
+        try:
+            results.append({"samples": export_session(path, output_base, formats)})
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+class BatchExporter:
+    """Exports a directory of recorded sessions in parallel, skipping sessions whose outputs are current."""
+
+    def __init__(self, output_dir=EXPORT_DIR, formats=("fit", "png", "csv"), workers=None, chunk_size=None, force=False):
+        """
+        Initializes the exporter.
+        :param output_dir: Directory outputs are written to, mirroring the input layout.
+        :param formats: Outputs to produce (subset of FORMATS).
+        :param workers: Worker processes (defaults to the CPU count).
+        :param chunk_size: Sessions per work unit (defaults to about four units per worker).
+        :param force: Export every session, even if its outputs are current.
+        """
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"unknown formats: {', '.join(sorted(unknown))}")
+        if "parquet" in formats:
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                raise ValueError("parquet export needs pyarrow (pip install pyarrow)")
+
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.force = force
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def is_current(self, entry, sha256, output_base):
+        """An output set is current if it was built from the same input bytes by the same export version."""
+        return (
+            entry is not None and entry["sha256"] == sha256 and entry["version"] == EXPORT_VERSION
+            and set(self.formats) <= set(entry["formats"])
+            and all(os.path.exists(f"{output_base}.{fmt}") for fmt in self.formats)
+        )
+
+    def run(self, directory=SESSION_HISTORY_DIR):
+        """
+        Exports every session below a directory.
+        :return: Dictionary with exported, skipped and failed counts, samples, seconds and sessions_per_s.
+        """
+        start = time.perf_counter()
+        manifest = self.load_manifest()
+        stats = {"exported": 0, "skipped": 0, "failed": 0, "samples": 0}
+
+        jobs, hashes, output_owners = [], {}, {}
+        for path in find_sessions(directory):
+            key = os.path.relpath(path, directory)
+            output_base = os.path.join(self.output_dir, os.path.splitext(key)[0])
+            owner = output_owners.setdefault(output_base, key)
+            if owner != key:
+                # e.g. a.fit and a.journal would overwrite each other's outputs
+                logger.warning(f"⚠️ Could not export {key}: its outputs would overwrite those of {owner}")
+                stats["failed"] += 1
+                continue
+            sha256 = file_sha256(path)
+            if not self.force and self.is_current(manifest.get(key), sha256, output_base):
+                stats["skipped"] += 1
+                continue
+            hashes[key] = sha256
+            jobs.append((key, (path, output_base, self.formats)))
+
+        if jobs:
+            chunk_size = self.chunk_size or max(1, len(jobs) // (4 * self.workers))
+            chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+                futures = {executor.submit(export_chunk, [job for _, job in chunk]): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    for (key, _), result in zip(futures[future], future.result()):
+                        if "error" in result:
+                            logger.warning(f"⚠️ Could not export {key}: {result['error']}")
+                            stats["failed"] += 1
+                            manifest.pop(key, None)
+                            continue
+                        manifest[key] = {"sha256": hashes[key], "version": EXPORT_VERSION, "formats": list(self.formats)}
+                        stats["exported"] += 1
+                        stats["samples"] += result["samples"]
+                    self.save_manifest(manifest)  # Progress survives an interrupted batch
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["sessions_per_s"] = stats["exported"] / stats["seconds"] if stats["exported"] else 0.0
+        logger.info(f"📦 Batch export finished: {stats['exported']} exported, {stats['skipped']} current, "
+                    f"{stats['failed']} failed ({stats['sessions_per_s']:.1f} sessions/s)")
+        return stats
+
+
+def main(argv=None):
+    """Command line interface for batch exports."""
+    parser = argparse.ArgumentParser(description="Regenerate FIT files, summary images and CSV/Parquet exports for recorded sessions.")
+    parser.add_argument("directory", nargs="?", default=SESSION_HISTORY_DIR, help="Directory of FIT files and sample journals")
+    parser.add_argument("--output", default=EXPORT_DIR, help="Output directory")
+    parser.add_argument("--formats", default="fit,png,csv", help=f"Comma-separated outputs ({', '.join(FORMATS)})")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None, help="Sessions per work unit")
+    parser.add_argument("--force", action="store_true", help="Export sessions even if their outputs are current")
+    args = parser.parse_args(argv)
+
+    try:
+        exporter = BatchExporter(args.output, [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()],
+                                 args.workers, args.chunk_size, args.force)
+    except ValueError as e:
+        parser.error(str(e))
+
+    stats = exporter.run(args.directory)
+    print(f"exported: {stats['exported']}, current: {stats['skipped']}, failed: {stats['failed']}, "
+          f"samples: {stats['samples']} in {stats['seconds']:.2f} s ({stats['sessions_per_s']:.2f} sessions/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import threading
+from clock import system_clock
+from logger_config import logger
+from config import BELT_STOP_SPEED_MPS, BELT_PAUSE_DELAY_S
+
+RUNNING = "running"
+PAUSED = "paused"
+
+
+class BeltStateDetector:
+    """
+    Tracks whether the treadmill belt is running, from FTMS speed and the FTMS Machine Status / Training Status
+    characteristics, and notifies listeners on every pause and resume.
+    The belt counts as running until there is evidence otherwise, so sessions without a treadmill record as before.
+    """
+
+    def __init__(self, stop_speed_mps=BELT_STOP_SPEED_MPS, pause_delay_s=BELT_PAUSE_DELAY_S, clock=system_clock):
+        """
+        Initializes the detector.
+        :param stop_speed_mps: Speeds below this count as a stopped belt.
+        :param pause_delay_s: How long the belt must be stopped before pausing (filters speed glitches).
+        :param clock: Time source for the pause timestamps.
+        """
+        self.stop_speed_mps = stop_speed_mps
+        self.pause_delay_s = pause_delay_s
+        self.clock = clock
+        self.state = RUNNING
+        self.changed_at = clock.time()
+        self.stopped_since = None  # Time the belt speed first dropped below the threshold
+        self.stop_seen = True  # False after a machine-reported pause until the belt has actually slowed down
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.stats = {"pauses": 0, "paused_s": 0.0}
+
+    def add_listener(self, listener):
+        """Registers listener(state, timestamp, reason), called on every state change."""
+        self.listeners.append(listener)
+
+    @property
+    def paused(self):
+        return self.state == PAUSED
+
+    def update_speed(self, speed_mps):
+        """Feeds an FTMS belt speed sample (m/s)."""
+        now = self.clock.time()
+        if speed_mps >= self.stop_speed_mps:
+            self.stopped_since = None
+            if self.state == PAUSED and self.stop_seen:
+                self._set(RUNNING, now, "belt moving")
+            return
+
+        self.stop_seen = True
+        if self.stopped_since is None:
+            self.stopped_since = now
+        if self.state == RUNNING and now - self.stopped_since >= self.pause_delay_s:
+            # Paused from the moment the belt stopped, so the stopped seconds do not count as moving time
+            self._set(PAUSED, self.stopped_since, "belt stopped")
+
+    def update_machine_status(self, running, reason):
+        """
+        Applies an FTMS Machine Status / Training Status event (see treadmill_service.parse_machine_status).
+        :param running: True when the machine reports a start or resume, False for stop, pause or idle, None to ignore.
+        """
+        if running is None:
+            return
+        now = self.clock.time()
+        if running:
+            self.stopped_since = None
+            self._set(RUNNING, now, reason)
+        else:
+            self.stop_seen = False  # The belt is still slowing down; its speed must not resume the session
+            self._set(PAUSED, now, reason)
+
+    def _set(self, state, timestamp, reason):
+        with self.lock:
+            if state == self.state:
+                return
+            if state == PAUSED:
+                self.stats["pauses"] += 1
+            else:
+                self.stats["paused_s"] += max(0.0, timestamp - self.changed_at)
+            self.state, self.changed_at = state, timestamp
+        logger.info(f"{'⏸️ Auto-pause' if state == PAUSED else '▶️ Auto-resume'}: {reason}")
+        for listener in self.listeners:
+            try:
+                listener(state, timestamp, reason)
+            except Exception as e:
+                logger.error(f"❌ Belt state listener failed: {e}")
@@ -0,0 +1,58 @@
+"""
+Pairing time of a virtual watch that needs Pages 80 and 81 to identify the foot pod:
+waiting for the device info rotation versus requesting the pages with Page 70 (broadcast or acknowledged replies).
+Simulated in TX slots, so it runs instantly; every trial starts at a random point of the rotation.
+Run from the repository root: python -m benchmarks.bench_ant_pairing [trials]
+"""
+import logging
+import random
+import sys
+from ant_tx import TxScheduler, PageRequestResponder, TX_PERIOD_S, DEVICE_INFO_INTERVAL
+
+DEVICE_INFO_PAGES = {80, 81}
+
+
+def page_request(page, acknowledged):
+    return [70, 0xFF, 0xFF, 0xFF, 0xFF, 0x81 if acknowledged else 0x01, page, 0x01]
+
+
+def pair(mode, phase):
+    """Runs one pairing; returns the seconds until the watch has received both device info pages."""
+    scheduler = TxScheduler({"speed": 2.8, "cadence": 168, "incline": 1.0, "heart_rate": 148}, precompute=False)
+    scheduler.message_count = phase
+    acked = []  # Acknowledged payloads waiting for the next slot
+    responder = PageRequestResponder(scheduler, acked.append)
+
+    received = set()
+    for slot in range(1, 10 * DEVICE_INFO_INTERVAL):
+        payload = acked.pop(0) if acked else scheduler.next_payload()
+        if payload[0] in DEVICE_INFO_PAGES:
+            received.add(payload[0])
+        if received == DEVICE_INFO_PAGES:
+            responder.stop()
+            return slot * TX_PERIOD_S
+
+        # After a received message the watch may reply in the same slot; it asks for the first missing page
+        if mode != "rotation" and not acked and not scheduler.responses:
+            missing = min(DEVICE_INFO_PAGES - received)
+            responder.on_data(page_request(missing, mode == "acknowledged"))
+            responder.acks.join()
+    raise RuntimeError("watch never identified the device")
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    root = logging.getLogger()
+    root.setLevel(logging.WARNING)  # Per-page log lines are not part of this measurement
+
+    rng = random.Random(1)
+    phases = [rng.randrange(DEVICE_INFO_INTERVAL) for _ in range(trials)]
+    print(f"{trials} pairings, TX period {TX_PERIOD_S * 1000:.0f} ms, device info every {DEVICE_INFO_INTERVAL} messages")
+    for mode in ("rotation", "broadcast", "acknowledged"):
+        times = sorted(pair(mode, phase) for phase in phases)
+        print(f"  {mode:12s}: p50 {times[len(times) // 2]:5.2f} s, p95 {times[len(times) * 95 // 100]:5.2f} s, "
+              f"max {times[-1]:5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
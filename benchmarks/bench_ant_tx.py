@@ -0,0 +1,91 @@
+"""
+ANT+ TX timing under synthetic CPU load: payloads built inside the TX callback versus precomputed.
+A simulated radio raises TX events every channel period; a dispatcher thread (like openant's) runs the
+callback, and the hand-over time of each payload is recorded.
+Run from the repository root: python -m benchmarks.bench_ant_tx [load threads] [seconds] [--fifo] [--switch=0.001]
+"""
+import logging
+import queue
+import statistics
+import sys
+import threading
+import time
+from ant_tx import TxScheduler, TX_PERIOD_S, apply_tx_thread_settings
+
+
+def busy(stop):
+    """Pure-Python CPU load competing for the GIL, like BLE parsing or image rendering."""
+    while not stop.is_set():
+        sum(i * i for i in range(20000))
+
+
+def run(precompute, load_threads, seconds, fifo):
+    sensor_data = {"speed": 2.8, "cadence": 168, "incline": 1.0, "heart_rate": 148}
+    scheduler = TxScheduler(sensor_data, precompute=precompute).start()
+    events = queue.Queue()
+    handovers = []  # (TX event time, hand-over time)
+    stop = threading.Event()
+
+    def radio():
+        next_tx = time.perf_counter()
+        while not stop.is_set():
+            next_tx += TX_PERIOD_S
+            time.sleep(max(0.0, next_tx - time.perf_counter()))
+            events.put(time.perf_counter())
+
+    def dispatcher():
+        if fifo:
+            apply_tx_thread_settings(cpus=None, fifo_priority=50, switch_interval=None)
+        while not stop.is_set():
+            try:
+                tx_time = events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            scheduler.next_payload()
+            handovers.append((tx_time, time.perf_counter()))
+
+    threads = [threading.Thread(target=radio), threading.Thread(target=dispatcher)]
+    threads += [threading.Thread(target=busy, args=(stop,)) for _ in range(load_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    scheduler.stop()
+
+    latency = sorted((done - tx) * 1000 for tx, done in handovers)
+    intervals = [(b[1] - a[1]) * 1000 for a, b in zip(handovers, handovers[1:])]
+    jitter = sorted(abs(interval - TX_PERIOD_S * 1000) for interval in intervals)
+
+    def pct(values, p):
+        return values[min(len(values) - 1, len(values) * p // 100)]
+
+    print(f"  {'precomputed' if precompute else 'in callback':12s}: {len(handovers)} TX, "
+          f"hand-over latency p50/p99/max {pct(latency, 50):6.2f}/{pct(latency, 99):6.2f}/{latency[-1]:6.2f} ms, "
+          f"interval jitter p50/p99/max {pct(jitter, 50):6.2f}/{pct(jitter, 99):6.2f}/{jitter[-1]:6.2f} ms "
+          f"(stdev {statistics.pstdev(intervals):.2f} ms), late pages {scheduler.late}")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    load_threads = int(args[0]) if args else 4
+    seconds = float(args[1]) if len(args) > 1 else 20
+    fifo = "--fifo" in sys.argv
+    for arg in sys.argv[1:]:
+        if arg.startswith("--switch="):
+            apply_tx_thread_settings(cpus=None, fifo_priority=None, switch_interval=float(arg.split("=", 1)[1]))
+
+    # Keep the per-page log lines (their cost is part of the comparison) but only in the log file
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if type(h) is logging.StreamHandler]:
+        root.removeHandler(handler)
+
+    for threads in sorted({0, load_threads}):
+        print(f"{threads} load thread(s), {seconds:.0f} s at {1 / TX_PERIOD_S:.2f} Hz{' with SCHED_FIFO' if fifo else ''}:")
+        for precompute in (False, True):
+            run(precompute, threads, seconds, fifo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load test for the live dashboard: dozens of simulated WebSocket clients, some of which stop reading.
+Run from the repository root: python -m benchmarks.bench_dashboard [clients] [seconds]
+"""
+import asyncio
+import base64
+import os
+import socket
+import sys
+import time
+from dashboard_server import DashboardServer, decode_frame
+
+LANES = 24
+RATE_HZ = 20  # Well above the default cap, to stress the fan-out
+SLOW_FRACTION = 0.25
+
+
+class SyntheticLanes:
+    """Every lane changes speed, HR and distance on every poll."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+
+    def __call__(self):
+        t = time.monotonic() - self.start
+        return {
+            lane: {"speed": 2.5 + lane * 0.05, "heart_rate": 120 + int(t * 3 + lane) % 60, "cadence": 80 + lane % 10,
+                   "distance": (2.5 + lane * 0.05) * t, "incline": (lane % 5) * 0.5}
+            for lane in range(1, LANES + 1)
+        }
+
+
+async def client(port, slow, stats):
+    sock = socket.socket()
+    if slow:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(f"GET /ws HTTP/1.1\r\nHost: bench\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    await reader.readuntil(b"\r\n\r\n")
+
+    lanes = {}
+    while True:
+        if slow:
+            writer.transport.pause_reading()  # Stops reading: the server must coalesce instead of buffering
+            await asyncio.sleep(3600)
+        header = await reader.readexactly(2)
+        length = header[1]
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), "big")
+        decode_frame(await reader.readexactly(length), lanes)
+        stats["frames"] += 1
+
+
+async def run(clients, seconds):
+    server = DashboardServer(SyntheticLanes(), host="127.0.0.1", port=0, max_rate_hz=RATE_HZ, buffer_limit=4 * 1024).start()
+
+    # Baseline: polling and versioning without clients
+    await asyncio.sleep(2)
+    idle_cpu, idle_ticks = server.stats["tick_cpu_s"], server.stats["ticks"]
+
+    stats = {"frames": 0}
+    slow_count = int(clients * SLOW_FRACTION)
+    tasks = [asyncio.create_task(client(server.port, i < slow_count, stats)) for i in range(clients)]
+    await asyncio.sleep(1)
+    cpu_start, ticks_start, frames_start = server.stats["tick_cpu_s"], server.stats["ticks"], server.stats["frames"]
+    bytes_start = server.stats["bytes"]
+    await asyncio.sleep(seconds)
+    cpu = server.stats["tick_cpu_s"] - cpu_start
+    ticks = server.stats["ticks"] - ticks_start
+
+    print(f"{clients} clients ({slow_count} not reading), {LANES} lanes changing at {RATE_HZ} Hz for {seconds} s")
+    print(f"  idle tick (no clients)   : {idle_cpu / max(idle_ticks, 1) * 1e6:8.1f} us CPU")
+    print(f"  tick with clients        : {cpu / max(ticks, 1) * 1e6:8.1f} us CPU ({cpu / seconds * 100:.2f}% of one core)")
+    print(f"  frames sent              : {server.stats['frames'] - frames_start} "
+          f"({(server.stats['bytes'] - bytes_start) / seconds / 1024:.1f} KiB/s total), encoded once per tick: {server.stats['encodes']}")
+    print(f"  frames decoded by clients: {stats['frames']}")
+    print(f"  coalesced (slow clients) : {server.stats['coalesced']}")
+
+    for task in tasks:
+        task.cancel()
+    server.stop()
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(run(clients, seconds))
+
+
+if __name__ == "__main__":
+    main()
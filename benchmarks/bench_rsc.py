@@ -0,0 +1,100 @@
+"""
+Replays hours of Running Speed and Cadence notifications through the RSC decoder and the stride counter,
+and compares the sensor stride count with the cadence estimate integrated over jittery callback intervals.
+Run from the repository root: python -m benchmarks.bench_rsc [hours]
+"""
+import struct
+import sys
+import time
+import numpy as np
+from clock import VirtualClock
+from data_processor import add_sensor_distance, compute_metrics, reset_metrics
+from heartrate_service import parse_rsc_measurement, RSCMeasurement
+
+RATE_HZ = 4  # Notifications per second (HRM-Pro class sensors send 1-4 Hz)
+
+
+def synthetic_notifications(hours, seed=0):
+    """Builds 0x2A53 notifications with stride length and total distance; returns them with the true step count."""
+    rng = np.random.default_rng(seed)
+    count = int(hours * 3600 * RATE_HZ)
+    cadence = np.clip(rng.normal(170, 4, count), 120, 200)  # Steps per minute
+    stride_m = np.clip(rng.normal(1.0, 0.05, count), 0.6, 1.4)  # Meters per step
+    steps = cadence / 60 / RATE_HZ
+    total_dm = np.floor(np.cumsum(steps * stride_m) * 10).astype(int)
+    packets = [
+        struct.pack("<BHBHI", 0x07, int(c * s / 60 * 256), int(c), int(s * 100), d)
+        for c, s, d in zip(cadence, stride_m, total_dm)
+    ]
+    return packets, float(steps.sum())
+
+
+def parse_by_slicing(data):
+    """Reference decoder that slices the payload, as a per-field bytes-copying implementation would."""
+    flags = data[0]
+    speed = int.from_bytes(data[1:3], "little") / 256
+    cadence = data[3]
+    index = 4
+    stride_length = total_distance = None
+    if flags & 0x01:
+        stride_length = int.from_bytes(data[index:index + 2], "little") / 100
+        index += 2
+    if flags & 0x02:
+        total_distance = int.from_bytes(data[index:index + 4], "little") / 10
+    return RSCMeasurement(speed, cadence, stride_length, total_distance, bool(flags & 0x04))
+
+
+def count_strides(measurements, hours, seed=1):
+    """Stride count from the sensor fields vs the cadence estimate, both fed on a clock with callback jitter."""
+    rng = np.random.default_rng(seed)
+    clock = VirtualClock(start=0.0)
+    # Build pages on a 4 Hz TX clock whose ticks drift and jitter, as wall-clock deltas do on a busy Pi
+    ticks = np.cumsum(np.clip(rng.normal(1 / RATE_HZ, 0.04, len(measurements)), 0.01, None))
+    ticks *= hours * 3600 / ticks[-1] * rng.uniform(0.97, 1.03)
+
+    results = {}
+    for use_sensor in (True, False):
+        clock.now = 0.0
+        reset_metrics(clock)
+        sensor_data = {"speed": 0.0, "cadence": 0}
+        for tick, measurement in zip(ticks, measurements):
+            clock.now = tick
+            sensor_data["cadence"] = measurement.cadence
+            add_sensor_distance(measurement.total_distance, measurement.stride_length, clock, use_strides=use_sensor)
+            strides = compute_metrics(sensor_data, clock)["stride_count"]
+        results[use_sensor] = strides
+    reset_metrics()
+    return results[True], results[False]
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    packets, true_steps = synthetic_notifications(hours)
+
+    start = time.perf_counter()
+    measurements = [parse_rsc_measurement(packet) for packet in packets]
+    decode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for packet in packets:
+        parse_by_slicing(packet)
+    slicing_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reset_metrics()
+    for measurement in measurements:
+        add_sensor_distance(measurement.total_distance, measurement.stride_length)
+    count_s = time.perf_counter() - start
+
+    sensor_strides, estimated_strides = count_strides(measurements, hours)
+
+    print(f"{hours:.1f} h replay: {len(packets)} RSC notifications at {RATE_HZ} Hz, {true_steps:,.0f} steps")
+    print(f"  decode (unpack_from): {decode_s * 1e6 / len(packets):6.2f} us/notification ({len(packets) / decode_s:,.0f}/s)")
+    print(f"  decode (slicing)    : {slicing_s * 1e6 / len(packets):6.2f} us/notification ({len(packets) / slicing_s:,.0f}/s)")
+    print(f"  stride counter      : {count_s * 1e6 / len(packets):6.2f} us/notification")
+    print(f"  stride count        : sensor {sensor_strides:,.0f} ({(sensor_strides / true_steps - 1) * 100:+.2f}%), "
+          f"cadence estimate {estimated_strides:,.0f} ({(estimated_strides / true_steps - 1) * 100:+.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Indexes a directory of synthetic FIT sessions, rescans it, and times the history queries.
+Run from the repository root: python -m benchmarks.bench_session_history [sessions]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from fit_encoder import FitEncoder
+from session_history import SessionIndex
+
+START = 1700000000
+
+
+def write_sessions(directory, count, seconds=1800):
+    rng = np.random.default_rng(0)
+    for n in range(count):
+        start = START + n * 86400
+        speed = rng.uniform(8, 14) / 3.6
+        with open(os.path.join(directory, f"workout_{n:05d}.fit"), "wb") as f:
+            encoder = FitEncoder(f)
+            encoder.start_file()
+            encoder.write_file_id(time_created=start)
+            for i in range(seconds):
+                encoder.write_record({"timestamp": start + i, "speed": speed, "distance": speed * i,
+                                      "cadence": 82, "heart_rate": int(100 + speed * 15)})
+            encoder.finish_file()
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"  {label:<24} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = os.path.join(tmp, "sessions")
+        os.makedirs(sessions)
+        write_sessions(sessions, count)
+        index = SessionIndex(os.path.join(tmp, "history.sqlite"))
+
+        print(f"{count} sessions of 30 min at 1 Hz")
+        timed("initial scan", index.scan, sessions)
+        timed("rescan (no changes)", index.scan, sessions)
+        write_sessions(sessions, 1)  # Rewrite one file with identical content
+        timed("rescan (1 touched)", index.scan, sessions)
+        timed("weekly distance", index.weekly_distance)
+        timed("PR 5k", index.personal_record, 5000)
+        timed("avg HR at 10 km/h", index.avg_heart_rate_at_speed, 10)
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
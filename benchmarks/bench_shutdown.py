@@ -0,0 +1,44 @@
+"""
+Measures shutdown-to-file-ready time with the mock BLE services and a one-hour session in memory,
+reporting the FIT file separately from the summary image rendered after it.
+Run from the repository root: python -m benchmarks.bench_shutdown
+"""
+import os
+import tempfile
+import time
+import service_manager
+from fit_generator import FitFileGenerator
+
+SESSION_SECONDS = 3600
+
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # The summary image is written to the working directory
+        generator = FitFileGenerator(filename=os.path.join(tmp, "workout.fit"), archive_dir=None, journal_dir=None)
+        generator.records = [
+            {"timestamp": generator.start_time + i, "speed": 2.8, "distance": 2.8 * i, "cadence": 84,
+             "heart_rate": 150, "incline": 1.0, "elevation_gain": 0}
+            for i in range(SESSION_SECONDS)
+        ]
+        service_manager.fit_generator = generator
+
+        service_manager.start_services()
+        time.sleep(1.5)  # Mock services running
+        start = time.perf_counter()
+        generator.save_fit_file()
+        io_only = time.perf_counter() - start
+
+        start = time.perf_counter()
+        elapsed = service_manager.stop_services()
+        total = time.perf_counter() - start
+        print(f"Shutdown with {SESSION_SECONDS} s of samples (previously >= 2000 ms of fixed sleep):")
+        print(f"  stop request -> FIT file ready     : {elapsed * 1000:.0f} ms")
+        print(f"  of which FIT encoding/writing alone: {io_only * 1000:.0f} ms")
+        print(f"  stop request -> summary image ready: {total * 1000:.0f} ms")
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Replays a mock workout in virtual time (mock HRM + FTMS, ANT+ TX rotation, FIT recording) and reports the speedup.
+Run from the repository root: python -m benchmarks.bench_simulation [hours]
+"""
+import logging
+import sys
+import time
+from data_processor import reset_metrics
+from logger_config import logger
+from session_simulator import SessionSimulator
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    duration_s = hours * 3600
+    logger.setLevel(logging.WARNING)  # Per-sample log lines would dominate the measurement
+
+    simulator = SessionSimulator(duration_s, start_time=1760000000)
+    start = time.perf_counter()
+    generator = simulator.run()
+    elapsed = time.perf_counter() - start
+    reset_metrics()
+
+    print(f"Simulated {hours:g} h session in {elapsed:.2f} s ({duration_s / elapsed:,.0f}x real time)")
+    print(f"  FIT records: {len(generator.records)}, RR intervals: {len(generator.rr_intervals)}, "
+          f"ANT+ TX events: {simulator.tx_count}")
+    print(f"  distance: {simulator.sensor_data['distance']:.1f} m, strides: {simulator.sensor_data['stride_count']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures post-session split analysis: NumPy splits vs a per-sample Python loop, and FIT lap generation.
+Run from the repository root: python -m benchmarks.bench_splits [samples]
+"""
+import sys
+import time
+import numpy as np
+from fit_generator import FitFileGenerator
+from split_analysis import compute_splits, SPLIT_DISTANCES_M
+
+
+def make_series(samples, seed=1):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(3.0 + np.cumsum(rng.normal(0, 0.02, samples)), 1.5, 5.0)
+    heart_rate = np.clip(140 + np.cumsum(rng.normal(0, 0.3, samples)), 90, 190).round()
+    time_s = np.arange(samples, dtype=np.float64)
+    return {
+        "time": time_s, "moving_time": time_s,
+        "distance": np.concatenate(([0.0], np.cumsum(speed[1:]))),
+        "speed": speed, "heart_rate": heart_rate,
+        "cadence": np.full(samples, 168.0), "incline": rng.choice([0.0, 1.0, 2.0, 4.0], samples),
+    }
+
+
+def python_splits(series, split_m):
+    """The per-sample loop the NumPy version replaces (same interpolation and time weighting)."""
+    time_s, distance = series["time"].tolist(), series["distance"].tolist()
+    heart_rate, incline = series["heart_rate"].tolist(), series["incline"].tolist()
+    splits, mark, start, hr_sum, hr_time, climb = [], split_m, 0.0, 0.0, 0.0, 0.0
+    for i in range(1, len(distance)):
+        dt = time_s[i] - time_s[i - 1]
+        hr_sum += heart_rate[i - 1] * dt
+        hr_time += dt if heart_rate[i - 1] else 0.0
+        climb += max((distance[i] - distance[i - 1]) * incline[i] / 100, 0.0)
+        while distance[i] >= mark:
+            crossing = time_s[i - 1] + (mark - distance[i - 1]) / (distance[i] - distance[i - 1]) * dt
+            splits.append((start, crossing, hr_sum / hr_time if hr_time else None, climb))
+            start, mark, hr_sum, hr_time, climb = crossing, mark + split_m, 0.0, 0.0, 0.0
+    return splits
+
+
+def best_of(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    series = make_series(samples)
+    print(f"{samples} samples ({samples / 3600:.1f} h at 1 Hz), {series['distance'][-1] / 1000:.1f} km")
+
+    for unit, split_m in SPLIT_DISTANCES_M.items():
+        numpy_s, splits = best_of(lambda: compute_splits(series, split_m))
+        loop_s, reference = best_of(lambda: python_splits(series, split_m), repeat=2)
+        print(f"  {unit:4s}: {len(splits['distance'])} splits, NumPy {numpy_s * 1e3:.1f} ms, "
+              f"Python loop {loop_s * 1e3:.1f} ms ({loop_s / numpy_s:.0f}x)")
+
+    generator = FitFileGenerator(filename="bench_splits.fit", archive_dir=None, journal_dir=None)
+    generator.records = [{"timestamp": 1760000000 + i, "speed": speed, "distance": distance, "cadence": 168,
+                          "heart_rate": heart_rate, "incline": incline}
+                         for i, (speed, distance, heart_rate, incline) in enumerate(zip(
+                             series["speed"].tolist(), series["distance"].tolist(),
+                             series["heart_rate"].tolist(), series["incline"].tolist()))]
+    laps_s, laps = best_of(generator.build_laps, repeat=3)
+    print(f"  FIT laps from records (series extraction + splits): {len(laps)} laps in {laps_s * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Summary image render time for 1 h and 4 h sessions, with LTTB-downsampled charts versus plotting every sample.
+Run from the repository root: python -m benchmarks.bench_summary_image [dpi]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import workout_image_generator
+from workout_image_generator import generate_workout_image, lttb
+
+
+def synthetic_series(hours, rng):
+    """1 Hz session with interval blocks, HR drift and sensor noise."""
+    t = np.arange(int(hours * 3600), dtype=np.float64)
+    speed = np.where((t // 300) % 2 == 0, 2.8, 3.6) + rng.normal(0, 0.03, len(t))
+    heart_rate = np.clip(110 + 40 * (speed - 2.8) + t / 600 + rng.normal(0, 2, len(t)), 60, 200).round()
+    return {"time": t, "heart_rate": heart_rate, "speed": speed, "incline": np.where(t % 1200 < 600, 1.0, 4.0),
+            "cadence": (80 + 8 * (speed - 2.8) + rng.normal(0, 1, len(t))).round()}
+
+
+def render(series, path, dpi):
+    summary = {"distance": 10000, "duration": series["time"][-1], "avg_heart_rate": 140, "avg_cadence": 84,
+               "avg_incline": 2.5, "total_elevation": 250, "series": series}
+    start = time.perf_counter()
+    generate_workout_image(summary, output_path=path, dpi=dpi)
+    return time.perf_counter() - start
+
+
+def main():
+    dpi = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = np.random.default_rng(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "summary.png")
+        render(synthetic_series(0.1, rng), path, dpi)  # Warm up font caches
+
+        for hours in (1, 4):
+            series = synthetic_series(hours, rng)
+            start = time.perf_counter()
+            lttb(series["time"], series["heart_rate"], 1500)
+            lttb_s = time.perf_counter() - start
+
+            downsampled = render(series, path, dpi)
+            workout_image_generator.lttb = lambda x, y, threshold: (x, y)  # Plot every sample
+            try:
+                full = render(series, path, dpi)
+            finally:
+                workout_image_generator.lttb = lttb
+
+            print(f"{hours} h ({len(series['time'])} samples/series) at {dpi} dpi: "
+                  f"LTTB {downsampled:.2f} s, all points {full:.2f} s (LTTB itself {lttb_s * 1000:.1f} ms/series)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Telemetry exporter benchmark: per-lane encode cost, per-datagram decode cost, and a live receiver
+counting loss and latency while the exporter runs far above its configured rate.
+Run from the repository root: python -m benchmarks.bench_telemetry [lanes] [seconds]
+"""
+import socket
+import sys
+import time
+from telemetry_protocol import PacketEncoder, decode_packet, open_receiver_socket
+from telemetry_exporter import TelemetryExporter
+from config import TELEMETRY_GROUP, TELEMETRY_LANES_PER_PACKET
+
+RATE_HZ = 200
+
+
+def synthetic_lanes(lanes):
+    start = time.monotonic()
+
+    def source():
+        t = time.monotonic() - start
+        return {
+            lane: {"speed": 2.5 + lane * 0.01, "heart_rate": 120 + int(t + lane) % 60, "cadence": 80,
+                   "distance": 2.5 * t, "incline": 1.0, "rmssd": 35.2, "stride_count": int(t * 1.4)}
+            for lane in range(1, lanes + 1)
+        }
+    return source
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def open_receiver(port):
+    """Joins the multicast group, falling back to unicast loopback where multicast is unavailable."""
+    try:
+        return open_receiver_socket(TELEMETRY_GROUP, port), TELEMETRY_GROUP
+    except OSError:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", port))
+        return sock, "127.0.0.1"
+
+
+def main():
+    lanes = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    source = synthetic_lanes(lanes)
+
+    snapshot = source()
+    encoder = PacketEncoder(TELEMETRY_LANES_PER_PACKET)
+    packets = encoder.encode(snapshot, 0, 0)
+    encode = time_per_call(lambda: encoder.encode(snapshot, 0, 0), 2000)
+    decode = time_per_call(lambda: [decode_packet(p) for p in packets], 2000)
+    print(f"{lanes} lanes -> {len(packets)} datagram(s), {sum(map(len, packets))} bytes per snapshot")
+    print(f"  encode: {encode * 1e6:7.1f} us per snapshot ({encode / lanes * 1e6:.2f} us per lane)")
+    print(f"  decode: {decode * 1e6:7.1f} us per snapshot ({decode / lanes * 1e6:.2f} us per lane)")
+
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    receiver, group = open_receiver(port)
+    receiver.settimeout(0.5)
+
+    exporter = TelemetryExporter(source, group=group, port=port, rate_hz=RATE_HZ).start()
+    received, lost, latency_max, last_sequence = 0, 0, 0.0, None
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            data = receiver.recv(2048)
+        except socket.timeout:
+            continue
+        header, _ = decode_packet(data)
+        latency_max = max(latency_max, time.time() * 1000 - header.timestamp_ms)
+        if last_sequence is not None:
+            lost += (header.sequence - last_sequence - 1) & 0xFFFFFFFF
+        last_sequence = header.sequence
+        received += 1
+    exporter.stop()
+    receiver.close()
+
+    sends = exporter.stats["lanes"] / lanes
+    print(f"live via {group}: {sends:.0f} snapshots at {RATE_HZ} Hz, {received} datagrams received, {lost} lost, "
+          f"max latency {latency_max:.1f} ms")
+    print(f"  exporter encode time: {exporter.stats['encode_s'] / max(sends, 1) * 1e6:.1f} us per snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class SystemClock:
+    """Wall-clock time; the default for every service."""
+
+    def time(self):
+        """UNIX time in seconds."""
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+system_clock = SystemClock()
+
+
+class VirtualClock:
+    """
+    Simulated time for one asyncio event loop. Time only moves inside run(): whenever the other tasks
+    are all waiting in sleep(), it jumps to the earliest wake-up, so simulations run as fast as the CPU allows.
+    """
+
+    def __init__(self, start=0.0, settle_steps=3):
+        """
+        Initializes the clock.
+        :param start: Initial UNIX time in seconds.
+        :param settle_steps: Event loop iterations given to woken tasks before time advances again
+                             (enough for tasks that only compute between sleeps).
+        """
+        self.start = start
+        self.now = start
+        self.settle_steps = settle_steps
+        self.sleepers = []  # Heap of (wake time, sequence, future)
+        self.sequence = itertools.count()
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now - self.start
+
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.sleepers, (self.now + max(seconds, 0.0), next(self.sequence), future))
+        await future
+
+    async def run(self, until):
+        """
+        Drives simulated time up to `until` (UNIX seconds), waking sleepers in time order.
+        Tasks using this clock must already be scheduled on the running loop.
+        """
+        await self._settle()
+        while self.sleepers and self.sleepers[0][0] <= until:
+            wake_time = self.sleepers[0][0]
+            self.now = max(self.now, wake_time)
+            while self.sleepers and self.sleepers[0][0] == wake_time:
+                _, _, future = heapq.heappop(self.sleepers)
+                if not future.done():
+                    future.set_result(None)
+            await self._settle()
+        self.now = max(self.now, until)
+
+    async def _settle(self):
+        for _ in range(self.settle_steps):
+            await asyncio.sleep(0)
@@ -26,3 +26,86 @@ SERIAL_NUMBER = 12345678
 # 🔹 Enable/Disable BLE Mocks
 MOCK_FTMS = True  # Set to False to use real FTMS
 MOCK_HRM = True   # Set to False to use real HRM
+
+# 🔹 HRV Analysis (RR intervals from the HRM)
+HRV_WINDOW_BEATS = 120  # Rolling window for RMSSD/SDNN
+HRV_MIN_RR_MS = 300  # Shortest accepted RR interval (200 BPM)
+HRV_MAX_RR_MS = 2000  # Longest accepted RR interval (30 BPM)
+HRV_MAX_RR_CHANGE = 0.2  # Reject beats deviating more than 20% from the previous beat
+
+# 🔹 Session History
+SESSION_HISTORY_DIR = "sessions"  # Every saved FIT file is archived here with a timestamped name
+SESSION_INDEX_DB = "sessions/history.sqlite"  # Index built by `python session_history.py scan`
+SESSION_SERIES_INTERVAL_S = 10  # Downsampled series resolution kept in the index
+BEST_EFFORT_DISTANCES = (1000, 5000, 10000, 21097)  # Distances (m) tracked for PR queries
+
+# 🔹 Crash-Safe Sample Journal
+JOURNAL_DIR = "journal"  # Unfinished journals here are turned into FIT files on the next start
+JOURNAL_FSYNC_INTERVAL_S = 5.0  # Group-commit interval; bounds data lost on power failure
+
+# 🔹 Shutdown
+SHUTDOWN_TIMEOUT_S = 5.0  # Deadline for BLE service threads to exit on shutdown
+BLE_STOP_TIMEOUT_S = 2.0  # Deadline for each BLE unsubscribe before disconnecting
+ANT_STOP_TIMEOUT_S = 2.0  # Deadline for closing the ANT+ channel and node
+
+# 🔹 Live Dashboard (optional)
+DASHBOARD_ENABLED = False  # Serve the wall-screen dashboard over HTTP/WebSocket
+DASHBOARD_HOST = "0.0.0.0"
+DASHBOARD_PORT = 8080
+DASHBOARD_MAX_RATE_HZ = 4  # Upper bound on updates pushed to each browser
+DASHBOARD_CLIENT_BUFFER_LIMIT = 64 * 1024  # Slow clients above this many unsent bytes get coalesced updates
+DASHBOARD_MAX_CLIENT_FRAME = 1024  # Largest client frame payload read (pings, close, small text); larger ones close with 1009
+LANE_ID = 1  # Lane number this FootPod publishes
+
+# 🔹 UDP Telemetry Export (optional)
+TELEMETRY_ENABLED = False  # Multicast live lane data for other systems on the local network
+TELEMETRY_GROUP = "239.255.70.80"  # Administratively scoped multicast group
+TELEMETRY_PORT = 5070
+TELEMETRY_RATE_HZ = 2  # Snapshots per second
+TELEMETRY_TTL = 1  # Do not route beyond the local subnet
+TELEMETRY_LANES_PER_PACKET = 32  # Lanes batched per datagram (16-byte records, max 90)
+
+# 🔹 Runtime Diagnostics
+DIAG_ENABLED = True  # Log a compact health line periodically; `kill -USR1 <pid>` logs a full report
+DIAG_INTERVAL_S = 60  # Seconds between health lines
+DIAG_LOOP_PROBE_INTERVAL_S = 0.5  # Timer used to measure BLE event-loop lag
+DIAG_LOOP_LAG_WARN_MS = 100  # Warn when a BLE event loop falls this far behind
+DIAG_THREADS_PER_NAME_WARN = 2  # Warn when more threads share a name (e.g. leaked "hrm-service" respawns)
+DIAG_RSS_GROWTH_WARN_MB = 100  # Warn when resident memory has grown this much since start
+DIAG_ANT_JITTER_WARN_MS = 50  # Warn when ANT+ TX callbacks deviate this much from the channel period
+
+# 🔹 Workout Summary Charts
+HR_MAX_BPM = 190  # Maximum heart rate the zones are derived from
+HR_ZONES = (0.5, 0.6, 0.7, 0.8, 0.9, 1.0)  # Zone boundaries as fractions of HR_MAX_BPM (Z1-Z5)
+HR_ZONE_COLORS = ("#95A5A6", "#3498DB", "#2ECC71", "#F39C12", "#E74C3C")
+
+# 🔹 Batch Export
+EXPORT_DIR = "exports"  # Output of `python batch_export.py`
+
+# 🔹 ANT+ TX Timing
+ANT_TX_PRECOMPUTE = True  # Build each page ahead of its TX event; the TX callback only hands it over
+ANT_TX_PREPARE_LEAD_S = 0.15  # Build the next page this long before its TX event
+ANT_TX_CPU_AFFINITY = None  # e.g. {3}: pin the ANT+ TX thread to these CPUs (Linux)
+ANT_TX_SCHED_FIFO_PRIORITY = None  # e.g. 50: run the ANT+ TX thread with SCHED_FIFO (needs CAP_SYS_NICE)
+ANT_TX_GIL_SWITCH_INTERVAL_S = None  # e.g. 0.001: shorter GIL hand-off, so the TX thread waits less behind busy threads
+ANT_ACK_MAX_ATTEMPTS = 4  # Tries for a Page 70 reply sent "until acknowledged" (0x80) before giving up
+
+# 🔹 ANT+ Stick Re-Attach
+ANT_NODE_STALL_TIMEOUT_S = 2.0  # Reopen the stick when no TX event arrives for this long (e.g. unplugged)
+ANT_REOPEN_BACKOFF_S = 1.0  # First retry delay when the stick cannot be opened; doubles on each failure
+ANT_REOPEN_MAX_BACKOFF_S = 10.0  # Upper bound on the retry delay
+
+# 🔹 Auto-Pause
+AUTO_PAUSE_ENABLED = True  # Suspend FIT recording and ANT+ updates while the belt stands still
+BELT_STOP_SPEED_MPS = 0.3  # Belt speeds below this count as stopped
+BELT_PAUSE_DELAY_S = 3.0  # Pause once the belt has been stopped this long (FTMS stop/pause events pause at once)
+ANT_IDLE_TX_INTERVAL = 4  # While paused, build a page every 4th TX event (~1 Hz); the radio repeats the last one in between
+
+# 🔹 Running Speed & Cadence Sensor
+RSC_SENSOR_STRIDES = True  # Count strides from the HRM's total distance and stride length instead of integrating cadence
+RSC_SENSOR_DISTANCE = False  # Broadcast the HRM's total distance instead of integrated belt speed (the belt is usually more accurate)
+RSC_SENSOR_TIMEOUT_S = 5.0  # Fall back to the estimates when the HRM has not reported for this long
+
+# 🔹 Splits and Laps
+SPLIT_UNIT = "km"  # "km" or "mile": split length of the FIT laps and the summary pace chart
+FIT_LAPS = "pauses"  # "pauses": an auto-lap per stretch between auto-pauses; "splits": a lap per SPLIT_UNIT instead
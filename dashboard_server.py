@@ -0,0 +1,327 @@
+import asyncio
+import base64
+import hashlib
+import os
+import socket
+import struct
+import threading
+import time
+from logger_config import logger
+from config import DASHBOARD_HOST, DASHBOARD_PORT, DASHBOARD_MAX_RATE_HZ, DASHBOARD_CLIENT_BUFFER_LIMIT, LANE_ID
+from config import DASHBOARD_MAX_CLIENT_FRAME
+
+# Lane fields in wire order: (sensor key, scale, struct format)
+FIELDS = (
+    ("speed", 100, "H"),  # cm/s
+    ("heart_rate", 1, "B"),  # BPM
+    ("cadence", 1, "B"),  # SPM
+    ("distance", 10, "I"),  # dm
+    ("incline", 10, "h"),  # 0.1 %
+)
+FIELD_STRUCTS = [struct.Struct("<" + fmt) for _, _, fmt in FIELDS]
+
+
+def _limits(fmt):
+    bits = struct.calcsize(fmt) * 8
+    return (-(1 << (bits - 1)), (1 << (bits - 1)) - 1) if fmt.islower() else (0, (1 << bits) - 1)
+
+
+FIELD_LIMITS = [_limits(fmt) for _, _, fmt in FIELDS]
+
+# Frame: type, base version, version; then per lane: lane id, changed-field mask, changed values
+FRAME_HEADER = struct.Struct("<BII")
+LANE_HEADER = struct.Struct("<BB")
+KEYFRAME, DELTA = 0, 1
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard")
+
+
+def quantize(snapshot):
+    """Converts a sensor snapshot into the tuple of integers sent on the wire."""
+    values = []
+    for (key, scale, _), (low, high) in zip(FIELDS, FIELD_LIMITS):
+        values.append(max(low, min(int(round((snapshot.get(key) or 0) * scale)), high)))
+    return tuple(values)
+
+
+def encode_frame(base_lanes, lanes, base_version, version):
+    """
+    Encodes the changes from base_lanes to lanes.
+    :param base_lanes: Lane state the client already has ({} for a keyframe).
+    :param lanes: Current lane state {lane id: quantized tuple}.
+    """
+    parts = [FRAME_HEADER.pack(DELTA if base_lanes else KEYFRAME, base_version, version)]
+    for lane_id, values in lanes.items():
+        base = base_lanes.get(lane_id)
+        mask = 0
+        for i, value in enumerate(values):
+            if base is None or base[i] != value:
+                mask |= 1 << i
+        if not mask:
+            continue
+        parts.append(LANE_HEADER.pack(lane_id, mask))
+        parts.extend(FIELD_STRUCTS[i].pack(value) for i, value in enumerate(values) if mask & (1 << i))
+    return b"".join(parts)
+
+
+def decode_frame(payload, lanes):
+    """
+    Applies a frame to a client-side lane dictionary {lane id: {field: value}} (mirrors dashboard/index.html).
+    :return: (frame type, base version, version)
+    """
+    frame_type, base_version, version = FRAME_HEADER.unpack_from(payload, 0)
+    offset = FRAME_HEADER.size
+    while offset < len(payload):
+        lane_id, mask = LANE_HEADER.unpack_from(payload, offset)
+        offset += LANE_HEADER.size
+        lane = lanes.setdefault(lane_id, {key: 0 for key, _, _ in FIELDS})
+        for i, (key, scale, _) in enumerate(FIELDS):
+            if mask & (1 << i):
+                lane[key] = FIELD_STRUCTS[i].unpack_from(payload, offset)[0] / scale
+                offset += FIELD_STRUCTS[i].size
+    return frame_type, base_version, version
+
+
+def websocket_accept(key):
+    """Computes the Sec-WebSocket-Accept header for a client key."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def websocket_frame(payload, opcode=0x2):
+    """Wraps a payload in an unmasked server-to-client WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class DashboardState:
+    """Versioned lane state; a new version (and a new immutable lanes dict) is created only on change."""
+
+    def __init__(self):
+        self.version = 0
+        self.lanes = {}
+
+    def update(self, snapshots):
+        """
+        Applies sensor snapshots.
+        :param snapshots: {lane id: sensor dictionary}
+        :return: True if anything visible changed.
+        """
+        lanes = None
+        for lane_id, snapshot in snapshots.items():
+            values = quantize(snapshot)
+            if self.lanes.get(lane_id) != values:
+                if lanes is None:
+                    lanes = dict(self.lanes)
+                lanes[lane_id] = values
+        if lanes is None:
+            return False
+        self.lanes = lanes
+        self.version += 1
+        return True
+
+
+class DashboardClient:
+    """A connected WebSocket client and the lane state it was last sent."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.version = 0
+        self.lanes = {}
+        self.skipped = 0  # Ticks skipped because the client was not draining its socket
+
+
+class DashboardServer:
+    """Serves the static dashboard and fans out delta-encoded lane updates over WebSocket at a capped rate."""
+
+    def __init__(self, source, host=DASHBOARD_HOST, port=DASHBOARD_PORT, max_rate_hz=DASHBOARD_MAX_RATE_HZ,
+                 buffer_limit=DASHBOARD_CLIENT_BUFFER_LIMIT, max_client_frame=DASHBOARD_MAX_CLIENT_FRAME):
+        """
+        Initializes the server.
+        :param source: Callable returning {lane id: sensor dictionary}; polled once per tick.
+        :param max_rate_hz: Upper bound on frames per second sent to each client.
+        :param buffer_limit: Bytes of unsent data above which a client is skipped (its updates coalesce).
+        :param max_client_frame: Largest client frame payload accepted; a larger frame closes the connection (1009).
+        """
+        self.source = source
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / max_rate_hz
+        self.buffer_limit = buffer_limit
+        self.max_client_frame = max_client_frame
+        self.state = DashboardState()
+        self.clients = set()
+        self.loop = None
+        self.server = None
+        self.shutdown = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.stats = {"frames": 0, "bytes": 0, "encodes": 0, "coalesced": 0, "tick_cpu_s": 0.0, "ticks": 0}
+
+    def start(self):
+        """Runs the server on its own thread and event loop; returns once it is listening."""
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), name="dashboard", daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stops the server from any thread."""
+        if self.loop and self.shutdown:
+            try:
+                self.loop.call_soon_threadsafe(self.shutdown.set)
+            except RuntimeError:
+                pass  # Event loop already finished
+        if self.thread:
+            self.thread.join(timeout)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.shutdown = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"📺 Dashboard serving on http://{self.host}:{self.port}/")
+        self.ready.set()
+
+        broadcaster = asyncio.create_task(self.broadcast_loop())
+        try:
+            await self.shutdown.wait()
+        finally:
+            broadcaster.cancel()
+            self.server.close()
+            for client in list(self.clients):
+                client.writer.close()
+            logger.info("📺 Dashboard stopped")
+
+    async def broadcast_loop(self):
+        next_tick = self.loop.time()
+        while True:
+            now = self.loop.time()
+            if now - next_tick > self.interval:
+                next_tick = now  # After a stall skip the missed ticks instead of sending them back to back
+            next_tick += self.interval
+            self.tick()
+            await asyncio.sleep(max(0.0, next_tick - self.loop.time()))
+
+    def tick(self):
+        """Polls the source once and sends each ready client one frame covering everything it missed."""
+        cpu_start = time.thread_time()
+        try:
+            self.state.update(self.source())
+        except Exception as e:
+            logger.error(f"❌ Dashboard source failed: {e}")
+
+        state = self.state
+        frames = {}  # Client base version -> encoded frame, shared by clients at the same version
+        for client in self.clients:
+            if client.version == state.version:
+                continue
+            if client.writer.transport.get_write_buffer_size() > self.buffer_limit:
+                client.skipped += 1
+                self.stats["coalesced"] += 1
+                continue
+
+            frame = frames.get(client.version)
+            if frame is None:
+                frame = frames[client.version] = websocket_frame(encode_frame(client.lanes, state.lanes, client.version, state.version))
+                self.stats["encodes"] += 1
+            client.writer.write(frame)
+            client.version, client.lanes = state.version, state.lanes
+            self.stats["frames"] += 1
+            self.stats["bytes"] += len(frame)
+
+        self.stats["ticks"] += 1
+        self.stats["tick_cpu_s"] += time.thread_time() - cpu_start
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        lines = request.decode("latin-1").split("\r\n")
+        method, path, _ = (lines[0].split(" ") + ["", "", ""])[:3]
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if method != "GET":
+            await self.respond(writer, "405 Method Not Allowed", b"", "text/plain")
+        elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers:
+            await self.handle_websocket(reader, writer, headers["sec-websocket-key"])
+        elif path in ("/", "/index.html"):
+            with open(os.path.join(STATIC_DIR, "index.html"), "rb") as f:
+                await self.respond(writer, "200 OK", f.read(), "text/html; charset=utf-8")
+        else:
+            await self.respond(writer, "404 Not Found", b"not found", "text/plain")
+
+    async def respond(self, writer, status, body, content_type):
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_websocket(self, reader, writer, key):
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n".encode()
+        )
+        # A small kernel send buffer makes a stalled client show up in the transport buffer quickly,
+        # so it gets coalesced updates instead of a backlog of stale frames
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.buffer_limit)
+
+        client = DashboardClient(writer)
+        self.clients.add(client)
+        logger.info(f"📺 Dashboard client connected ({len(self.clients)} total)")
+        try:
+            await self.read_client_frames(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, or the server is shutting down
+        finally:
+            self.clients.discard(client)
+            writer.close()
+            logger.info(f"📺 Dashboard client disconnected ({len(self.clients)} total)")
+
+    async def read_client_frames(self, reader, writer):
+        """Consumes client frames: answers pings, returns on close. Other messages are ignored.
+        Clients only send control and small text frames, so a frame above max_client_frame is refused
+        with close code 1009 (message too big) before its payload is read."""
+        while True:
+            first, second = await reader.readexactly(2)
+            opcode, length = first & 0x0F, second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await reader.readexactly(8))[0]
+            if length > self.max_client_frame:
+                logger.warning(f"⚠️ Dashboard client sent a {length} byte frame (limit {self.max_client_frame}), closing")
+                writer.write(websocket_frame(struct.pack("!H", 1009), opcode=0x8))
+                return
+            mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+
+            if opcode == 0x8:  # Close
+                writer.write(websocket_frame(payload[:2], opcode=0x8))
+                return
+            if opcode == 0x9:  # Ping
+                writer.write(websocket_frame(payload, opcode=0xA))
+
+
+def local_lane_source(sensor_data, lane_id=LANE_ID):
+    """Builds a dashboard source that publishes this process's sensor state as one lane."""
+    return lambda: {lane_id: sensor_data}
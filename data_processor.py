@@ -1,18 +1,67 @@
-import time
 import logging
+import threading
+from clock import system_clock
 from logger_config import logger
+from config import RSC_SENSOR_STRIDES, RSC_SENSOR_DISTANCE, RSC_SENSOR_TIMEOUT_S
 
-# Internal state
+# Internal state; written from the HRM callback thread and the ANT+ prepare thread, always under metrics_lock
+metrics_lock = threading.Lock()
 distance_m = 0
 stride_count = 0
-last_time = time.time()
+last_time = system_clock.time()
 
-def compute_metrics(sensor_data):
-    """Computes distance, elevation gain, and formats ANT+ messages."""
-    global distance_m, stride_count, last_time
+# RSC sensor state: last total distance, and when the sensor last supplied strides / distance
+sensor_total_m = None
+sensor_strides_time = float("-inf")
+sensor_distance_time = float("-inf")
+
+def reset_metrics(clock=system_clock):
+    """Clears the accumulated distance and strides and restarts integration at the clock's current time."""
+    global distance_m, stride_count, last_time, sensor_total_m, sensor_strides_time, sensor_distance_time
+    with metrics_lock:
+        distance_m = 0
+        stride_count = 0
+        last_time = clock.time()
+        sensor_total_m = None
+        sensor_strides_time = sensor_distance_time = float("-inf")
+
+def add_sensor_distance(total_distance_m, stride_length_m=None, clock=system_clock, moving=True,
+                        use_strides=RSC_SENSOR_STRIDES, use_distance=RSC_SENSOR_DISTANCE):
+    """
+    Counts strides (and optionally distance) from an RSC sensor's Total Distance and Stride Length fields.
+    While the sensor keeps reporting (RSC_SENSOR_TIMEOUT_S), compute_metrics() stops estimating them.
+    A total that goes backwards (sensor reset or reconnect) only sets a new baseline.
+    :param total_distance_m: Total distance reported by the sensor in meters.
+    :param stride_length_m: Stride length reported with it in meters; strides are counted as distance / stride length.
+    :param moving: False while the session is auto-paused: the baseline moves, nothing is counted.
+    :param use_strides: Count strides from the sensor (otherwise they are integrated from cadence).
+    :param use_distance: Take distance from the sensor (otherwise it is integrated from treadmill speed).
+    """
+    global distance_m, stride_count, sensor_total_m, sensor_strides_time, sensor_distance_time
+
+    now = clock.time()
+    with metrics_lock:
+        previous, sensor_total_m = sensor_total_m, total_distance_m
+        if use_strides and stride_length_m:
+            sensor_strides_time = now
+        if use_distance:
+            sensor_distance_time = now
+        if previous is None or total_distance_m < previous or not moving:
+            return
 
-    elapsed_time = time.time() - last_time
-    last_time = time.time()
+        step = total_distance_m - previous
+        if use_strides and stride_length_m:
+            stride_count += step / stride_length_m
+        if use_distance:
+            distance_m += step
+
+def compute_metrics(sensor_data, clock=system_clock, moving=True):
+    """
+    Computes distance, elevation gain, and formats ANT+ messages.
+    :param clock: Time source the elapsed time is measured with (a VirtualClock in simulations).
+    :param moving: False while the session is auto-paused: distance and strides are not integrated.
+    """
+    global distance_m, stride_count, last_time
 
     # Ensure values are valid
     speed_mps = sensor_data.get("speed", 0.0)  # Default to 0 if missing
@@ -20,24 +69,32 @@ def compute_metrics(sensor_data):
     incline_pct = sensor_data.get("incline", 0.0)  # Default to 0
     heart_rate = sensor_data.get("heart_rate", 0)  # Default to 0
 
-    # Update distance
-    distance_m += speed_mps * elapsed_time
+    now = clock.time()
+    with metrics_lock:
+        elapsed_time = now - last_time if moving else 0.0
+        last_time = now
+
+        # Update distance, unless the RSC sensor supplies it (see add_sensor_distance)
+        if now - sensor_distance_time > RSC_SENSOR_TIMEOUT_S:
+            distance_m += speed_mps * elapsed_time
 
-    # Simulated stride count
-    stride_count += (cadence_spm / 60) * elapsed_time if cadence_spm else 0
+        # Stride count: counted from the RSC sensor, or estimated from cadence without it
+        if now - sensor_strides_time > RSC_SENSOR_TIMEOUT_S:
+            stride_count += (cadence_spm / 60) * elapsed_time if cadence_spm else 0
+        distance, strides = distance_m, stride_count
 
     # Compute elevation gain (ensure no division errors)
     elevation_gain = (speed_mps * elapsed_time * incline_pct) / 100 if incline_pct else 0
 
     # Log only if debug is enabled
     if logger.isEnabledFor(logging.DEBUG):
-        logger.debug(f"Computed Metrics -> Distance: {distance_m:.2f} m, "
-                     f"Strides: {stride_count:.1f}, "
+        logger.debug(f"Computed Metrics -> Distance: {distance:.2f} m, "
+                     f"Strides: {strides:.1f}, "
                      f"Elevation Gain: {elevation_gain:.2f} m")
 
     return {
-        "distance": distance_m,
-        "stride_count": stride_count,
+        "distance": distance,
+        "stride_count": strides,
         "elevation_gain": elevation_gain,
         "heart_rate": heart_rate,
         "speed": speed_mps,
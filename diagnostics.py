@@ -0,0 +1,268 @@
+import os
+import re
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+from logger_config import logger
+from config import FOOTPOD_PERIOD, DIAG_INTERVAL_S, DIAG_LOOP_PROBE_INTERVAL_S, DIAG_LOOP_LAG_WARN_MS
+from config import DIAG_THREADS_PER_NAME_WARN, DIAG_RSS_GROWTH_WARN_MB, DIAG_ANT_JITTER_WARN_MS
+
+ANT_TX_PERIOD_S = FOOTPOD_PERIOD / 32768  # ANT channel period is in 1/32768 s units
+
+
+class IntervalTracker:
+    """Measures the interval between calls to tick(), e.g. ANT+ TX callbacks, and its deviation from the expected period."""
+
+    def __init__(self, expected_s, capacity=4096):
+        """
+        Initializes the tracker.
+        :param expected_s: Nominal interval between ticks in seconds.
+        :param capacity: Deviations kept per window for the percentile distribution (the newest win).
+        """
+        self.expected_s = expected_s
+        self.last = None
+        self.lock = threading.Lock()
+        self.jitter = array("d", bytes(8 * capacity))  # Preallocated ring of |interval - expected|
+        self._reset()
+
+    def _reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.interval_max = 0.0
+        self.jitter_max = 0.0
+
+    def tick(self):
+        """Records one event; cheap enough to call from the ANT+ callback."""
+        now = time.perf_counter()
+        with self.lock:
+            if self.last is not None:
+                interval = now - self.last
+                jitter = abs(interval - self.expected_s)
+                self.jitter[self.count % len(self.jitter)] = jitter
+                self.count += 1
+                self.total += interval
+                self.interval_max = max(self.interval_max, interval)
+                self.jitter_max = max(self.jitter_max, jitter)
+            self.last = now
+
+    def take(self):
+        """Returns interval statistics (rate, jitter percentiles and maximum) since the previous take() and starts a new window."""
+        with self.lock:
+            jitter = sorted(self.jitter[:min(self.count, len(self.jitter))])
+            stats = {
+                "count": self.count,
+                "rate_hz": self.count / self.total if self.total else 0.0,
+                "interval_max_ms": self.interval_max * 1000,
+                "jitter_max_ms": self.jitter_max * 1000,
+            }
+            self._reset()
+        for percentile in (50, 95, 99):
+            stats[f"jitter_p{percentile}_ms"] = jitter[min(len(jitter) - 1, len(jitter) * percentile // 100)] * 1000 if jitter else 0.0
+        return stats
+
+
+# Fed by the TX callback of ant_node.ManagedAntNode
+ant_tx_intervals = IntervalTracker(ANT_TX_PERIOD_S)
+
+
+class LoopLagProbe:
+    """Schedules a timer on an asyncio loop and measures how late it fires (event-loop lag)."""
+
+    def __init__(self, loop, interval=DIAG_LOOP_PROBE_INTERVAL_S):
+        self.loop = loop
+        self.interval = interval
+        self.expected = None
+        self.handle = None
+        self.lag_max = 0.0
+        self.lag_last = 0.0
+        loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        self.expected = self.loop.time() + self.interval
+        self.handle = self.loop.call_later(self.interval, self._fire)
+
+    def _fire(self):
+        self.lag_last = max(0.0, self.loop.time() - self.expected)
+        self.lag_max = max(self.lag_max, self.lag_last)
+        self._schedule()
+
+    @property
+    def alive(self):
+        return not self.loop.is_closed()
+
+    def take(self):
+        """Returns the worst lag (ms) since the previous take()."""
+        lag_max, self.lag_max = self.lag_max, 0.0
+        return lag_max * 1000
+
+    def cancel(self):
+        if self.handle and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self.handle.cancel)
+            except RuntimeError:
+                pass  # Loop closed meanwhile
+
+
+def thread_census():
+    """Counts live threads by name; numbered default names ("Thread-12 (run)") are grouped together."""
+    return dict(Counter(re.sub(r"^Thread-\d+", "Thread", t.name) for t in threading.enumerate()))
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux /proc), falling back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def top_allocations(limit=10):
+    """
+    Returns the top allocation sites as (location, size MB, count).
+    Calls alternate: the first one starts tracemalloc and returns nothing, the second one reports the allocations
+    made since then and stops tracing again, so its overhead never stays on the ANT+ TX path.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        logger.info("🩺 tracemalloc started; report again later to see allocation growth (tracing then stops)")
+        return []
+    try:
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+    finally:
+        tracemalloc.stop()
+        logger.info("🩺 tracemalloc stopped")
+    return [(str(stat.traceback[0]), stat.size / (1024 * 1024), stat.count) for stat in stats]
+
+
+class HealthMonitor:
+    """Periodically samples runtime health, logs a compact line and warns when thresholds are crossed."""
+
+    def __init__(self, loops=dict, gauges=None, intervals=None, interval=DIAG_INTERVAL_S,
+                 loop_lag_warn_ms=DIAG_LOOP_LAG_WARN_MS, threads_per_name_warn=DIAG_THREADS_PER_NAME_WARN,
+                 rss_growth_warn_mb=DIAG_RSS_GROWTH_WARN_MB, jitter_warn_ms=DIAG_ANT_JITTER_WARN_MS):
+        """
+        Initializes the monitor.
+        :param loops: Callable returning {name: asyncio loop}; new loops (e.g. after a BLE respawn) are probed automatically.
+        :param gauges: {name: callable returning a number}, e.g. the FIT record count.
+        :param intervals: {name: IntervalTracker}; defaults to the ANT+ TX tracker.
+        :param interval: Seconds between samples.
+        """
+        self.loops = loops
+        self.gauges = gauges or {}
+        self.intervals = intervals if intervals is not None else {"ant_tx": ant_tx_intervals}
+        self.interval = interval
+        self.loop_lag_warn_ms = loop_lag_warn_ms
+        self.threads_per_name_warn = threads_per_name_warn
+        self.rss_growth_warn_mb = rss_growth_warn_mb
+        self.jitter_warn_ms = jitter_warn_ms
+
+        self.probes = {}  # Loop name -> LoopLagProbe
+        self.rss_baseline = rss_mb()
+        self.last = None
+        self.lock = threading.Lock()  # sample() runs on the diagnostics thread; stop() and reports may overlap it
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Starts periodic sampling on a background thread."""
+        self.thread = threading.Thread(target=self._run, name="diagnostics", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+        with self.lock:
+            for probe in self.probes.values():
+                probe.cancel()
+
+    def _run(self):
+        self._attach_probes()
+        while not self.stop_event.wait(self.interval):
+            try:
+                snapshot = self.sample()
+            except Exception as e:
+                logger.error(f"❌ Health sample failed: {e}")
+                continue
+            logger.info(self.format_line(snapshot))
+            for warning in snapshot["warnings"]:
+                logger.warning(f"⚠️ Health: {warning}")
+
+    def _attach_probes(self):
+        loops = self.loops()
+        for name, probe in list(self.probes.items()):
+            if loops.get(name) is not probe.loop:
+                probe.cancel()
+                del self.probes[name]
+        for name, loop in loops.items():
+            if name not in self.probes and loop is not None and not loop.is_closed():
+                self.probes[name] = LoopLagProbe(loop)
+
+    def sample(self):
+        """Takes a sample (resetting the per-window maxima) and returns it as a snapshot dictionary."""
+        with self.lock:
+            loop_lag = {name: probe.take() for name, probe in self.probes.items() if probe.alive}
+            self._attach_probes()
+
+            rss = rss_mb()
+            snapshot = {
+                "time": time.time(),
+                "loop_lag_ms": loop_lag,
+                "threads": thread_census(),
+                "rss_mb": rss,
+                "rss_growth_mb": rss - self.rss_baseline,
+                "intervals": {name: tracker.take() for name, tracker in self.intervals.items()},
+                "gauges": {name: gauge() for name, gauge in self.gauges.items()},
+            }
+            snapshot["warnings"] = self._check(snapshot)
+            self.last = snapshot
+        return snapshot
+
+    def snapshot(self):
+        """Returns the most recent sample, taking one if none exists yet."""
+        return self.last or self.sample()
+
+    def _check(self, snapshot):
+        warnings = []
+        for name, lag in snapshot["loop_lag_ms"].items():
+            if lag > self.loop_lag_warn_ms:
+                warnings.append(f"{name} event loop lagged {lag:.0f} ms")
+        for name, count in snapshot["threads"].items():
+            if count > self.threads_per_name_warn:
+                warnings.append(f"{count} threads named {name!r} (leaked respawns?)")
+        if snapshot["rss_growth_mb"] > self.rss_growth_warn_mb:
+            warnings.append(f"RSS grew {snapshot['rss_growth_mb']:.1f} MB since start")
+        for name, stats in snapshot["intervals"].items():
+            if stats["jitter_max_ms"] > self.jitter_warn_ms:
+                warnings.append(f"{name} interval jitter {stats['jitter_max_ms']:.0f} ms")
+        return warnings
+
+    @staticmethod
+    def format_line(snapshot):
+        """Formats a snapshot as one compact log line."""
+        parts = [f"lag {name}={lag:.1f}ms" for name, lag in sorted(snapshot["loop_lag_ms"].items())]
+        parts.append(f"threads={sum(snapshot['threads'].values())}")
+        parts.append(f"rss={snapshot['rss_mb']:.1f}MB ({snapshot['rss_growth_mb']:+.1f})")
+        for name, stats in snapshot["intervals"].items():
+            parts.append(f"{name}={stats['rate_hz']:.2f}Hz jitter p50/p99/max="
+                         f"{stats['jitter_p50_ms']:.1f}/{stats['jitter_p99_ms']:.1f}/{stats['jitter_max_ms']:.1f}ms")
+        parts.extend(f"{name}={value}" for name, value in snapshot["gauges"].items())
+        return "🩺 Health: " + " | ".join(parts)
+
+    def log_report(self, allocations=10):
+        """
+        Logs the latest snapshot, the current thread census and the top allocation sites (on demand, e.g. SIGUSR1).
+        The periodic window is not consumed, so the next health line still covers its worst jitter and lag.
+        """
+        snapshot = self.snapshot()
+        logger.info(self.format_line(snapshot))
+        logger.info(f"🩺 Threads: {', '.join(f'{name} x{count}' for name, count in sorted(thread_census().items()))}")
+        for location, size_mb, count in top_allocations(allocations):
+            logger.info(f"🩺 {size_mb:8.2f} MB {count:8d} blocks  {location}")
+        for warning in snapshot["warnings"]:
+            logger.warning(f"⚠️ Health: {warning}")
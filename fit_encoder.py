@@ -0,0 +1,283 @@
+import struct
+from datetime import datetime, timezone
+
+# FIT timestamps count seconds from 1989-12-31 00:00:00 UTC
+FIT_EPOCH_OFFSET = 631065600
+
+# FIT base types: (type byte, struct format, invalid value, largest valid value); lowercase formats are signed
+ENUM = (0x00, "B", 0xFF, 0xFE)
+UINT8 = (0x02, "B", 0xFF, 0xFE)
+SINT16 = (0x83, "h", 0x7FFF, 0x7FFE)
+UINT16 = (0x84, "H", 0xFFFF, 0xFFFE)
+UINT32 = (0x86, "I", 0xFFFFFFFF, 0xFFFFFFFE)
+UINT32Z = (0x8C, "I", 0x00000000, 0xFFFFFFFF)
+
+# Global message definitions: name -> (global message number, [(field name, field number, base type, scale, count)])
+MESSAGES = {
+    "file_id": (0, [
+        ("type", 0, ENUM, 1, 1),
+        ("manufacturer", 1, UINT16, 1, 1),
+        ("product", 2, UINT16, 1, 1),
+        ("serial_number", 3, UINT32Z, 1, 1),
+        ("time_created", 4, UINT32, 1, 1),
+    ]),
+    "record": (20, [
+        ("timestamp", 253, UINT32, 1, 1),
+        ("heart_rate", 3, UINT8, 1, 1),
+        ("cadence", 4, UINT8, 1, 1),
+        ("distance", 5, UINT32, 100, 1),
+        ("speed", 6, UINT16, 1000, 1),
+        ("grade", 9, SINT16, 100, 1),  # Treadmill incline in %
+    ]),
+    "hrv": (78, [
+        ("time", 0, UINT16, 1000, 5),
+    ]),
+    "event": (21, [
+        ("timestamp", 253, UINT32, 1, 1),
+        ("event", 0, ENUM, 1, 1),
+        ("event_type", 1, ENUM, 1, 1),
+        ("data", 3, UINT32, 1, 1),
+    ]),
+    "lap": (19, [
+        ("message_index", 254, UINT16, 1, 1),
+        ("timestamp", 253, UINT32, 1, 1),
+        ("event", 0, ENUM, 1, 1),
+        ("event_type", 1, ENUM, 1, 1),
+        ("start_time", 2, UINT32, 1, 1),
+        ("total_elapsed_time", 7, UINT32, 1000, 1),
+        ("total_timer_time", 8, UINT32, 1000, 1),
+        ("total_distance", 9, UINT32, 100, 1),
+        ("avg_speed", 13, UINT16, 1000, 1),
+        ("max_speed", 14, UINT16, 1000, 1),
+        ("avg_heart_rate", 15, UINT8, 1, 1),
+        ("max_heart_rate", 16, UINT8, 1, 1),
+        ("avg_cadence", 17, UINT8, 1, 1),
+        ("total_ascent", 21, UINT16, 1, 1),
+        ("lap_trigger", 24, ENUM, 1, 1),
+        ("sport", 25, ENUM, 1, 1),
+        ("sub_sport", 39, ENUM, 1, 1),
+    ]),
+    "session": (18, [
+        ("message_index", 254, UINT16, 1, 1),
+        ("timestamp", 253, UINT32, 1, 1),
+        ("event", 0, ENUM, 1, 1),
+        ("event_type", 1, ENUM, 1, 1),
+        ("start_time", 2, UINT32, 1, 1),
+        ("sport", 5, ENUM, 1, 1),
+        ("sub_sport", 6, ENUM, 1, 1),
+        ("total_elapsed_time", 7, UINT32, 1000, 1),
+        ("total_timer_time", 8, UINT32, 1000, 1),
+        ("total_distance", 9, UINT32, 100, 1),
+        ("avg_speed", 14, UINT16, 1000, 1),
+        ("max_speed", 15, UINT16, 1000, 1),
+        ("avg_heart_rate", 16, UINT8, 1, 1),
+        ("max_heart_rate", 17, UINT8, 1, 1),
+        ("avg_cadence", 18, UINT8, 1, 1),
+        ("total_ascent", 22, UINT16, 1, 1),
+        ("first_lap_index", 25, UINT16, 1, 1),
+        ("num_laps", 26, UINT16, 1, 1),
+        ("trigger", 28, ENUM, 1, 1),
+    ]),
+    "activity": (34, [
+        ("timestamp", 253, UINT32, 1, 1),
+        ("total_timer_time", 0, UINT32, 1000, 1),
+        ("num_sessions", 1, UINT16, 1, 1),
+        ("type", 2, ENUM, 1, 1),
+        ("event", 3, ENUM, 1, 1),
+        ("event_type", 4, ENUM, 1, 1),
+    ]),
+}
+
+FILE_TYPES = {"activity": 4}
+EVENTS = {"timer": 0, "session": 8, "lap": 9, "activity": 26}
+EVENT_TYPES = {"start": 0, "stop": 1, "stop_all": 4}
+TIMER_TRIGGERS = {"manual": 0, "auto": 1, "fitness_equipment": 2}
+LAP_TRIGGERS = {"manual": 0, "time": 1, "distance": 2, "session_end": 7, "fitness_equipment": 8}
+SPORT_RUNNING = 1
+SUB_SPORT_TREADMILL = 1
+MANUFACTURER_DEVELOPMENT = 255
+
+# CRC-16 nibble table from the FIT protocol specification
+CRC_TABLE = [
+    0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+    0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400,
+]
+
+
+def fit_crc(data, crc=0):
+    """Computes the FIT CRC-16 of a byte sequence."""
+    for byte in data:
+        tmp = CRC_TABLE[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ CRC_TABLE[byte & 0xF]
+        tmp = CRC_TABLE[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ CRC_TABLE[(byte >> 4) & 0xF]
+    return crc
+
+
+def to_fit_timestamp(value):
+    """Converts a UNIX timestamp or datetime to a FIT timestamp."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.timestamp()
+    return int(value) - FIT_EPOCH_OFFSET
+
+
+class FitEncoder:
+    """Minimal FIT activity file writer (fitdecode and fitparse can only read FIT files)."""
+
+    HEADER_SIZE = 14
+    PROTOCOL_VERSION = 0x20
+    PROFILE_VERSION = 2132
+
+    def __init__(self, fileobj):
+        """
+        Initializes the encoder.
+        :param fileobj: Binary file object the FIT file is written to on finish_file().
+        """
+        self.fileobj = fileobj
+        self.body = bytearray()
+        self.local_types = {}  # Message name -> local message type with a written definition
+        self.packers = {}
+
+    def start_file(self):
+        """Resets the encoder for a new file."""
+        self.body.clear()
+        self.local_types.clear()
+
+    def write_file_id(self, type="activity", time_created=None, manufacturer=MANUFACTURER_DEVELOPMENT, product=0, serial_number=None):
+        """Writes the mandatory file_id message."""
+        self.write_message(
+            "file_id",
+            type=FILE_TYPES.get(type, type),
+            manufacturer=manufacturer,
+            product=product,
+            serial_number=serial_number,
+            time_created=to_fit_timestamp(time_created or datetime.now(timezone.utc)),
+        )
+
+    def write_record(self, record):
+        """
+        Writes a record message.
+        :param record: Dictionary with a UNIX timestamp and optional speed (m/s), distance (m), cadence, heart_rate
+                       and incline (%, written as the FIT grade field).
+        """
+        values = dict(record)
+        values["timestamp"] = to_fit_timestamp(record["timestamp"])
+        values["grade"] = record.get("incline")
+        self.write_message("record", **values)
+
+    def write_timer_event(self, timestamp, event_type, trigger="manual"):
+        """
+        Writes a timer event; "stop_all" / "start" pairs mark pauses, so moving time excludes them.
+        :param timestamp: UNIX timestamp.
+        :param event_type: "start", "stop" or "stop_all".
+        :param trigger: Timer trigger ("manual", "auto" or "fitness_equipment").
+        """
+        self.write_message("event", timestamp=to_fit_timestamp(timestamp), event=EVENTS["timer"],
+                           event_type=EVENT_TYPES[event_type], data=TIMER_TRIGGERS[trigger])
+
+    def write_lap(self, lap, message_index):
+        """
+        Writes a lap message.
+        :param lap: Dictionary with UNIX start_time and timestamp (lap end), total_elapsed_time and total_timer_time (s),
+                    total_distance (m), optional avg/max speed (m/s), heart rate, avg_cadence, total_ascent (m)
+                    and lap_trigger (name from LAP_TRIGGERS).
+        """
+        values = dict(lap)
+        values.update(
+            message_index=message_index,
+            timestamp=to_fit_timestamp(lap["timestamp"]),
+            start_time=to_fit_timestamp(lap["start_time"]),
+            event=EVENTS["lap"],
+            event_type=EVENT_TYPES["stop"],
+            lap_trigger=LAP_TRIGGERS[lap.get("lap_trigger", "manual")],
+            sport=SPORT_RUNNING,
+            sub_sport=SUB_SPORT_TREADMILL,
+        )
+        self.write_message("lap", **values)
+
+    def write_session(self, session, num_laps):
+        """
+        Writes the session message (and the activity message that closes the file).
+        :param session: Dictionary with the lap fields (see write_lap) for the whole session.
+        :param num_laps: Number of lap messages written before it.
+        """
+        values = dict(session)
+        values.update(
+            message_index=0,
+            timestamp=to_fit_timestamp(session["timestamp"]),
+            start_time=to_fit_timestamp(session["start_time"]),
+            event=EVENTS["session"],
+            event_type=EVENT_TYPES["stop"],
+            sport=SPORT_RUNNING,
+            sub_sport=SUB_SPORT_TREADMILL,
+            first_lap_index=0,
+            num_laps=num_laps,
+            trigger=0,  # Activity end
+        )
+        self.write_message("session", **values)
+        self.write_message("activity", timestamp=values["timestamp"], total_timer_time=session["total_timer_time"],
+                           num_sessions=1, type=0, event=EVENTS["activity"], event_type=EVENT_TYPES["stop"])
+
+    def write_hrv(self, rr_intervals_ms):
+        """
+        Writes RR intervals as hrv messages (up to five beats per message).
+        :param rr_intervals_ms: Sequence of RR intervals in milliseconds.
+        """
+        for start in range(0, len(rr_intervals_ms), 5):
+            chunk = [rr / 1000 for rr in rr_intervals_ms[start:start + 5]]
+            self.write_message("hrv", time=chunk)
+
+    def write_message(self, name, **values):
+        """Writes a data message, emitting its definition message on first use. Unknown keys are ignored."""
+        if name not in self.local_types:
+            self._write_definition(name)
+
+        _, fields = MESSAGES[name]
+        raw = []
+        for field_name, _, (_, type_fmt, invalid, largest), scale, count in fields:
+            value = values.get(field_name)
+            smallest = -largest - 2 if type_fmt.islower() else 0
+            if count == 1:
+                raw.append(self._scale(value, scale, invalid, smallest, largest))
+            else:
+                items = list(value or [])[:count]
+                raw.extend(self._scale(item, scale, invalid, smallest, largest) for item in items)
+                raw.extend([invalid] * (count - len(items)))
+
+        self.body.append(self.local_types[name])
+        self.body += self.packers[name].pack(*raw)
+
+    def finish_file(self):
+        """Writes the file header, collected messages and trailing CRC."""
+        header = struct.pack("<BBHI4s", self.HEADER_SIZE, self.PROTOCOL_VERSION, self.PROFILE_VERSION, len(self.body), b".FIT")
+        header += struct.pack("<H", fit_crc(header))
+        crc = fit_crc(self.body, fit_crc(header))
+        self.fileobj.write(header + bytes(self.body) + struct.pack("<H", crc))
+
+    def _write_definition(self, name):
+        local_type = len(self.local_types)
+        if local_type > 15:
+            raise ValueError("FIT files support at most 16 local message types")
+
+        global_num, fields = MESSAGES[name]
+        field_defs = bytearray()
+        fmt = "<"
+        for _, field_num, (base_type, type_fmt, _, _), _, count in fields:
+            field_defs += bytes([field_num, struct.calcsize(type_fmt) * count, base_type])
+            fmt += type_fmt * count
+
+        self.body.append(0x40 | local_type)
+        self.body += struct.pack("<BBHB", 0, 0, global_num, len(fields))
+        self.body += field_defs
+        self.local_types[name] = local_type
+        self.packers[name] = struct.Struct(fmt)
+
+    @staticmethod
+    def _scale(value, scale, invalid, smallest, largest):
+        if value is None:
+            return invalid
+        return max(smallest, min(int(round(value * scale)), largest))
@@ -1,55 +1,408 @@
-import fitdecode
-import time
+import os
+import shutil
+import threading
+from array import array
 from datetime import datetime
+import numpy as np
+from clock import system_clock
+from fit_encoder import FitEncoder
+from sample_journal import open_session_journal, read_journal, find_unfinished_journals, JOURNAL_SUFFIX
+from split_analysis import compute_splits, moving_time, SPLIT_DISTANCES_M
+from workout_image_generator import generate_workout_image
 from logger_config import logger
+from config import SESSION_HISTORY_DIR, JOURNAL_DIR, SPLIT_UNIT, FIT_LAPS
 
 class FitFileGenerator:
     """Handles FIT file generation for treadmill workouts."""
 
-    def __init__(self, filename="treadmill_workout.fit"):
+    def __init__(self, filename="treadmill_workout.fit", archive_dir=SESSION_HISTORY_DIR, journal_dir=JOURNAL_DIR, clock=system_clock,
+                 lap_mode=FIT_LAPS):
         """
         Initializes FIT file generation.
         :param filename: Name of the output FIT file.
+        :param archive_dir: Directory a timestamped copy is kept in for the session history (None to disable).
+        :param journal_dir: Directory of the crash-recovery sample journal (None to disable).
+        :param clock: Time source records are stamped with.
+        :param lap_mode: "pauses" (a lap per stretch between auto-pauses) or "splits" (a lap per SPLIT_UNIT).
         """
         self.filename = filename
-        self.start_time = int(time.time())
-        self.records = []  # Store records before writing
+        self.archive_dir = archive_dir
+        self.journal_dir = journal_dir
+        self.journal = None  # Opened with the first completed sample
+        self.clock = clock
+        self.lap_mode = lap_mode
+        self.start_time = int(clock.time())
+        self.records = []  # Store records before writing, resampled to one per second
+        self.rr_intervals = array("H")  # RR intervals (ms) for FIT HRV messages
+        self.paused = False
+        self.timer_events = []  # (UNIX time, "stop" | "start") of auto-pauses, in order
+        self.journaled_until = None  # Timestamp of the last journaled record
+        self.lock = threading.Lock()  # add_record() runs on the HRM and FTMS threads; pause()/resume() on the FTMS thread
 
         logger.info(f"📂 FIT File Generation Started: {self.filename}")
 
+    @classmethod
+    def from_journal(cls, journal_path, filename, archive_dir=SESSION_HISTORY_DIR):
+        """Rebuilds a generator from the samples and auto-pause timer events of an unfinished journal."""
+        start_time, records, timer_events = read_journal(journal_path)
+        generator = cls(filename=filename, archive_dir=archive_dir, journal_dir=None)
+        generator.start_time = int(start_time)
+        generator.records = records
+        generator.timer_events = timer_events
+        generator.paused = bool(timer_events) and timer_events[-1][1] == "stop"
+        return generator
+
     def add_record(self, sensor_data):
         """
         Adds a workout data record to the FIT file.
+        Updates within the same second replace each other (last value wins), so the file holds
+        one record per second; each completed second is appended to the sample journal.
         :param sensor_data: Dictionary containing speed, cadence, HR, incline, etc.
         """
-        timestamp = int(time.time())
-
         # Create a FIT data record
         record = {
-            "timestamp": timestamp,
             "speed": sensor_data["speed"],
             "distance": sensor_data.get("distance", 0),
             "cadence": sensor_data["cadence"],
             "heart_rate": sensor_data["heart_rate"],
+            "incline": sensor_data.get("incline", 0.0),
             "elevation_gain": sensor_data.get("elevation", 0)
         }
 
-        self.records.append(record)
+        # The resample decision, the append and the journal write must not interleave between threads
+        with self.lock:
+            if self.paused:
+                return
+            timestamp = record["timestamp"] = int(self.clock.time())
+            if self.records and self.records[-1]["timestamp"] == timestamp:
+                self.records[-1] = record
+            else:
+                if self.records:
+                    self._journal_record(self.records[-1])
+                self.records.append(record)
         logger.debug(f"📡 FIT Record -> {record}")
 
-    def save_fit_file(self):
-        """Writes the collected data to a FIT file."""
+    def _journal_record(self, record):
+        if not self.journal_dir or (self.journaled_until is not None and record["timestamp"] <= self.journaled_until):
+            return  # Already journaled before a pause dropped the records after it
+        if self.journal is None:
+            self.journal = open_session_journal(self.start_time, self.journal_dir)
+        self.journal.append(record)
+        self.journaled_until = record["timestamp"]
+
+    def _journal_timer_event(self, timestamp, kind):
+        if not self.journal_dir:
+            return
+        if self.journal is None:
+            self.journal = open_session_journal(self.start_time, self.journal_dir)
+        self.journal.append_timer_event(timestamp, kind)
+
+    def pause(self, timestamp=None):
+        """
+        Suspends recording (belt auto-pause) and closes the current lap.
+        :param timestamp: UNIX time the belt stopped (defaults to now); samples recorded after it are dropped.
+        """
+        with self.lock:
+            if self.paused:
+                return
+            timestamp = int(self.clock.time() if timestamp is None else timestamp)
+            while self.records and self.records[-1]["timestamp"] > timestamp:
+                self.records.pop()
+            if self.records:
+                self._journal_record(self.records[-1])  # Seal the last kept second ahead of the marker
+            self._journal_timer_event(timestamp, "stop")  # Recovery drops the journaled seconds after it
+            self.paused = True
+            self.timer_events.append((timestamp, "stop"))
+        logger.info(f"⏸️ FIT recording paused, lap {sum(kind == 'stop' for _, kind in self.timer_events)} closed")
+
+    def resume(self, timestamp=None):
+        """Resumes recording after pause(); the next samples start a new lap."""
+        with self.lock:
+            if not self.paused:
+                return
+            self.paused = False
+            timestamp = int(self.clock.time() if timestamp is None else timestamp)
+            self._journal_timer_event(timestamp, "start")
+            self.timer_events.append((timestamp, "start"))
+        logger.info("▶️ FIT recording resumed")
+
+    def timer_segments(self):
+        """Returns the (start, end) UNIX times of the recorded stretches between auto-pauses."""
+        if not self.records:
+            return []
+        first, last = self.records[0]["timestamp"], self.records[-1]["timestamp"]
+        segments, start = [], first
+        for timestamp, kind in self.timer_events:
+            if kind == "stop" and start is not None:
+                if timestamp >= start:
+                    segments.append((start, min(timestamp, last)))
+                start = None
+            elif kind == "start" and start is None:
+                start = max(timestamp, first)
+        if start is not None and start <= last:
+            segments.append((start, last))
+        return segments
+
+    def build_splits(self, unit=SPLIT_UNIT, series=None):
+        """Returns the per-split arrays (see split_analysis.compute_splits) for a unit in SPLIT_DISTANCES_M."""
+        if len(self.records) < 2:
+            return {}
+        return compute_splits(self.build_series() if series is None else series, SPLIT_DISTANCES_M[unit])
+
+    def build_laps(self, unit=SPLIT_UNIT, series=None):
+        """
+        Builds the FIT laps according to lap_mode: one per split or one per stretch between auto-pauses.
+        The last lap ends with the session.
+        """
+        if self.lap_mode == "splits":
+            return self._split_laps(unit, series)
+        return self._pause_laps()
+
+    def _split_laps(self, unit, series):
+        splits = self.build_splits(unit, series)
+        if not splits:
+            return []
+        first = self.records[0]["timestamp"]
+        count = len(splits["distance"])
+
+        def optional(value):
+            return None if np.isnan(value) else round(value)
+
+        return [{
+            "start_time": first + splits["start_time"][i],
+            "timestamp": first + splits["end_time"][i],
+            "total_elapsed_time": splits["elapsed_time"][i],
+            "total_timer_time": splits["timer_time"][i],
+            "total_distance": splits["distance"][i],
+            "avg_speed": splits["avg_speed"][i],
+            "avg_heart_rate": optional(splits["avg_heart_rate"][i]),
+            "avg_cadence": optional(splits["avg_cadence"][i]),
+            "total_ascent": splits["climb"][i],
+            "lap_trigger": "session_end" if i == count - 1 else "distance",
+        } for i in range(count)]
+
+    def _pause_laps(self):
+        records, laps = self.records, []
+        segments = self.timer_segments()
+        index = 0
+        previous = records[0] if records else None
+        for number, (start, end) in enumerate(segments):
+            lap_records = []
+            while index < len(records) and records[index]["timestamp"] <= end:
+                if records[index]["timestamp"] >= start:
+                    lap_records.append(records[index])
+                index += 1
+            if not lap_records:
+                continue
+
+            distance = max(lap_records[-1]["distance"] - previous["distance"], 0.0)
+            ascent = 0.0
+            for before, record in zip([previous] + lap_records, lap_records):
+                ascent += max((record["distance"] - before["distance"]) * record.get("incline", 0.0) / 100, 0.0)
+            previous = lap_records[-1]
+
+            heart_rates = [r["heart_rate"] for r in lap_records if r["heart_rate"]]
+            cadences = [r["cadence"] for r in lap_records if r["cadence"]]
+            timer_time = end - start
+            laps.append({
+                "start_time": start,
+                "timestamp": end,
+                "total_elapsed_time": timer_time,
+                "total_timer_time": timer_time,
+                "total_distance": distance,
+                "avg_speed": distance / timer_time if timer_time else 0.0,
+                "max_speed": max(r["speed"] for r in lap_records),
+                "avg_heart_rate": round(sum(heart_rates) / len(heart_rates)) if heart_rates else None,
+                "max_heart_rate": max(heart_rates) if heart_rates else None,
+                "avg_cadence": round(sum(cadences) / len(cadences)) if cadences else None,
+                "total_ascent": ascent,
+                "lap_trigger": "session_end" if number == len(segments) - 1 else "fitness_equipment",
+            })
+        return laps
+
+    def build_session(self, laps, series=None):
+        """Totals of the whole session for the FIT session message."""
+        series = self.build_series() if series is None else series
+        first, last = self.records[0]["timestamp"], self.records[-1]["timestamp"]
+        timer_time = sum(end - start for start, end in self.timer_segments())
+        distance = series["distance"][-1] - series["distance"][0]
+        heart_rates, cadences = series["heart_rate"][series["heart_rate"] > 0], series["cadence"][series["cadence"] > 0]
+        return {
+            "start_time": first,
+            "timestamp": last,
+            "total_elapsed_time": last - first,
+            "total_timer_time": timer_time,
+            "total_distance": distance,
+            "avg_speed": distance / timer_time if timer_time else 0.0,
+            "max_speed": series["speed"].max(),
+            "avg_heart_rate": round(heart_rates.mean()) if len(heart_rates) else None,
+            "max_heart_rate": heart_rates.max() if len(heart_rates) else None,
+            "avg_cadence": round(cadences.mean()) if len(cadences) else None,
+            "total_ascent": sum(lap["total_ascent"] for lap in laps),
+        }
+
+    def add_hrv(self, rr_intervals):
+        """
+        Adds RR intervals to be written as FIT HRV messages.
+        :param rr_intervals: Sequence of RR intervals in milliseconds.
+        """
+        self.rr_intervals.extend(min(int(rr), 0xFFFE) for rr in rr_intervals)
+
+    def build_summary(self):
+        """Summarizes the recorded samples (totals, averages and chart series) for the workout summary image."""
+        if not self.records:
+            return {}
+
+        series = self.build_series()
+        heart_rates = [r["heart_rate"] for r in self.records if r["heart_rate"]]
+        cadences = [r["cadence"] for r in self.records if r["cadence"]]
+        total_elevation = 0.0
+        for previous, record in zip(self.records, self.records[1:]):
+            climbed = (record["distance"] - previous["distance"]) * record.get("incline", 0.0) / 100
+            total_elevation += max(climbed, 0.0)
+
+        return {
+            "distance": self.records[-1]["distance"],
+            "duration": sum(end - start for start, end in self.timer_segments()),  # Moving time, without pauses
+            "elapsed_time": self.records[-1]["timestamp"] - self.records[0]["timestamp"],
+            "avg_heart_rate": round(sum(heart_rates) / len(heart_rates)) if heart_rates else 0,
+            "avg_cadence": round(sum(cadences) / len(cadences)) if cadences else 0,
+            "avg_incline": round(sum(r.get("incline", 0.0) for r in self.records) / len(self.records), 1),
+            "total_elevation": total_elevation,
+            "series": series,
+            "splits": {unit: self.build_splits(unit, series) for unit in SPLIT_DISTANCES_M},
+        }
+
+    def build_series(self):
+        """
+        Returns the recorded samples as arrays for the summary charts and split analysis
+        (time and moving_time in seconds since the first sample).
+        """
+        keys = ("timestamp", "heart_rate", "speed", "incline", "cadence", "distance")
+        columns = {key: np.fromiter((r.get(key) or 0 for r in self.records), dtype=np.float64, count=len(self.records))
+                   for key in keys}
+        columns["moving_time"] = moving_time(columns["timestamp"], self.timer_segments())
+        columns["time"] = columns.pop("timestamp") - self.records[0]["timestamp"]
+        return columns
+
+    def end_workout(self):
+        """
+        Finalizes the session: writes the FIT file to disk, then removes the sample journal.
+        The summary image is rendered separately by write_summary_image(), once the FIT file is safe.
+        :return: FIT file name, or None if nothing was recorded.
+        """
+        if not self.records:
+            logger.warning("⚠️ No workout data recorded, FIT file not written.")
+            if self.journal:
+                self.journal.close(remove=True)
+            return None
+
+        self.save_fit_file(sync=True)  # On disk before the journal that could recover it is removed
+
+        if self.journal:
+            self.journal.close(remove=True)
+        return self.filename
+
+    def write_summary_image(self, summary_path="workout_summary.png"):
+        """
+        Renders the workout summary image (about 1 s at 300 dpi on a Pi).
+        :return: Image path, or None if nothing was recorded.
+        """
+        if not self.records:
+            return None
+        generate_workout_image(self.build_summary(), output_path=summary_path)
+        return summary_path
+
+    def _timer_markers(self, laps):
+        """
+        Timer events and laps as (UNIX time, rank, kind, value), sorted; the rank orders them around
+        the record of the same second (0 before it, 1 is the record itself, 2 and 3 after it).
+        """
+        segments = self.timer_segments()
+        markers = []
+        for number, (start, end) in enumerate(segments):
+            markers.append((start, 0, "start", "manual" if number == 0 else "auto"))
+            markers.append((end, 2, "stop_all", "manual" if number == len(segments) - 1 else "auto"))
+        markers.extend((lap["timestamp"], 3, "lap", number) for number, lap in enumerate(laps))
+        markers.sort(key=lambda marker: marker[:2])
+        return markers
+
+    def save_fit_file(self, sync=False):
+        """
+        Writes the collected data to a FIT file.
+        :param sync: fsync the file before returning, so it survives a power loss right after shutdown.
+        """
         with open(self.filename, "wb") as fitfile:
-            encoder = fitdecode.FitEncoder(fitfile)
+            encoder = FitEncoder(fitfile)
 
             # Start a new session
             encoder.start_file()
             encoder.write_file_id(type="activity", time_created=datetime.utcfromtimestamp(self.start_time))
 
-            # Write records
+            # Write records in time order with the timer events around auto-pauses and the laps
+            series = self.build_series() if self.records else None
+            laps = self.build_laps(series=series) if self.records else []
+            markers = self._timer_markers(laps)
+
+            def write_marker(marker):
+                timestamp, _, kind, value = marker
+                if kind == "lap":
+                    encoder.write_lap(laps[value], value)
+                else:
+                    encoder.write_timer_event(timestamp, kind, value)
+
+            index = 0
             for record in self.records:
+                while index < len(markers) and markers[index][:2] < (record["timestamp"], 1):
+                    write_marker(markers[index])
+                    index += 1
                 encoder.write_record(record)
+            for marker in markers[index:]:
+                write_marker(marker)
+
+            # Write beat-to-beat intervals
+            encoder.write_hrv(self.rr_intervals)
+
+            # Write the session totals
+            if self.records:
+                encoder.write_session(self.build_session(laps, series), len(laps))
 
             encoder.finish_file()
+            if sync:
+                fitfile.flush()
+                os.fsync(fitfile.fileno())
 
         logger.info(f"✅ FIT File Saved: {self.filename}")
+
+        if self.archive_dir:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            archive_path = os.path.join(self.archive_dir, datetime.fromtimestamp(self.start_time).strftime("workout_%Y%m%d_%H%M%S.fit"))
+            shutil.copyfile(self.filename, archive_path)
+            logger.info(f"📚 FIT File Archived: {archive_path}")
+
+
+def recover_unfinished_sessions(journal_dir=JOURNAL_DIR, output_dir=".", archive_dir=SESSION_HISTORY_DIR):
+    """
+    Turns every journal left by a crashed session into a FIT file and summary image, then removes the journal.
+    :return: List of recovered FIT file paths.
+    """
+    recovered = []
+    for path in find_unfinished_journals(journal_dir):
+        stem = "recovered_" + os.path.basename(path)[:-len(JOURNAL_SUFFIX)]
+        try:
+            generator = FitFileGenerator.from_journal(path, os.path.join(output_dir, stem + ".fit"), archive_dir)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Cannot recover journal {path}: {e}")
+            continue
+
+        if generator.records:
+            generator.save_fit_file()
+            generate_workout_image(generator.build_summary(), output_path=os.path.join(output_dir, stem + ".png"))
+            recovered.append(generator.filename)
+            logger.info(f"♻️ Recovered {len(generator.records)} samples from {path} -> {generator.filename}")
+        else:
+            logger.warning(f"⚠️ Journal {path} has no samples, removing it.")
+
+        os.remove(path)
+
+    return recovered
@@ -1,9 +1,75 @@
 import asyncio
 import threading
 import random
+import struct
+from collections import namedtuple
 from bleak import BleakClient, BleakError
+from clock import system_clock
 from logger_config import logger
-from config import BLE_HRM_SENSOR_ADDRESS, MOCK_HRM
+from config import BLE_HRM_SENSOR_ADDRESS, MOCK_HRM, BLE_STOP_TIMEOUT_S
+
+HeartRateMeasurement = namedtuple("HeartRateMeasurement", ["heart_rate", "sensor_contact", "energy_expended", "rr_intervals"])
+RSCMeasurement = namedtuple("RSCMeasurement", ["speed", "cadence", "stride_length", "total_distance", "running"])
+
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+# RSC Measurement layouts by flag bits 0-1 (stride length, total distance present): one unpack_from per notification
+_RSC_LAYOUTS = (struct.Struct("<BHB"), struct.Struct("<BHBH"), struct.Struct("<BHBI"), struct.Struct("<BHBHI"))
+_RR_STRUCTS = {}  # Cached "<nH" structs keyed by RR interval count
+
+def parse_heart_rate_measurement(data):
+    """
+    Decodes a Heart Rate Measurement (0x2A37) notification without copying the payload.
+    :param data: Raw characteristic value (bytes, bytearray or memoryview).
+    :return: HeartRateMeasurement; energy_expended (kJ) is None if absent, rr_intervals are in ms.
+    :raises struct.error, IndexError: If the payload is shorter than its flags announce.
+    """
+    view = memoryview(data)
+    flags = view[0]
+
+    # Bit 0: heart rate value format (UINT8 or UINT16)
+    if flags & 0x01:
+        heart_rate = _UINT16.unpack_from(view, 1)[0]
+        index = 3
+    else:
+        heart_rate = view[1]
+        index = 2
+
+    # Bits 1-2: sensor contact (None if the feature is not supported)
+    sensor_contact = bool(flags & 0x02) if flags & 0x04 else None
+
+    # Bit 3: energy expended present
+    energy_expended = None
+    if flags & 0x08:
+        energy_expended = _UINT16.unpack_from(view, index)[0]
+        index += 2
+
+    # Bit 4: RR intervals present (1/1024 s resolution)
+    rr_intervals = ()
+    if flags & 0x10:
+        count = (len(view) - index) // 2
+        rr_struct = _RR_STRUCTS.get(count)
+        if rr_struct is None:
+            rr_struct = _RR_STRUCTS[count] = struct.Struct(f"<{count}H")
+        rr_intervals = tuple((rr * 1000 + 512) >> 10 for rr in rr_struct.unpack_from(view, index))
+
+    return HeartRateMeasurement(heart_rate, sensor_contact, energy_expended, rr_intervals)
+
+def parse_rsc_measurement(data):
+    """
+    Decodes a Running Speed and Cadence Measurement (0x2A53) notification without copying the payload.
+    :param data: Raw characteristic value (bytes, bytearray or memoryview).
+    :return: RSCMeasurement with speed (m/s), cadence (1/min), stride_length (m) and total_distance (m);
+             the last two are None if absent. running is the walking (False) / running (True) status bit.
+    :raises struct.error: If the payload is shorter than its flags announce.
+    """
+    flags = data[0]
+    present = flags & 0x03  # Bit 0: stride length (1/100 m), bit 1: total distance (1/10 m)
+    fields = _RSC_LAYOUTS[present].unpack_from(data)
+    stride_length = fields[3] / 100 if present & 0x01 else None
+    total_distance = fields[-1] / 10 if present & 0x02 else None
+    # Speed is in 1/256 m/s; bit 2 is the walking (0) or running (1) status
+    return RSCMeasurement(fields[1] / 256, fields[2], stride_length, total_distance, bool(flags & 0x04))
 
 class GarminHRMService:
     """Handles heart rate and cadence from a Garmin HRM OR returns mock data."""
@@ -11,21 +77,55 @@ class GarminHRMService:
     HR_UUID = "00002a37-0000-1000-8000-00805f9b34fb"  # Heart Rate Measurement UUID
     RSC_UUID = "00002a53-0000-1000-8000-00805f9b34fb"  # Running Speed & Cadence UUID
 
-    def __init__(self, hr_callback=None, cadence_callback=None, disconnect_callback=None, connection_event=None):
+    def __init__(self, hr_callback=None, cadence_callback=None, disconnect_callback=None, connection_event=None, rr_callback=None, clock=system_clock, rsc_callback=None):
         self.ble_address = BLE_HRM_SENSOR_ADDRESS
         self.hr_callback = hr_callback
         self.cadence_callback = cadence_callback
+        self.rr_callback = rr_callback
+        self.rsc_callback = rsc_callback  # Receives every RSCMeasurement (stride length, total distance)
         self.disconnect_callback = disconnect_callback
         self.connection_event = connection_event
+        self.clock = clock  # Paces the mock; a VirtualClock replays sessions faster than real time
         self.client = None
 
+        # Lifecycle (set once the service runs in its own event loop)
+        self.loop = None
+        self.task = None
+        self.thread = None
+        self.stopping = False
+
     async def connect_and_listen(self):
-        """Continuously tries to connect to BLE HRM and listens for updates OR mocks data."""
-        if MOCK_HRM:
-            logger.info("🟢 HRM Mocking Enabled - Simulating BLE HRM Data")
-            await self.mock_hrm_data()
-        else:
-            await self.real_hrm_data()
+        """Continuously tries to connect to BLE HRM and listens for updates OR mocks data, until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        if self.stopping:
+            return
+
+        try:
+            if MOCK_HRM:
+                logger.info("🟢 HRM Mocking Enabled - Simulating BLE HRM Data")
+                await self.mock_hrm_data()
+            else:
+                await self.real_hrm_data()
+        except asyncio.CancelledError:
+            logger.info("🛑 Garmin HRM service stopped")
+
+    def stop(self):
+        """Stops the service from any thread. Cancelling the task unsubscribes and disconnects the BLE client."""
+        self.stopping = True
+        if self.loop and self.task:
+            try:
+                self.loop.call_soon_threadsafe(self.task.cancel)
+            except RuntimeError:
+                pass  # Event loop already finished
+
+    async def stop_notifications(self, client):
+        """Unsubscribes from HR and RSC notifications, bounded by BLE_STOP_TIMEOUT_S each."""
+        for uuid in (self.HR_UUID, self.RSC_UUID):
+            try:
+                await asyncio.wait_for(client.stop_notify(uuid), BLE_STOP_TIMEOUT_S)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not stop HRM notifications for {uuid}: {e}")
 
     async def real_hrm_data(self):
         """Handles real HRM BLE communication."""
@@ -43,8 +143,11 @@ class GarminHRMService:
                     await client.start_notify(self.HR_UUID, self.hr_handler)
                     await client.start_notify(self.RSC_UUID, self.cadence_handler)
 
-                    while True:
-                        await asyncio.sleep(1)
+                    try:
+                        while True:
+                            await asyncio.sleep(1)
+                    finally:
+                        await self.stop_notifications(client)
 
             except Exception as e:
                 logger.error(f"❌ BLE HRM connection error: {e}. Retrying in 10 sec...")
@@ -64,9 +167,12 @@ class GarminHRMService:
             if self.cadence_callback:
                 self.cadence_callback(cadence_value)
 
+            if self.rr_callback:
+                self.rr_callback((round(60000 / hr_value),))
+
             logger.info(f"🟢 Mock HRM -> HR: {hr_value} BPM, Cadence: {cadence_value} SPM")
 
-            await asyncio.sleep(1)  # Simulate HRM update every second
+            await self.clock.sleep(1)  # Simulate HRM update every second
 
     def hr_handler(self, sender, data):
         """Handles incoming heart rate data from HRM sensor."""
@@ -75,29 +181,36 @@ class GarminHRMService:
                 logger.warning("⚠️ Invalid HRM data received, ignoring.")
                 return
 
-            heart_rate = data[1]  # HR value is at index 1
+            measurement = parse_heart_rate_measurement(data)
 
             if self.hr_callback:
-                self.hr_callback(heart_rate)
+                self.hr_callback(measurement.heart_rate)
+
+            if measurement.rr_intervals and self.rr_callback:
+                self.rr_callback(measurement.rr_intervals)
 
-            logger.info(f"📡 HRM Update -> HR: {heart_rate} BPM")
+            logger.info(f"📡 HRM Update -> HR: {measurement.heart_rate} BPM, RR: {list(measurement.rr_intervals)} ms")
 
         except Exception as e:
             logger.error(f"❌ Error processing HRM data: {e}")
 
     def cadence_handler(self, sender, data):
-        """Handles incoming cadence data from HRM sensor."""
+        """Handles incoming Running Speed & Cadence data from HRM sensor."""
         try:
             if len(data) < 4:
                 logger.warning("⚠️ Invalid cadence data received, ignoring.")
                 return
 
-            cadence_value = data[3]  # Cadence is at index 3 in RSC message
+            measurement = parse_rsc_measurement(data)
 
             if self.cadence_callback:
-                self.cadence_callback(cadence_value)
+                self.cadence_callback(measurement.cadence)
+
+            if self.rsc_callback:
+                self.rsc_callback(measurement)
 
-            logger.info(f"📡 HRM Update -> Cadence: {cadence_value} SPM")
+            logger.info(f"📡 HRM Update -> Cadence: {measurement.cadence} SPM, Stride: {measurement.stride_length} m, "
+                        f"Distance: {measurement.total_distance} m")
 
         except Exception as e:
             logger.error(f"❌ Error processing cadence data: {e}")
@@ -105,12 +218,16 @@ class GarminHRMService:
 
     def on_disconnect(self, client):
         """Handles BLE disconnection."""
+        if self.stopping:
+            return  # Disconnect requested by stop()
         logger.warning(f"⚠️ Garmin HRM Disconnected! Reconnecting...")
         if self.disconnect_callback:
             self.disconnect_callback()
 
-def run_garmin_hrm_service(hr_callback, cadence_callback, disconnect_callback, connection_event):
-    """Starts the Garmin HRM BLE service in a separate thread OR runs a mock."""
-    hrm_service = GarminHRMService(hr_callback, cadence_callback, disconnect_callback, connection_event)
-    thread = threading.Thread(target=asyncio.run, args=(hrm_service.connect_and_listen(),), daemon=True)
-    thread.start()
+def run_garmin_hrm_service(hr_callback, cadence_callback, disconnect_callback, connection_event, rr_callback=None, rsc_callback=None):
+    """Starts the Garmin HRM BLE service in a separate thread OR runs a mock. Returns the service (see stop())."""
+    hrm_service = GarminHRMService(hr_callback, cadence_callback, disconnect_callback, connection_event, rr_callback,
+                                   rsc_callback=rsc_callback)
+    hrm_service.thread = threading.Thread(target=asyncio.run, args=(hrm_service.connect_and_listen(),), name="hrm-service", daemon=True)
+    hrm_service.thread.start()
+    return hrm_service
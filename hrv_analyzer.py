@@ -0,0 +1,172 @@
+import math
+import numpy as np
+from config import HRV_WINDOW_BEATS, HRV_MIN_RR_MS, HRV_MAX_RR_MS, HRV_MAX_RR_CHANGE
+
+
+def is_artifact(rr_ms, prev_rr_ms, min_rr=HRV_MIN_RR_MS, max_rr=HRV_MAX_RR_MS, max_change=HRV_MAX_RR_CHANGE):
+    """
+    Artifact rule shared by the streaming and vectorized paths.
+    A beat is rejected when it is outside the physiological range, or when it deviates
+    more than max_change from the previous beat (if that beat was itself in range).
+    """
+    if rr_ms < min_rr or rr_ms > max_rr:
+        return True
+    if prev_rr_ms is None or prev_rr_ms < min_rr or prev_rr_ms > max_rr:
+        return False
+    return abs(rr_ms - prev_rr_ms) > max_change * prev_rr_ms
+
+
+class HRVAnalyzer:
+    """Streaming RMSSD/SDNN over the last `window` RR intervals, O(1) per beat."""
+
+    def __init__(self, window=HRV_WINDOW_BEATS, min_rr=HRV_MIN_RR_MS, max_rr=HRV_MAX_RR_MS, max_change=HRV_MAX_RR_CHANGE):
+        """
+        Initializes the analyzer with preallocated ring buffers.
+        :param window: Number of most recent beats the metrics are computed over (>= 2).
+        :param min_rr: Shortest accepted RR interval in ms.
+        :param max_rr: Longest accepted RR interval in ms.
+        :param max_change: Largest accepted relative change from the previous beat.
+        """
+        if window < 2:
+            raise ValueError("HRV window must hold at least 2 beats")
+
+        self.window = window
+        self.min_rr = min_rr
+        self.max_rr = max_rr
+        self.max_change = max_change
+
+        # Ring buffers indexed by beat number % window
+        self.rr = np.zeros(window, dtype=np.int64)
+        self.valid = np.zeros(window, dtype=np.bool_)
+        self.sq_diff = np.zeros(window, dtype=np.int64)  # Squared diff to the previous beat
+        self.diff_valid = np.zeros(window, dtype=np.bool_)
+
+        self.beat_count = 0
+        self.artifact_count = 0
+        self.prev_rr = None
+        self.prev_valid = False
+
+        # Running window sums (Python ints, so they never drift)
+        self.n_valid = 0
+        self.sum_rr = 0
+        self.sum_rr_sq = 0
+        self.n_diff = 0
+        self.sum_sq_diff = 0
+
+    def add_rr(self, rr_ms):
+        """Adds one RR interval (ms) and updates the rolling window."""
+        rr_ms = int(rr_ms)
+        n = self.beat_count
+        slot = n % self.window
+
+        valid = not is_artifact(rr_ms, self.prev_rr, self.min_rr, self.max_rr, self.max_change)
+        if not valid:
+            self.artifact_count += 1
+
+        # Evict beat n - window
+        if n >= self.window and self.valid[slot]:
+            old = int(self.rr[slot])
+            self.n_valid -= 1
+            self.sum_rr -= old
+            self.sum_rr_sq -= old * old
+
+        # Evict the diff of beat n - window + 1, whose predecessor just left the window
+        if n >= self.window:
+            old_slot = (n + 1) % self.window
+            if self.diff_valid[old_slot]:
+                self.n_diff -= 1
+                self.sum_sq_diff -= int(self.sq_diff[old_slot])
+
+        diff_valid = valid and self.prev_valid
+        sq_diff = (rr_ms - self.prev_rr) ** 2 if diff_valid else 0
+
+        self.rr[slot] = rr_ms
+        self.valid[slot] = valid
+        self.sq_diff[slot] = sq_diff
+        self.diff_valid[slot] = diff_valid
+
+        if valid:
+            self.n_valid += 1
+            self.sum_rr += rr_ms
+            self.sum_rr_sq += rr_ms * rr_ms
+        if diff_valid:
+            self.n_diff += 1
+            self.sum_sq_diff += sq_diff
+
+        self.prev_rr = rr_ms
+        self.prev_valid = valid
+        self.beat_count += 1
+
+    def add_rr_intervals(self, rr_intervals_ms):
+        """Adds a sequence of RR intervals (ms)."""
+        for rr_ms in rr_intervals_ms:
+            self.add_rr(rr_ms)
+
+    @property
+    def rmssd(self):
+        """Root mean square of successive differences (ms) over the window, or None."""
+        if self.n_diff == 0:
+            return None
+        return math.sqrt(self.sum_sq_diff / self.n_diff)
+
+    @property
+    def sdnn(self):
+        """Standard deviation of accepted RR intervals (ms) over the window, or None."""
+        if self.n_valid < 2:
+            return None
+        variance = (self.sum_rr_sq - self.sum_rr * self.sum_rr / self.n_valid) / (self.n_valid - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def artifact_ratio(self):
+        """Fraction of all beats rejected as artifacts."""
+        return self.artifact_count / self.beat_count if self.beat_count else 0.0
+
+    def snapshot(self):
+        """Returns the current HRV metrics as a dictionary."""
+        return {
+            "rmssd": self.rmssd,
+            "sdnn": self.sdnn,
+            "beats": self.beat_count,
+            "artifact_ratio": self.artifact_ratio,
+        }
+
+
+def rolling_hrv(rr_ms, window=HRV_WINDOW_BEATS, min_rr=HRV_MIN_RR_MS, max_rr=HRV_MAX_RR_MS, max_change=HRV_MAX_RR_CHANGE):
+    """
+    Vectorized equivalent of HRVAnalyzer for replaying a whole RR series at once.
+    :param rr_ms: 1-D array of RR intervals in ms.
+    :return: (rmssd, sdnn, valid) arrays, one entry per beat; NaN where undefined.
+    """
+    rr = np.asarray(rr_ms, dtype=np.int64)
+    n = len(rr)
+    if n == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.bool_)
+
+    in_range = (rr >= min_rr) & (rr <= max_rr)
+    prev = np.concatenate(([0], rr[:-1]))
+    prev_in_range = np.concatenate(([False], in_range[:-1]))
+    jump = np.abs(rr - prev) > max_change * prev
+    valid = in_range & ~(prev_in_range & jump)
+
+    diff_valid = valid & np.concatenate(([False], valid[:-1]))
+    sq_diff = np.where(diff_valid, (rr - prev) ** 2, 0)
+
+    def window_sum(values, lag):
+        cumulative = np.concatenate(([0], np.cumsum(values)))
+        end = np.arange(1, n + 1)
+        return cumulative[end] - cumulative[np.maximum(end - lag, 0)]
+
+    rr_valid = np.where(valid, rr, 0)
+    n_valid = window_sum(valid.astype(np.int64), window)
+    sum_rr = window_sum(rr_valid, window)
+    sum_rr_sq = window_sum(rr_valid * rr_valid, window)
+    n_diff = window_sum(diff_valid.astype(np.int64), window - 1)
+    sum_sq_diff = window_sum(sq_diff, window - 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rmssd = np.where(n_diff > 0, np.sqrt(sum_sq_diff / np.maximum(n_diff, 1)), np.nan)
+        variance = (sum_rr_sq - sum_rr.astype(np.float64) * sum_rr / np.maximum(n_valid, 1)) / np.maximum(n_valid - 1, 1)
+        sdnn = np.where(n_valid >= 2, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+    return rmssd, sdnn, valid
@@ -1,24 +1,106 @@
+import signal
+import sys
+import threading
 import time
-from service_manager import start_services, stop_services
-from ant_broadcaster import node
+from service_manager import start_services, stop_services, sensor_data, service_loops, fit_generator
+from fit_generator import recover_unfinished_sessions
+from ant_broadcaster import ant_node, stop_broadcasting
+from ant_tx import apply_tx_thread_settings
 from logger_config import logger
 from strava_uploader import upload_photo, upload_to_strava
+from dashboard_server import DashboardServer, local_lane_source
+from telemetry_exporter import TelemetryExporter
+from diagnostics import HealthMonitor
+from config import ANT_STOP_TIMEOUT_S, DASHBOARD_ENABLED, TELEMETRY_ENABLED, DIAG_ENABLED
+
+# Set by SIGINT (CTRL+C) or SIGTERM (systemd stop)
+shutdown_requested = threading.Event()
+
+# Runtime health monitor, set by start_optional_services() when DIAG_ENABLED and stopped by shutdown()
+health_monitor = None
+
+def request_shutdown(signum, frame):
+    """Signal handler: wakes main() to run the shutdown sequence."""
+    logger.warning(f"🛑 {signal.Signals(signum).name} received, shutting down...")
+    shutdown_requested.set()
 
 def main():
     """Main entry point for the FootPod application."""
-    
+
+    # Finalize sessions a crash or power loss left behind
+    for fit_file in recover_unfinished_sessions():
+        logger.info(f"♻️ Previous session recovered: {fit_file}")
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
     # Start BLE Services & FIT File Logging
     start_services()
+    optional_services = start_optional_services()
+
+    logger.info("🎬 System Initialized - Running ANT+ Broadcast")
+    ant_thread = threading.Thread(target=run_ant_node, name="ant-node", daemon=True)
+    ant_thread.start()
+
+    while not shutdown_requested.wait(timeout=1.0):
+        if not ant_thread.is_alive():
+            logger.error("❌ ANT+ node stopped unexpectedly, shutting down...")
+            break
+
+    shutdown(ant_thread, optional_services)
 
-    try:
-        logger.info("🎬 System Initialized - Running ANT+ Broadcast")
-        node.start()
-    except KeyboardInterrupt:
-        logger.warning("🛑 Shutting down...")
-        stop_services()  # Stop BLE services & save FIT file
-        node.stop()
+    if sys.stdin.isatty():
         prompt_strava_upload()
 
+def run_ant_node():
+    """ANT+ node thread: opens the stick and runs it, reopening it after USB faults; TX callbacks run here,
+    so the opt-in real-time settings are applied to it."""
+    apply_tx_thread_settings()
+    ant_node.run()
+
+def start_optional_services():
+    """Starts the optional outputs and diagnostics enabled in config.py; returns the outputs (each has stop());
+    the health monitor is kept in health_monitor."""
+    global health_monitor
+    optional_services = []
+    if DASHBOARD_ENABLED:
+        optional_services.append(DashboardServer(local_lane_source(sensor_data)).start())
+    if TELEMETRY_ENABLED:
+        optional_services.append(TelemetryExporter(local_lane_source(sensor_data)).start())
+    if DIAG_ENABLED:
+        health_monitor = HealthMonitor(service_loops, gauges={
+            "fit_records": lambda: len(fit_generator.records),
+            "ant_reattaches": lambda: ant_node.stats["reattaches"],
+            "ant_downtime_s": lambda: round(ant_node.downtime(), 1),
+        }).start()
+        signal.signal(signal.SIGUSR1, request_health_report)
+    return optional_services
+
+def request_health_report(signum, frame):
+    """SIGUSR1 handler: logs a full health report, off the signal handler so it never re-enters logging."""
+    monitor = health_monitor
+    if monitor is not None:
+        threading.Thread(target=monitor.log_report, name="health-report").start()
+
+def shutdown(ant_thread, optional_services=()):
+    """Stops the health monitor and BLE services, finalizes the FIT file, then closes ANT+; reports how long each part took."""
+    global health_monitor
+    if health_monitor is not None:
+        health_monitor.stop()  # Before the BLE loops it probes are closed
+        health_monitor = None
+
+    start = time.perf_counter()
+    file_ready = stop_services()  # Stop BLE services, save the FIT file, then render the summary image
+    image_ready = time.perf_counter() - start
+
+    for service in optional_services:
+        service.stop()
+    stop_broadcasting()
+    ant_thread.join(ANT_STOP_TIMEOUT_S)
+
+    logger.info(f"⏱️ Shutdown: FIT file ready after {file_ready * 1000:.0f} ms, summary image after {image_ready * 1000:.0f} ms, "
+                f"complete after {(time.perf_counter() - start) * 1000:.0f} ms")
+
 def prompt_strava_upload():
     """Handles user prompt for Strava upload."""
     
@@ -0,0 +1,174 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from logger_config import logger
+from config import JOURNAL_DIR, JOURNAL_FSYNC_INTERVAL_S
+
+MAGIC = b"FPJ1"
+VERSION = 2
+HEADER = struct.Struct("<4sHHd")  # magic, version, record size, session start (UNIX s)
+SAMPLE = struct.Struct("<BddffHH")  # kind, timestamp, distance, speed, incline, heart_rate, cadence
+RECORD = struct.Struct(f"<{SAMPLE.size}sI")  # packed sample + CRC-32 of the sample
+SAMPLE_V1 = struct.Struct("<ddffHH")  # Version 1 journals: samples only, no timer events
+RECORD_V1 = struct.Struct(f"<{SAMPLE_V1.size}sI")
+JOURNAL_SUFFIX = ".journal"
+
+# Record kinds; a "stop" marker also drops the samples journaled after its timestamp (belt stopped before the pause was detected)
+KIND_SAMPLE, KIND_STOP, KIND_START = 0, 1, 2
+TIMER_KINDS = {KIND_STOP: "stop", KIND_START: "start"}
+
+
+class SampleJournal:
+    """
+    Append-only journal of 1 Hz samples and auto-pause timer events with group-commit fsync,
+    used to recover sessions after a crash.
+    """
+
+    def __init__(self, path, start_time, fsync_interval=JOURNAL_FSYNC_INTERVAL_S):
+        """
+        Creates the journal file and starts the background fsync thread.
+        :param path: Journal file path.
+        :param start_time: Session start (UNIX seconds), stored in the header.
+        :param fsync_interval: Seconds between fsync calls; bounds the data lost on power failure.
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.write(self.fd, HEADER.pack(MAGIC, VERSION, RECORD.size, start_time))
+        os.fsync(self.fd)
+
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.closed = threading.Event()
+        self.sync_count = 0
+        self.sync_time_max = 0.0
+        self.sync_thread = threading.Thread(target=self._sync_loop, name="journal-fsync", daemon=True)
+        self.sync_thread.start()
+
+        logger.info(f"📝 Sample Journal Started: {self.path} (fsync every {fsync_interval:.1f}s)")
+
+    def append(self, record):
+        """
+        Appends one sample. The write reaches the OS immediately (survives a process kill);
+        it reaches the disk on the next group commit (survives power loss).
+        :param record: FIT record dictionary (timestamp, distance, speed, incline, heart_rate, cadence).
+        """
+        self._write(SAMPLE.pack(
+            KIND_SAMPLE, record["timestamp"], record.get("distance", 0) or 0, record.get("speed", 0) or 0,
+            record.get("incline", 0) or 0, int(record.get("heart_rate", 0) or 0) & 0xFFFF,
+            int(record.get("cadence", 0) or 0) & 0xFFFF,
+        ))
+
+    def append_timer_event(self, timestamp, kind):
+        """
+        Appends an auto-pause timer event, in the same fixed-size record as the samples.
+        :param kind: "stop" (samples journaled after timestamp are dropped on read) or "start".
+        """
+        code = KIND_STOP if kind == "stop" else KIND_START
+        self._write(SAMPLE.pack(code, timestamp, 0, 0, 0, 0, 0))
+
+    def _write(self, sample):
+        with self.lock:
+            if self.closed.is_set():
+                return
+            os.write(self.fd, RECORD.pack(sample, zlib.crc32(sample)))
+            self.dirty = True
+
+    def sync(self):
+        """Flushes pending samples to disk. Appends are not blocked while fsync runs."""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+        start = time.perf_counter()
+        os.fsync(self.fd)
+        elapsed = time.perf_counter() - start
+        self.sync_count += 1
+        self.sync_time_max = max(self.sync_time_max, elapsed)
+
+    def close(self, remove=False):
+        """
+        Stops group commits, flushes and closes the file.
+        :param remove: Delete the journal (the session was finalized into a FIT file).
+        """
+        with self.lock:
+            if self.closed.is_set():
+                return
+            self.closed.set()  # Rejects further appends and stops the fsync thread
+        self.sync_thread.join()
+        self.sync()
+        os.close(self.fd)
+
+        if remove:
+            os.remove(self.path)
+            logger.info(f"📝 Sample Journal Finalized: {self.path}")
+
+    def _sync_loop(self):
+        while not self.closed.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except OSError as e:
+                logger.error(f"❌ Journal fsync failed: {e}")
+
+
+def open_session_journal(start_time, journal_dir=JOURNAL_DIR):
+    """Creates the journal for a new session in journal_dir."""
+    os.makedirs(journal_dir, exist_ok=True)
+    name = datetime.fromtimestamp(start_time).strftime("session_%Y%m%d_%H%M%S") + JOURNAL_SUFFIX
+    return SampleJournal(os.path.join(journal_dir, name), start_time)
+
+
+def read_journal(path):
+    """
+    Reads a journal, stopping at the first torn or corrupt record. A "stop" timer event drops the samples
+    journaled after it, as FitFileGenerator.pause() drops them from the live session.
+    :return: (session start UNIX time, list of FIT record dictionaries,
+             list of FitFileGenerator timer events (UNIX time, "stop" | "start"))
+    :raises ValueError: If the header is missing or not a sample journal.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError("journal header is incomplete")
+    magic, version, record_size, start_time = HEADER.unpack_from(data, 0)
+    layouts = {VERSION: (SAMPLE, RECORD), 1: (SAMPLE_V1, RECORD_V1)}
+    if magic != MAGIC or version not in layouts or record_size != layouts[version][1].size:
+        raise ValueError("not a FootPod sample journal")
+    sample_layout, record_layout = layouts[version]
+
+    records, timer_events = [], []
+    for offset in range(HEADER.size, len(data) - record_layout.size + 1, record_layout.size):
+        sample, crc = record_layout.unpack_from(data, offset)
+        if zlib.crc32(sample) != crc:
+            logger.warning(f"⚠️ Journal {path} corrupt at byte {offset}, keeping {len(records)} samples")
+            break
+        fields = sample_layout.unpack(sample)
+        if version == 1:
+            fields = (KIND_SAMPLE,) + fields
+        kind, timestamp, distance, speed, incline, heart_rate, cadence = fields
+        timestamp = int(timestamp)
+        if kind in TIMER_KINDS:
+            if kind == KIND_STOP:
+                while records and records[-1]["timestamp"] > timestamp:
+                    records.pop()
+            timer_events.append((timestamp, TIMER_KINDS[kind]))
+            continue
+        records.append({
+            "timestamp": timestamp, "speed": speed, "distance": distance,
+            "cadence": cadence, "heart_rate": heart_rate, "incline": incline,
+        })
+
+    return start_time, records, timer_events
+
+
+def find_unfinished_journals(journal_dir=JOURNAL_DIR):
+    """Lists journals left behind by sessions that never reached end_workout()."""
+    if not os.path.isdir(journal_dir):
+        return []
+    return sorted(
+        os.path.join(journal_dir, name) for name in os.listdir(journal_dir) if name.endswith(JOURNAL_SUFFIX)
+    )
@@ -3,13 +3,19 @@ import time
 from heartrate_service import run_garmin_hrm_service
 from treadmill_service import run_treadmill_service
 from fit_generator import FitFileGenerator
+from hrv_analyzer import HRVAnalyzer
+from belt_state import BeltStateDetector, PAUSED
+from data_processor import add_sensor_distance
 from logger_config import logger
 from config import BLE_HRM_SENSOR_ADDRESS, BLE_TREADMILL_SENSOR_ADDRESS
-from config import MOCK_HRM, MOCK_FTMS
+from config import MOCK_HRM, MOCK_FTMS, SHUTDOWN_TIMEOUT_S, AUTO_PAUSE_ENABLED
 
 # Global stop event
 stop_event = threading.Event()
 
+# Running BLE services by name ("hrm", "ftms"); each has stop() and a thread
+services = {}
+
 # Connection events to wait for BLE connection
 hrm_connection_event = threading.Event()
 ftms_connection_event = threading.Event()
@@ -25,6 +31,21 @@ sensor_data = {
 # Initialize FIT file generator
 fit_generator = FitFileGenerator()
 
+# Streaming HRV metrics from HRM RR intervals
+hrv_analyzer = HRVAnalyzer()
+
+# Belt running/paused state; pauses suspend FIT recording (and switch ANT+ to its idle pattern, see ant_broadcaster)
+belt_state = BeltStateDetector()
+
+def on_belt_state(state, timestamp, reason):
+    """Suspends or resumes FIT recording, writing timer events and closing an auto-lap on each pause."""
+    if state == PAUSED:
+        fit_generator.pause(timestamp)
+    else:
+        fit_generator.resume(timestamp)
+
+belt_state.add_listener(on_belt_state)
+
 def update_hrm_data(heart_rate):
     """Updates heart rate data and logs it in the FIT file."""
     if stop_event.is_set():
@@ -33,6 +54,14 @@ def update_hrm_data(heart_rate):
     logger.debug(f"Heart Rate Updated: {heart_rate} BPM")
     fit_generator.add_record(sensor_data)
 
+def update_rr_intervals(rr_intervals):
+    """Feeds RR intervals into the HRV analyzer and the FIT file."""
+    if stop_event.is_set():
+        return
+    hrv_analyzer.add_rr_intervals(rr_intervals)
+    sensor_data["rmssd"], sensor_data["sdnn"] = hrv_analyzer.rmssd, hrv_analyzer.sdnn
+    fit_generator.add_hrv(rr_intervals)
+
 def update_stride_cadence(cadence):
     """Updates cadence from Garmin HRM service and logs it in the FIT file."""
     if stop_event.is_set():
@@ -41,44 +70,69 @@ def update_stride_cadence(cadence):
     logger.debug(f"Stride Cadence Updated: {cadence} SPM")
     fit_generator.add_record(sensor_data)
 
-def update_treadmill_data(speed, incline):
-    """Updates treadmill speed and incline and logs it in the FIT file."""
+def update_rsc_data(measurement):
+    """Feeds the HRM's own total distance and stride length into the foot pod stride count (and distance)."""
+    if stop_event.is_set() or measurement.total_distance is None:
+        return
+    add_sensor_distance(measurement.total_distance, measurement.stride_length, moving=not belt_state.paused)
+
+def update_treadmill_data(speed, incline, distance=None, energy=None, elapsed_time=None, heart_rate=None,
+                          ramp_angle=None, energy_per_hour=None, energy_per_minute=None):
+    """Updates treadmill speed and incline and logs it in the FIT file (other FTMS fields are ignored)."""
     if stop_event.is_set():
         return
     sensor_data["speed"], sensor_data["incline"] = speed, incline
     logger.debug(f"Treadmill Updated: Speed={speed:.2f} m/s, Incline={incline:.1f}%")
+    if AUTO_PAUSE_ENABLED:
+        belt_state.update_speed(speed)
     fit_generator.add_record(sensor_data)
 
+def update_treadmill_status(running, reason):
+    """Applies FTMS Machine Status / Training Status belt events."""
+    if stop_event.is_set() or not AUTO_PAUSE_ENABLED:
+        return
+    belt_state.update_machine_status(running, reason)
+
 # **Handle BLE Disconnections**
 def on_hrm_disconnected():
     """Handles HRM disconnection by resetting connection state and triggering reconnection."""
+    if stop_event.is_set():
+        return
     logger.warning("⚠️ HRM Disconnected! Restarting service...")
     hrm_connection_event.clear()  # Reset connection event
-    threading.Thread(target=run_garmin_hrm_service, args=(update_hrm_data, update_stride_cadence, on_hrm_disconnected, hrm_connection_event), daemon=True).start()
+    start_hrm_service()
 
 def on_ftms_disconnected():
     """Handles FTMS disconnection by resetting connection state and triggering reconnection."""
+    if stop_event.is_set():
+        return
     logger.warning("⚠️ FTMS Disconnected! Restarting service...")
     ftms_connection_event.clear()  # Reset connection event
-    threading.Thread(target=run_treadmill_service, args=(update_treadmill_data, on_ftms_disconnected, ftms_connection_event), daemon=True).start()
+    start_ftms_service()
+
+def start_hrm_service():
+    """Starts (or restarts) the HRM service, stopping the instance it replaces."""
+    if "hrm" in services:
+        services["hrm"].stop()
+    services["hrm"] = run_garmin_hrm_service(update_hrm_data, update_stride_cadence, on_hrm_disconnected, hrm_connection_event, update_rr_intervals, update_rsc_data)
+
+def start_ftms_service():
+    """Starts (or restarts) the FTMS service, stopping the instance it replaces."""
+    if "ftms" in services:
+        services["ftms"].stop()
+    services["ftms"] = run_treadmill_service(update_treadmill_data, on_ftms_disconnected, ftms_connection_event, update_treadmill_status)
+
+def service_loops():
+    """Returns the event loop of each running BLE service (for diagnostics)."""
+    return {name: service.loop for name, service in services.items() if service.loop}
 
 def start_services():
     """Starts BLE services using addresses from config.py."""
     logger.info("🚀 Starting BLE services and FIT file recording...")
+    stop_event.clear()
 
-    # Start HRM service
-    threading.Thread(
-        target=run_garmin_hrm_service, 
-        args=(update_hrm_data, update_stride_cadence, on_hrm_disconnected, hrm_connection_event), 
-        daemon=True
-    ).start()
-
-    # Start FTMS service
-    threading.Thread(
-        target=run_treadmill_service, 
-        args=(update_treadmill_data, on_ftms_disconnected, ftms_connection_event), 
-        daemon=True
-    ).start()
+    start_hrm_service()
+    start_ftms_service()
 
     # Only wait for connections if not mocking
     if not MOCK_HRM and not hrm_connection_event.wait(timeout=30):
@@ -88,11 +142,31 @@ def start_services():
         logger.warning("⚠️ FTMS failed to connect within 30 seconds. Retrying...")
 
 
-def stop_services():
-    """Stops BLE services and finalizes the FIT file."""
+def stop_services(timeout=SHUTDOWN_TIMEOUT_S):
+    """
+    Stops BLE services, finalizes the FIT file, then renders the summary image.
+    :param timeout: Deadline (seconds) shared by all service thread joins.
+    :return: Seconds from the stop request until the FIT file was written (the image render is not included).
+    """
     logger.info("🛑 Stopping services and finalizing FIT file...")
-    
-    stop_event.set()  # Signal all threads to stop
-    time.sleep(2)  # Allow some time for threads to exit
-    #fit_generator.end_workout()
-    logger.info("✅ Services stopped successfully.")
+    start = time.perf_counter()
+    deadline = start + timeout
+
+    stop_event.set()  # Ignore sensor updates from here on
+    for service in services.values():
+        service.stop()  # Cancels the BLE task: unsubscribes notifications and disconnects
+
+    for name, service in services.items():
+        service.thread.join(max(0.0, deadline - time.perf_counter()))
+        if service.thread.is_alive():
+            logger.warning(f"⚠️ {name.upper()} service did not stop within {timeout:.1f}s, abandoning its thread")
+    services.clear()
+
+    fit_generator.end_workout()
+    elapsed = time.perf_counter() - start
+    logger.info(f"✅ Services stopped successfully, FIT file ready in {elapsed * 1000:.0f} ms.")
+
+    render_start = time.perf_counter()
+    if fit_generator.write_summary_image():
+        logger.info(f"🖼️ Summary image rendered in {(time.perf_counter() - render_start) * 1000:.0f} ms.")
+    return elapsed
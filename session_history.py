@@ -0,0 +1,344 @@
+import argparse
+import calendar
+import datetime
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+import fitparse
+import numpy as np
+from logger_config import logger
+from config import SESSION_HISTORY_DIR, SESSION_INDEX_DB, SESSION_SERIES_INTERVAL_S, BEST_EFFORT_DISTANCES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    sha256 TEXT PRIMARY KEY,
+    start_time INTEGER NOT NULL,
+    duration_s REAL NOT NULL,
+    distance_m REAL NOT NULL,
+    avg_speed REAL,
+    max_speed REAL,
+    avg_heart_rate REAL,
+    max_heart_rate INTEGER,
+    avg_cadence REAL,
+    record_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS best_efforts (
+    sha256 TEXT NOT NULL,
+    distance_m INTEGER NOT NULL,
+    time_s REAL NOT NULL,
+    PRIMARY KEY (sha256, distance_m)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    sha256 TEXT NOT NULL,
+    offset_s REAL NOT NULL,
+    distance_m REAL,
+    speed REAL,
+    heart_rate REAL,
+    cadence REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_start_time ON sessions (start_time);
+CREATE INDEX IF NOT EXISTS best_efforts_distance ON best_efforts (distance_m, time_s);
+CREATE INDEX IF NOT EXISTS samples_speed ON samples (speed);
+CREATE INDEX IF NOT EXISTS samples_session ON samples (sha256);
+"""
+
+
+def file_sha256(path):
+    """Hashes a file in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_fit_records(path):
+    """
+    Reads the record messages of a FIT file into NumPy arrays.
+    :return: Dictionary of equally long arrays: timestamp (UNIX s), distance (m), speed (m/s), heart_rate, cadence.
+    """
+    columns = {"timestamp": [], "distance": [], "speed": [], "heart_rate": [], "cadence": []}
+    for message in fitparse.FitFile(path).get_messages("record"):
+        values = message.get_values()
+        if values.get("timestamp") is None:
+            continue
+        columns["timestamp"].append(calendar.timegm(values["timestamp"].utctimetuple()))
+        for key in ("distance", "speed", "heart_rate", "cadence"):
+            value = values.get(key)
+            columns[key].append(np.nan if value is None else value)
+
+    arrays = {key: np.asarray(values, dtype=np.float64) for key, values in columns.items()}
+
+    # Fall back to integrating speed if the file carries no usable distance
+    distance = arrays["distance"]
+    if len(distance) and not np.nanmax(np.nan_to_num(distance)) > 0:
+        dt = np.diff(arrays["timestamp"], prepend=arrays["timestamp"][0])
+        arrays["distance"] = np.cumsum(np.nan_to_num(arrays["speed"]) * dt)
+    arrays["distance"] = np.maximum.accumulate(np.nan_to_num(arrays["distance"]))
+    return arrays
+
+
+def best_effort_times(timestamp, distance, target_m):
+    """Fastest time (s) to cover target_m anywhere in the session, or None."""
+    end = np.searchsorted(distance, distance + target_m, side="left")
+    reachable = end < len(distance)
+    if not reachable.any():
+        return None
+    return float(np.min(timestamp[end[reachable]] - timestamp[reachable]))
+
+
+def summarize_fit_file(path):
+    """
+    Parses one FIT file into a session summary, best efforts and a downsampled series.
+    Runs in worker processes, so it only returns plain data.
+    """
+    try:
+        arrays = read_fit_records(path)
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+    t = arrays["timestamp"]
+    if len(t) == 0:
+        return {"path": path, "error": "no records"}
+
+    distance, speed, hr, cadence = arrays["distance"], arrays["speed"], arrays["heart_rate"], arrays["cadence"]
+    valid_hr = hr[hr > 0]
+
+    summary = {
+        "start_time": int(t[0]),
+        "duration_s": float(t[-1] - t[0]),
+        "distance_m": float(distance[-1]),
+        "avg_speed": float(np.nanmean(speed)) if np.isfinite(speed).any() else None,
+        "max_speed": float(np.nanmax(speed)) if np.isfinite(speed).any() else None,
+        "avg_heart_rate": float(valid_hr.mean()) if len(valid_hr) else None,
+        "max_heart_rate": int(valid_hr.max()) if len(valid_hr) else None,
+        "avg_cadence": float(np.nanmean(cadence)) if np.isfinite(cadence).any() else None,
+        "record_count": int(len(t)),
+    }
+
+    best_efforts = {}
+    for target_m in BEST_EFFORT_DISTANCES:
+        effort = best_effort_times(t, distance, target_m)
+        if effort is not None:
+            best_efforts[target_m] = effort
+
+    # Downsample into fixed time buckets (bucket means)
+    buckets = ((t - t[0]) // SESSION_SERIES_INTERVAL_S).astype(np.int64)
+    counts = np.bincount(buckets)
+    present = counts > 0
+    series = {"offset_s": np.flatnonzero(present) * float(SESSION_SERIES_INTERVAL_S)}
+    for key, values in (("distance_m", distance), ("speed", speed), ("heart_rate", hr), ("cadence", cadence)):
+        finite = np.isfinite(values)
+        sums = np.bincount(buckets[finite], weights=values[finite], minlength=len(counts))
+        n = np.bincount(buckets[finite], minlength=len(counts))
+        with np.errstate(invalid="ignore"):
+            series[key] = np.where(n > 0, sums / np.maximum(n, 1), np.nan)[present]
+
+    samples = [
+        tuple(None if np.isnan(v) else float(v) for v in row)
+        for row in zip(series["offset_s"], series["distance_m"], series["speed"], series["heart_rate"], series["cadence"])
+    ]
+    return {"path": path, "summary": summary, "best_efforts": best_efforts, "samples": samples}
+
+
+class SessionIndex:
+    """SQLite index of past FIT sessions, updated incrementally by file size/mtime and content hash."""
+
+    def __init__(self, db_path=SESSION_INDEX_DB):
+        """
+        Opens (or creates) the index database.
+        :param db_path: Path of the SQLite file.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def scan(self, directory=SESSION_HISTORY_DIR, workers=None):
+        """
+        Indexes new or changed FIT files below a directory.
+        Unchanged files (same size and mtime) are skipped without being read, and
+        files whose content hash is already indexed are not parsed again.
+        :return: Dictionary with counts of indexed, skipped, relinked, failed and removed files.
+        """
+        stats = {"indexed": 0, "skipped": 0, "relinked": 0, "failed": 0, "removed": 0}
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in self.db.execute("SELECT path, size, mtime_ns FROM files")}
+        indexed_hashes = {row[0] for row in self.db.execute("SELECT sha256 FROM sessions")}
+
+        seen = set()
+        to_parse = {}  # sha256 -> (path, os.stat result)
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if not name.lower().endswith(".fit"):
+                    continue
+                path = os.path.abspath(os.path.join(root, name))
+                seen.add(path)
+                st = os.stat(path)
+                if known.get(path) == (st.st_size, st.st_mtime_ns):
+                    stats["skipped"] += 1
+                    continue
+
+                sha256 = file_sha256(path)
+                if sha256 in indexed_hashes:
+                    self._upsert_file(path, st, sha256)
+                    stats["relinked"] += 1
+                elif sha256 not in to_parse:
+                    to_parse[sha256] = (path, st)
+
+        if to_parse:
+            paths = [path for path, _ in to_parse.values()]
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(summarize_fit_file, paths, chunksize=max(1, len(paths) // (4 * workers))))
+
+            with self.db:
+                for sha256, result in zip(to_parse, results):
+                    path, st = to_parse[sha256]
+                    if "error" in result:
+                        logger.warning(f"⚠️ Could not index {path}: {result['error']}")
+                        stats["failed"] += 1
+                        continue
+                    self._insert_session(sha256, result)
+                    self._upsert_file(path, st, sha256)
+                    stats["indexed"] += 1
+
+        removed = [path for path in known if path not in seen and path.startswith(os.path.abspath(directory) + os.sep)]
+        with self.db:
+            self.db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            # Drops sessions of removed files and the old content of files rewritten in place
+            for table in ("sessions", "best_efforts", "samples"):
+                self.db.execute(f"DELETE FROM {table} WHERE sha256 NOT IN (SELECT sha256 FROM files)")
+        stats["removed"] = len(removed)
+
+        self.db.commit()
+        logger.info(f"📚 Session index updated: {stats}")
+        return stats
+
+    def _upsert_file(self, path, st, sha256):
+        self.db.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, sha256),
+        )
+
+    def _insert_session(self, sha256, result):
+        summary = result["summary"]
+        self.db.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha256, summary["start_time"], summary["duration_s"], summary["distance_m"], summary["avg_speed"],
+             summary["max_speed"], summary["avg_heart_rate"], summary["max_heart_rate"], summary["avg_cadence"],
+             summary["record_count"]),
+        )
+        self.db.executemany(
+            "INSERT OR REPLACE INTO best_efforts VALUES (?, ?, ?)",
+            [(sha256, distance_m, time_s) for distance_m, time_s in result["best_efforts"].items()],
+        )
+        self.db.execute("DELETE FROM samples WHERE sha256 = ?", (sha256,))
+        self.db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)", [(sha256, *row) for row in result["samples"]])
+
+    def weekly_distance(self, weeks=None):
+        """Returns [(ISO 8601 'YYYY-Www' week (UTC), distance m, session count)], newest last."""
+        totals = {}
+        for start_time, distance_m in self.db.execute("SELECT start_time, distance_m FROM sessions"):
+            year, week, _ = datetime.datetime.fromtimestamp(start_time, datetime.timezone.utc).isocalendar()
+            total = totals.setdefault(f"{year}-W{week:02d}", [0.0, 0])
+            total[0] += distance_m
+            total[1] += 1
+        rows = [(week, distance_m, count) for week, (distance_m, count) in sorted(totals.items())]
+        return rows[-weeks:] if weeks else rows
+
+    def personal_record(self, distance_m=5000):
+        """Returns (time s, session start UNIX time) of the fastest effort over distance_m, or None."""
+        return self.db.execute(
+            "SELECT b.time_s, s.start_time FROM best_efforts b JOIN sessions s ON s.sha256 = b.sha256 "
+            "WHERE b.distance_m = ? ORDER BY b.time_s LIMIT 1",
+            (int(distance_m),),
+        ).fetchone()
+
+    def avg_heart_rate_at_speed(self, speed_kmh, tolerance_kmh=0.5):
+        """Returns (average HR, sample count) over all samples within speed_kmh ± tolerance_kmh."""
+        low, high = (speed_kmh - tolerance_kmh) / 3.6, (speed_kmh + tolerance_kmh) / 3.6
+        return self.db.execute(
+            "SELECT AVG(heart_rate), COUNT(*) FROM samples WHERE speed BETWEEN ? AND ? AND heart_rate > 0",
+            (low, high),
+        ).fetchone()
+
+
+def parse_distance(value):
+    """Parses '5k', '10K', '21097' or '1.5km' into meters."""
+    value = value.strip().lower()
+    if value.endswith("km"):
+        return float(value[:-2]) * 1000
+    if value.endswith("k"):
+        return float(value[:-1]) * 1000
+    return float(value)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def main(argv=None):
+    """Command line interface for the session history index."""
+    parser = argparse.ArgumentParser(description="Query the history of recorded FIT sessions.")
+    parser.add_argument("--db", default=SESSION_INDEX_DB, help="SQLite index file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Index new or changed FIT files")
+    scan.add_argument("directory", nargs="?", default=SESSION_HISTORY_DIR)
+    scan.add_argument("--workers", type=int, default=None)
+
+    weekly = commands.add_parser("weekly", help="Weekly distance")
+    weekly.add_argument("--weeks", type=int, default=None)
+
+    pr = commands.add_parser("pr", help="Personal record over a distance")
+    pr.add_argument("distance", nargs="?", default="5k")
+
+    avg_hr = commands.add_parser("avg-hr", help="Average heart rate at a speed")
+    avg_hr.add_argument("speed", type=float, help="Speed in km/h")
+    avg_hr.add_argument("--tolerance", type=float, default=0.5, help="Speed tolerance in km/h")
+
+    args = parser.parse_args(argv)
+    index = SessionIndex(args.db)
+    start = time.perf_counter()
+
+    if args.command == "scan":
+        stats = index.scan(args.directory, args.workers)
+        print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+    elif args.command == "weekly":
+        for week, distance_m, count in index.weekly_distance(args.weeks):
+            print(f"{week}  {distance_m / 1000:7.2f} km  ({count} sessions)")
+    elif args.command == "pr":
+        distance_m = parse_distance(args.distance)
+        record = index.personal_record(distance_m)
+        if record is None:
+            print(f"No effort over {distance_m:.0f} m indexed (tracked distances: {BEST_EFFORT_DISTANCES})")
+        else:
+            time_s, start_time = record
+            print(f"PR {distance_m:.0f} m: {format_duration(time_s)} on {time.strftime('%Y-%m-%d', time.localtime(start_time))}")
+    elif args.command == "avg-hr":
+        avg, count = index.avg_heart_rate_at_speed(args.speed, args.tolerance)
+        if not count:
+            print(f"No samples at {args.speed:.1f} ± {args.tolerance:.1f} km/h")
+        else:
+            print(f"Avg HR at {args.speed:.1f} ± {args.tolerance:.1f} km/h: {avg:.0f} BPM ({count} samples)")
+
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
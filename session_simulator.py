@@ -0,0 +1,90 @@
+import asyncio
+import time
+from clock import VirtualClock
+from data_processor import reset_metrics
+from fit_generator import FitFileGenerator
+from heartrate_service import GarminHRMService
+from treadmill_service import TreadmillService
+from ant_tx import TxScheduler, TX_PERIOD_S
+from belt_state import BeltStateDetector, PAUSED
+from logger_config import logger
+
+
+class SessionSimulator:
+    """
+    Replays a mock workout on a VirtualClock: the mock HRM and FTMS services, the ANT+ TX rotation and the
+    FIT recorder run on one event loop in simulated time, so a 2-hour session finishes in seconds.
+    """
+
+    def __init__(self, duration_s, start_time=None, filename="simulated_workout.fit", tx_period=TX_PERIOD_S, belt_stops=()):
+        """
+        Initializes the simulation.
+        :param duration_s: Simulated session length in seconds.
+        :param start_time: Simulated UNIX start time (defaults to now).
+        :param filename: FIT file written by save_fit_file() (nothing is archived or journaled).
+        :param tx_period: Simulated ANT+ TX period in seconds.
+        :param belt_stops: (offset s, duration s) windows in which the mock treadmill reports a stopped belt.
+        """
+        self.duration_s = duration_s
+        self.belt_stops = belt_stops
+        self.clock = VirtualClock(start=int(time.time()) if start_time is None else start_time)
+        self.tx_period = tx_period
+        self.sensor_data = {"heart_rate": 0, "cadence": 0, "speed": 0.0, "incline": 0.0}
+        self.fit_generator = FitFileGenerator(filename=filename, archive_dir=None, journal_dir=None, clock=self.clock)
+        self.tx_scheduler = TxScheduler(self.sensor_data, precompute=False, period=tx_period, clock=self.clock)
+        self.hrm = GarminHRMService(hr_callback=self.update_hrm_data, cadence_callback=self.update_stride_cadence,
+                                    rr_callback=self.fit_generator.add_hrv, clock=self.clock)
+        self.treadmill = TreadmillService(callback=self.update_treadmill_data, clock=self.clock)
+        self.belt_state = BeltStateDetector(clock=self.clock)
+        self.belt_state.add_listener(self.on_belt_state)
+        self.tx_count = 0
+        self.tx_sent = 0
+
+    def on_belt_state(self, state, timestamp, reason):
+        if state == PAUSED:
+            self.fit_generator.pause(timestamp)
+        else:
+            self.fit_generator.resume(timestamp)
+        self.tx_scheduler.set_idle(state == PAUSED)
+
+    def update_hrm_data(self, heart_rate):
+        self.sensor_data["heart_rate"] = heart_rate
+        self.fit_generator.add_record(self.sensor_data)
+
+    def update_stride_cadence(self, cadence):
+        self.sensor_data["cadence"] = cadence
+        self.fit_generator.add_record(self.sensor_data)
+
+    def update_treadmill_data(self, speed, incline, *_):
+        offset = self.clock.monotonic()
+        if any(start <= offset < start + length for start, length in self.belt_stops):
+            speed = 0.0
+        self.sensor_data["speed"], self.sensor_data["incline"] = speed, incline
+        self.belt_state.update_speed(speed)
+        self.fit_generator.add_record(self.sensor_data)
+
+    async def ant_tx(self):
+        """Stands in for the ANT+ TX event callback."""
+        while True:
+            if self.tx_scheduler.next_payload() is not None:
+                self.tx_sent += 1
+            self.tx_count += 1
+            await self.clock.sleep(self.tx_period)
+
+    async def run_async(self):
+        reset_metrics(self.clock)
+        tasks = [asyncio.create_task(coro) for coro in (self.hrm.mock_hrm_data(), self.treadmill.mock_ftms_data(), self.ant_tx())]
+        try:
+            await self.clock.run(until=self.clock.start + self.duration_s)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run(self):
+        """Runs the whole simulated session and returns the FIT generator holding its records."""
+        started = time.perf_counter()
+        asyncio.run(self.run_async())
+        logger.info(f"⏩ Simulated {self.duration_s:.0f} s session in {time.perf_counter() - started:.2f} s: "
+                    f"{len(self.fit_generator.records)} records, {self.tx_sent}/{self.tx_count} ANT+ TX events with a new page")
+        return self.fit_generator
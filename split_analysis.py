@@ -0,0 +1,98 @@
+import numpy as np
+
+SPLIT_DISTANCES_M = {"km": 1000.0, "mile": 1609.344}
+MIN_PARTIAL_SPLIT_M = 1.0  # A shorter remainder after the last full split is folded into it
+
+
+def moving_time(timestamps, segments):
+    """
+    Converts sample timestamps to seconds of moving time, i.e. excluding auto-pauses.
+    :param timestamps: 1-D array of UNIX timestamps.
+    :param segments: (start, end) UNIX times of the recorded stretches (FitFileGenerator.timer_segments()).
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    if not segments:
+        return t - t[0]
+    starts = np.array([start for start, _ in segments], dtype=np.float64)
+    ends = np.array([end for _, end in segments], dtype=np.float64)
+    paused_before = np.concatenate(([0.0], np.cumsum(starts[1:] - ends[:-1])))
+    segment = np.clip(np.searchsorted(starts, t, side="right") - 1, 0, None)
+    return np.maximum.accumulate(t - starts[0] - paused_before[segment])
+
+
+def crossing_positions(distance, marks):
+    """
+    Fractional sample index at which a non-decreasing distance first reaches each mark, interpolated
+    linearly between the samples on either side of the crossing.
+    """
+    n = len(distance)
+    i = np.clip(np.searchsorted(distance, marks, side="left"), 1, n - 1)
+    before, step = distance[i - 1], distance[i] - distance[i - 1]
+    fraction = np.divide(marks - before, step, out=np.ones_like(marks), where=step > 0)
+    return np.clip(i - 1 + np.clip(fraction, 0.0, 1.0), 0.0, n - 1)
+
+
+def running_integral(values, dt):
+    """Running sum of value * interval (each sample holds until the next), 0 at the first sample."""
+    return np.concatenate(([0.0], np.cumsum(values[:-1] * dt)))
+
+
+def compute_splits(series, split_m):
+    """
+    Splits a session at every `split_m` meters of distance.
+    Crossing times are interpolated between samples, and averages are time-weighted over moving time,
+    so neither the sample rate nor auto-pauses bias them. Everything is computed with NumPy in O(n).
+    :param series: Dictionary of equal-length arrays: "time" (s since start), "moving_time" (s, pauses excluded),
+                   "distance" (cumulative m), "heart_rate", "cadence" and "incline" (0 HR/cadence = no sensor).
+    :param split_m: Split length in meters (see SPLIT_DISTANCES_M).
+    :return: Dictionary of per-split arrays: start_time, end_time (s since start), elapsed_time, timer_time (s),
+             distance (m), avg_speed (m/s), avg_heart_rate, avg_cadence (NaN without samples), avg_incline (%)
+             and climb (m). The last split is partial unless the distance ends on a split boundary.
+    """
+    distance = np.maximum.accumulate(np.asarray(series["distance"], dtype=np.float64))
+    n = len(distance)
+    if n < 2:
+        return {}
+    time = np.asarray(series["time"], dtype=np.float64)
+    moving = np.asarray(series["moving_time"], dtype=np.float64)
+    heart_rate = np.asarray(series["heart_rate"], dtype=np.float64)
+    cadence = np.asarray(series["cadence"], dtype=np.float64)
+    incline = np.asarray(series["incline"], dtype=np.float64)
+
+    # Split boundaries as fractional sample positions; the session end closes the last (partial) split
+    total = distance[-1] - distance[0]
+    full = int(total // split_m)
+    positions = crossing_positions(distance, distance[0] + split_m * np.arange(full + 1))
+    if total - full * split_m > MIN_PARTIAL_SPLIT_M or full == 0:
+        positions = np.append(positions, n - 1)
+    else:
+        positions[-1] = n - 1
+
+    # Running integrals over moving time, read at the boundaries: per-split differences give sums over each split
+    dt = np.diff(moving)
+    has_hr, has_cadence = (heart_rate > 0).astype(np.float64), (cadence > 0).astype(np.float64)
+    climb_steps = np.maximum(np.diff(distance) * incline[1:] / 100, 0.0)
+    columns = {
+        "time": time, "moving": moving, "distance": distance,
+        "hr": running_integral(heart_rate, dt), "hr_time": running_integral(has_hr, dt),
+        "cadence": running_integral(cadence, dt), "cadence_time": running_integral(has_cadence, dt),
+        "incline": running_integral(incline, dt), "climb": np.concatenate(([0.0], np.cumsum(climb_steps))),
+    }
+    index = np.arange(n)
+    delta = {key: np.diff(np.interp(positions, index, values)) for key, values in columns.items()}
+    at_boundary = np.interp(positions, index, time)
+
+    timer_time = delta["moving"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "start_time": at_boundary[:-1],
+            "end_time": at_boundary[1:],
+            "elapsed_time": delta["time"],
+            "timer_time": timer_time,
+            "distance": delta["distance"],
+            "avg_speed": np.where(timer_time > 0, delta["distance"] / timer_time, 0.0),
+            "avg_heart_rate": delta["hr"] / delta["hr_time"],
+            "avg_cadence": delta["cadence"] / delta["cadence_time"],
+            "avg_incline": np.where(timer_time > 0, delta["incline"] / timer_time, 0.0),
+            "climb": delta["climb"],
+        }
@@ -0,0 +1,77 @@
+import socket
+import threading
+import time
+from logger_config import logger
+from telemetry_protocol import PacketEncoder
+from config import TELEMETRY_GROUP, TELEMETRY_PORT, TELEMETRY_RATE_HZ, TELEMETRY_TTL, TELEMETRY_LANES_PER_PACKET
+
+
+class TelemetryExporter:
+    """Sends lane snapshots as fixed-size binary datagrams to a UDP multicast group at a fixed rate."""
+
+    def __init__(self, source, group=TELEMETRY_GROUP, port=TELEMETRY_PORT, rate_hz=TELEMETRY_RATE_HZ,
+                 ttl=TELEMETRY_TTL, lanes_per_packet=TELEMETRY_LANES_PER_PACKET):
+        """
+        Initializes the exporter.
+        :param source: Callable returning {lane id: sensor dictionary}; polled once per send.
+        :param rate_hz: Snapshots sent per second. Every snapshot is sent, changed or not, so receivers see liveness.
+        :param ttl: Multicast TTL (1 keeps packets on the local network).
+        :param lanes_per_packet: Lanes batched into one datagram.
+        """
+        self.source = source
+        self.address = (group, port)
+        self.interval = 1.0 / rate_hz
+        self.encoder = PacketEncoder(lanes_per_packet)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.sequence = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {"packets": 0, "bytes": 0, "lanes": 0, "errors": 0, "encode_s": 0.0}
+
+    def start(self):
+        """Starts the sender thread."""
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+        self.thread.start()
+        logger.info(f"📤 Telemetry exporting to {self.address[0]}:{self.address[1]} at {1 / self.interval:g} Hz")
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stops the sender thread and closes the socket."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+        self.sock.close()
+
+    def run(self):
+        next_send = time.monotonic()
+        while not self.stop_event.wait(max(0.0, next_send - time.monotonic())):
+            now = time.monotonic()
+            if now - next_send > self.interval:
+                next_send = now  # After a stall (GC pause, SIGSTOP, slow source) skip the missed sends instead of bursting
+            next_send += self.interval
+            self.send_snapshot()
+
+    def send_snapshot(self):
+        """Polls the source once and sends its lanes; never raises, so a bad snapshot cannot stop the exporter."""
+        try:
+            snapshots = self.source()
+            start = time.perf_counter()
+            packets = self.encoder.encode(snapshots, self.sequence, int(time.time() * 1000))
+            self.stats["encode_s"] += time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"❌ Telemetry snapshot failed: {e}")
+            self.stats["errors"] += 1
+            return
+
+        self.sequence = (self.sequence + len(packets)) & 0xFFFFFFFF
+        self.stats["lanes"] += len(snapshots)
+        for packet in packets:
+            try:
+                self.sock.sendto(packet, self.address)
+            except OSError as e:
+                self.stats["errors"] += 1
+                logger.debug(f"Telemetry send failed: {e}")
+                continue
+            self.stats["packets"] += 1
+            self.stats["bytes"] += len(packet)
@@ -0,0 +1,121 @@
+"""
+FootPod lane telemetry wire format (UDP multicast).
+
+Standalone on purpose: receivers only need this file and the standard library.
+
+Datagram layout (little-endian):
+    header  : magic "FPTM", version, record size, lane count, pad, sequence (uint32), sender time (ms, uint64)
+    records : lane count x fixed-size lane record
+Receivers must use the record size from the header as the stride, so newer senders can append fields.
+"""
+import socket
+import struct
+from collections import namedtuple
+
+MAGIC = b"FPTM"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBxIQ")
+# lane id, flags, speed (mm/s), heart rate, cadence, distance (cm), incline (0.1 %), RMSSD (0.1 ms), stride count
+RECORD = struct.Struct("<BBHBBIhHH")
+MAX_DATAGRAM = 1472  # Largest UDP payload that is not fragmented on a 1500-byte Ethernet MTU
+MAX_LANES_PER_PACKET = (MAX_DATAGRAM - HEADER.size) // RECORD.size
+
+# Record flags
+FLAG_HEART_RATE = 0x01  # Heart rate is from a connected HRM
+FLAG_RMSSD = 0x02  # RMSSD is valid
+
+NO_RMSSD = 0xFFFF
+
+TelemetryHeader = namedtuple("TelemetryHeader", "version sequence timestamp_ms")
+LaneSample = namedtuple("LaneSample", "lane_id speed heart_rate cadence distance incline rmssd stride_count")
+
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+class PacketEncoder:
+    """Packs lane snapshots into preallocated datagram buffers (no per-sample allocations beyond the output bytes)."""
+
+    def __init__(self, lanes_per_packet=MAX_LANES_PER_PACKET):
+        """
+        Initializes the encoder.
+        :param lanes_per_packet: Lanes batched into one datagram (at most MAX_LANES_PER_PACKET).
+        """
+        if not 1 <= lanes_per_packet <= MAX_LANES_PER_PACKET:
+            raise ValueError(f"lanes_per_packet must be between 1 and {MAX_LANES_PER_PACKET}")
+        self.lanes_per_packet = lanes_per_packet
+        self.buffer = bytearray(HEADER.size + lanes_per_packet * RECORD.size)
+
+    def encode(self, snapshots, sequence, timestamp_ms):
+        """
+        Encodes lane snapshots into datagrams.
+        :param snapshots: {lane id: sensor dictionary}
+        :param sequence: Sequence number of the first datagram; incremented per datagram.
+        :param timestamp_ms: Sender time (UNIX ms) shared by all datagrams of this snapshot.
+        :return: List of datagrams (bytes).
+        """
+        packets = []
+        buffer = self.buffer
+        items = list(snapshots.items())
+        for start in range(0, len(items), self.lanes_per_packet):
+            batch = items[start:start + self.lanes_per_packet]
+            HEADER.pack_into(buffer, 0, MAGIC, VERSION, RECORD.size, len(batch), sequence & 0xFFFFFFFF, timestamp_ms)
+            offset = HEADER.size
+            for lane_id, snapshot in batch:
+                self.pack_lane(offset, lane_id, snapshot)
+                offset += RECORD.size
+            packets.append(bytes(buffer[:offset]))
+            sequence += 1
+        return packets
+
+    def pack_lane(self, offset, lane_id, snapshot):
+        heart_rate = int(snapshot.get("heart_rate") or 0)
+        rmssd = snapshot.get("rmssd")
+        flags = (FLAG_HEART_RATE if heart_rate else 0) | (FLAG_RMSSD if rmssd is not None else 0)
+        RECORD.pack_into(
+            self.buffer, offset, lane_id & 0xFF, flags,
+            _clamp(int((snapshot.get("speed") or 0) * 1000 + 0.5), 0, 0xFFFF),
+            _clamp(heart_rate, 0, 0xFF),
+            _clamp(int(snapshot.get("cadence") or 0), 0, 0xFF),
+            _clamp(int((snapshot.get("distance") or 0) * 100), 0, 0xFFFFFFFF),
+            _clamp(int(round((snapshot.get("incline") or 0) * 10)), -0x8000, 0x7FFF),
+            _clamp(int(round(rmssd * 10)), 0, NO_RMSSD - 1) if rmssd is not None else NO_RMSSD,
+            int(snapshot.get("stride_count") or 0) & 0xFFFF,
+        )
+
+
+def decode_packet(data):
+    """
+    Decodes one datagram.
+    :return: (TelemetryHeader, list of LaneSample) with speed in m/s, distance in m, incline in %,
+             and heart_rate / rmssd set to None when not valid.
+    :raises ValueError: If the datagram is not FootPod telemetry or is truncated.
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError("datagram shorter than the telemetry header")
+    magic, version, record_size, lane_count, sequence, timestamp_ms = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("not a FootPod telemetry datagram")
+    if record_size < RECORD.size or len(view) < HEADER.size + lane_count * record_size:
+        raise ValueError("truncated telemetry datagram")
+
+    lanes = []
+    for offset in range(HEADER.size, HEADER.size + lane_count * record_size, record_size):
+        lane_id, flags, speed, heart_rate, cadence, distance, incline, rmssd, stride_count = RECORD.unpack_from(view, offset)
+        lanes.append(LaneSample(
+            lane_id, speed / 1000, heart_rate if flags & FLAG_HEART_RATE else None, cadence, distance / 100,
+            incline / 10, rmssd / 10 if flags & FLAG_RMSSD else None, stride_count,
+        ))
+    return TelemetryHeader(version, sequence, timestamp_ms), lanes
+
+
+def open_receiver_socket(group, port, interface="0.0.0.0"):
+    """Creates a UDP socket bound to port and joined to the multicast group."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("", port))
+    membership = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton(interface))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    return sock
@@ -0,0 +1,169 @@
+import threading
+import time
+import pytest
+from openant.base.driver import DriverNotFound
+from openant.easy.exception import TransferFailedException
+from ant_node import ManagedAntNode
+from ant_tx import TxScheduler
+
+TX_PERIOD_S = 0.005
+
+
+class FakeChannel:
+    def __init__(self):
+        self.id = 0
+        self.channel_id = None
+        self.opened = False
+        self.closed = False
+        self.sent = []
+        self.on_broadcast_tx_data = None
+
+    def set_rf_freq(self, frequency):
+        pass
+
+    def set_period(self, period):
+        pass
+
+    def set_id(self, device_id, device_type, transmission_type):
+        self.channel_id = (device_id, device_type, transmission_type)
+
+    def open(self):
+        self.opened = True
+
+    def close(self):
+        self.closed = True
+
+    def send_broadcast_data(self, payload):
+        self.sent.append(list(payload))
+
+    def wait_for_event(self, ok_codes):
+        raise TransferFailedException()  # No watch acknowledges
+
+
+class FakeAnt:
+    def __init__(self):
+        self.acknowledged = []
+
+    def send_acknowledged_data(self, channel, payload):
+        self.acknowledged.append((channel, list(payload)))
+
+
+class FakeNode:
+    """Stand-in for openant's Node: fires TX events until stopped, optionally failing after `tx_events` of them."""
+
+    def __init__(self, fault=None, tx_events=20):
+        """
+        :param fault: None, "raise" (start() raises a USB error) or "stall" (TX events stop, as with an unplugged stick).
+        """
+        self.fault = fault
+        self.tx_events = tx_events
+        self.channel = None
+        self.ant = FakeAnt()
+        self.running = True
+        self.stopped = threading.Event()
+
+    def new_channel(self, channel_type):
+        self.channel = FakeChannel()
+        return self.channel
+
+    def set_network_key(self, network, key):
+        pass
+
+    def start(self):
+        fired = 0
+        while self.running:
+            time.sleep(TX_PERIOD_S)
+            if self.fault and fired >= self.tx_events:
+                if self.fault == "raise":
+                    raise OSError(19, "No such device")
+                continue
+            self.channel.on_broadcast_tx_data([0] * 8)
+            fired += 1
+
+    def stop(self):
+        self.running = False
+        self.stopped.set()
+
+
+def make_node(outcomes):
+    """ManagedAntNode whose factory yields the given FakeNodes or raises the given exceptions, then healthy nodes."""
+    created = []
+    outcomes = list(outcomes)
+
+    def factory():
+        outcome = outcomes.pop(0) if outcomes else FakeNode()
+        if isinstance(outcome, Exception):
+            raise outcome
+        created.append(outcome)
+        return outcome
+
+    scheduler = TxScheduler({"speed": 2.75, "cadence": 170, "incline": 1.0, "heart_rate": 150}, precompute=False)
+    ant_node = ManagedAntNode(scheduler, node_factory=factory, stall_timeout=0.05, backoff=0.01, max_backoff=0.02, stop_timeout=0.5)
+    return ant_node, created
+
+def run_until(ant_node, condition, timeout=3.0):
+    thread = threading.Thread(target=ant_node.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    reached = condition()
+    ant_node.stop()
+    thread.join(1.0)
+    assert reached and not thread.is_alive()
+
+def test_nothing_is_opened_until_run():
+    """Test that the node is opened lazily, so importing the broadcaster needs no stick."""
+    ant_node, created = make_node([])
+    assert created == [] and ant_node.node is None
+
+def test_usb_error_reopens_with_same_channel_id_and_page_state():
+    """Test that a node raising a USB error is replaced and the page rotation continues where it left off."""
+    ant_node, created = make_node([FakeNode(fault="raise", tx_events=10)])
+    run_until(ant_node, lambda: len(created) == 2 and len(created[1].channel.sent) >= 5)
+
+    first, second = created[0].channel, created[1].channel
+    assert first.channel_id == second.channel_id == ant_node.channel_id
+    assert second.sent[0] == first.sent[-1]  # The new channel is primed with the latest page
+    pages = [payload[0] for payload in first.sent + second.sent[1:]]
+    assert pages[:2] == [80, 81]
+    assert 80 not in pages[2:]  # No restart of the rotation, which would resend the device info pages
+    assert ant_node.stats["reattaches"] == 1 and ant_node.stats["faults"] == 1
+    assert ant_node.stats["last_downtime_s"] > 0 and ant_node.downtime() == ant_node.stats["downtime_s"]
+    assert second.closed  # stop() closes the live channel
+
+def test_silent_stick_is_detected_by_the_tx_watchdog():
+    """Test that a stick that stops firing TX events (openant only logs the USB errors) is reopened."""
+    ant_node, created = make_node([FakeNode(fault="stall", tx_events=5)])
+    run_until(ant_node, lambda: len(created) == 2 and ant_node.up)
+    assert created[0].stopped.is_set()
+    assert ant_node.stats["reattaches"] == 1
+
+def test_missing_stick_is_retried_with_backoff():
+    """Test that a stick that is not plugged in yet is opened once it appears, without counting downtime."""
+    ant_node, created = make_node([DriverNotFound(), DriverNotFound(), DriverNotFound()])
+    run_until(ant_node, lambda: len(created) == 1 and ant_node.up)
+    assert ant_node.stats["open_failures"] == 3
+    assert ant_node.stats["reattaches"] == 0 and ant_node.downtime() == 0.0
+
+def test_acknowledged_send_fails_while_the_stick_is_down():
+    """Test that page replies are refused instead of being sent to a released channel."""
+    ant_node, _ = make_node([])
+    with pytest.raises(RuntimeError):
+        ant_node.send_acknowledged([80] + [0] * 7)
+
+def test_acknowledged_send_is_a_single_attempt():
+    """Test that a failed acknowledged transfer raises instead of being retried inside openant."""
+    ant_node, created = make_node([])
+    thread = threading.Thread(target=ant_node.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 3.0
+    while not ant_node.up and time.monotonic() < deadline:
+        time.sleep(0.005)
+    try:
+        with pytest.raises(TransferFailedException):
+            ant_node.send_acknowledged([80] + [0] * 7)
+        assert created[0].ant.acknowledged == [(0, [80] + [0] * 7)]
+    finally:
+        ant_node.stop()
+        thread.join(1.0)
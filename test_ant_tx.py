@@ -0,0 +1,142 @@
+import time
+from unittest.mock import patch
+import threading
+from openant.easy.exception import TransferFailedException
+from ant_tx import TxScheduler, PageRequestResponder, parse_page_request, page_1, page_2, page_80, page_81
+from ant_tx import apply_tx_thread_settings, DEVICE_INFO_INTERVAL
+from config import ANT_ACK_MAX_ATTEMPTS
+
+def make_sensor_data():
+    return {"speed": 2.75, "cadence": 170, "incline": 1.0, "heart_rate": 150}
+
+def test_pages_keep_the_foot_pod_layout():
+    """Test the byte layout of the speed/distance and cadence pages."""
+    assert page_1(300.4, 2.75, 321) == [1, 0xFF, 0xFF, 300 & 0xFF, (300 & 0x0F) << 4 | 2, 192, 321 & 0xFF, 0x20]
+    assert page_2(170, 2.75, 150) == [2, 0xFF, 0xFF, 85, (85 % 16) << 4 | 2, 192, 150, 0x20]
+
+def test_page_rotation_sends_device_info_on_separate_messages():
+    """Test that pages 80 and 81 get their own TX slots instead of overwriting each other."""
+    scheduler = TxScheduler(make_sensor_data(), precompute=False)
+    pages = [scheduler.next_payload()[0] for _ in range(DEVICE_INFO_INTERVAL + 2)]
+    assert pages[:4] == [80, 81, 2, 1]
+    assert pages[DEVICE_INFO_INTERVAL:] == [80, 81]
+    assert set(pages[2:DEVICE_INFO_INTERVAL]) == {1, 2}
+
+def test_precompute_hands_over_prepared_payload():
+    """Test that the callback returns the prepared page and the next one is built ahead of its TX event."""
+    scheduler = TxScheduler(make_sensor_data(), precompute=True, period=0.05, lead=0.04).start()
+    try:
+        first = scheduler.ready
+        with patch.object(scheduler, "build_payload", wraps=scheduler.build_payload) as build:
+            assert scheduler.next_payload() is first
+            build.assert_not_called()  # Nothing is computed in the callback
+            time.sleep(0.03)
+            build.assert_called_once_with(1)
+        assert scheduler.ready[0] == 81
+        assert scheduler.next_payload()[0] == 81
+        assert scheduler.late == 0
+    finally:
+        scheduler.stop()
+    assert not scheduler.thread.is_alive()
+
+def test_late_prepare_resends_previous_page():
+    """Test that a TX event arriving before the next page is ready reuses the previous page and is counted."""
+    scheduler = TxScheduler(make_sensor_data(), precompute=True, period=10, lead=0).start()
+    try:
+        first = scheduler.next_payload()
+        assert scheduler.next_payload() is first
+        assert scheduler.late == 1
+    finally:
+        scheduler.stop()
+
+def test_realtime_settings_fail_softly():
+    """Test that missing privileges only log a warning."""
+    with patch("ant_tx.os.sched_setaffinity") as affinity, \
+         patch("ant_tx.os.sched_setscheduler", side_effect=PermissionError("not permitted")), \
+         patch("ant_tx.logger") as logger:
+        apply_tx_thread_settings(cpus={0}, fifo_priority=50)
+    affinity.assert_called_once_with(0, {0})
+    assert "SCHED_FIFO" in logger.warning.call_args[0][0]
+
+def page_request(page, response, command=0x01):
+    return bytes([70, 0xFF, 0xFF, 0xFF, 0xFF, response, page, command])
+
+def test_parse_page_request():
+    """Test decoding of the transmission response byte of Page 70."""
+    assert parse_page_request(page_request(80, 0x04)) == (80, 4, False, 0x01, 1)
+    assert parse_page_request(page_request(81, 0x82)) == (81, 2, True, 0x01, 1)
+    assert parse_page_request(page_request(81, 0x80)) == (81, 1, True, 0x01, ANT_ACK_MAX_ATTEMPTS)  # Until acknowledged
+    assert parse_page_request(page_1(0, 0, 0)) is None
+
+def test_broadcast_request_is_answered_on_the_next_tx_slots():
+    """Test that requested pages preempt the rotation for the requested number of TX events."""
+    scheduler = TxScheduler(make_sensor_data(), precompute=False)
+    scheduler.next_payload()
+    scheduler.next_payload()  # Past the device info slots
+    responder = PageRequestResponder(scheduler, send_acknowledged=None)
+
+    responder.on_data(page_request(81, 0x02))
+    pages = [scheduler.next_payload() for _ in range(3)]
+    assert pages[:2] == [page_81(), page_81()]
+    assert pages[2][0] in (1, 2)
+    assert scheduler.message_count == 3  # Replies do not consume rotation slots
+
+def test_acknowledged_request_is_sent_off_the_tx_thread():
+    """Test that acknowledged replies go through the blocking sender on the ack thread."""
+    sent, done = [], threading.Event()
+
+    def send_acknowledged(payload):
+        sent.append(payload)
+        if len(sent) == 3:
+            done.set()
+
+    scheduler = TxScheduler(make_sensor_data(), precompute=False)
+    responder = PageRequestResponder(scheduler, send_acknowledged)
+    responder.on_data(page_request(80, 0x83))
+    assert done.wait(1)
+    responder.stop()
+    assert sent == [page_80()] * 3
+    assert not scheduler.responses
+
+def test_acknowledged_retries_are_bounded():
+    """Test that a watch that never acknowledges gets a bounded number of attempts, counted as failed."""
+    attempts = []
+
+    def send_acknowledged(payload):
+        attempts.append(payload)
+        raise TransferFailedException()
+
+    scheduler = TxScheduler(make_sensor_data(), precompute=False)
+    responder = PageRequestResponder(scheduler, send_acknowledged)
+    responder.on_data(page_request(80, 0x80))  # Until acknowledged
+    responder.on_data(page_request(81, 0x83))  # Three acknowledged transmissions, one attempt each
+    responder.acks.join()
+    responder.stop()
+    assert attempts == [page_80()] * ANT_ACK_MAX_ATTEMPTS + [page_81()] * 3
+    assert responder.stats["ack_failed"] == 4
+
+def test_unsupported_requests_are_ignored():
+    """Test that unknown pages and commands are counted but not answered."""
+    scheduler = TxScheduler(make_sensor_data(), precompute=False)
+    responder = PageRequestResponder(scheduler, send_acknowledged=None)
+    responder.on_data(page_request(99, 0x01))
+    responder.on_data(page_request(80, 0x01, command=0x02))
+    responder.on_data(page_2(160, 2.5, 140))
+    assert responder.stats == {"requests": 2, "answered": 0, "unsupported": 2, "ack_failed": 0}
+    assert not scheduler.responses
+
+def test_idle_pattern_sends_a_stationary_page_at_a_low_rate():
+    """Test that a paused belt gets a new page every idle_interval TX events, with speed and cadence at 0."""
+    sensor_data = make_sensor_data()
+    scheduler = TxScheduler(sensor_data, precompute=False, idle_interval=4)
+    for _ in range(3):
+        scheduler.next_payload()
+    scheduler.set_idle(True)
+
+    payloads = [scheduler.next_payload() for _ in range(8)]
+    assert [payload is not None for payload in payloads] == [False, False, False, True] * 2
+    assert payloads[3] == page_1(sensor_data["distance"], 0.0, sensor_data["stride_count"])  # Message 3: page 1
+    assert payloads[7][0] == 2 and payloads[7][3] == 0  # Cadence reported as 0
+
+    scheduler.set_idle(False)
+    assert scheduler.next_payload() is not None
@@ -0,0 +1,132 @@
+import csv
+import os
+import pytest
+from batch_export import BatchExporter, read_session, main
+from fit_generator import FitFileGenerator
+from sample_journal import SampleJournal
+
+def make_records(start, seconds, speed=2.5):
+    return [{"timestamp": start + t, "speed": speed, "distance": speed * t, "cadence": 80, "heart_rate": 130 + t % 10,
+             "incline": 1.0} for t in range(seconds)]
+
+def write_fit(path, records, rr_intervals=()):
+    generator = FitFileGenerator(filename=str(path), archive_dir=None, journal_dir=None)
+    generator.records = records
+    generator.add_hrv(rr_intervals)
+    generator.save_fit_file()
+
+@pytest.fixture
+def session_dir(tmp_path):
+    sessions = tmp_path / "sessions"
+    (sessions / "2024").mkdir(parents=True)
+    write_fit(sessions / "a.fit", make_records(1700000000, 120), [800, 810, 790])
+    write_fit(sessions / "2024" / "b.fit", make_records(1700100000, 60, speed=3.0))
+    journal = SampleJournal(str(sessions / "c.journal"), 1700200000, fsync_interval=60)
+    for record in make_records(1700200000, 30):
+        journal.append(record)
+    journal.close()
+    (sessions / "broken.fit").write_bytes(b"not a fit file")
+    return sessions
+
+def test_read_session_round_trips_fit_records_and_hrv(session_dir):
+    """Test that a FIT input yields the records and RR intervals it was written with."""
+    session = read_session(str(session_dir / "a.fit"))
+    assert session.start_time == 1700000000
+    assert len(session.records) == 120 and session.records[10]["heart_rate"] == 130
+    assert session.rr_intervals == [800, 810, 790]
+    assert session.has_incline and session.records[10]["incline"] == 1.0
+
+def test_read_session_keeps_journaled_pauses(tmp_path):
+    """Test that a journal input yields its auto-pause timer events without the belt-stopped seconds."""
+    journal = SampleJournal(str(tmp_path / "p.journal"), 1700000000, fsync_interval=60)
+    for record in make_records(1700000000, 25):
+        journal.append(record)
+    journal.append_timer_event(1700000019, "stop")
+    journal.append_timer_event(1700000040, "start")
+    for record in make_records(1700000040, 10):
+        journal.append(record)
+    journal.close()
+
+    session = read_session(journal.path)
+    assert session.timer_events == [(1700000019, "stop"), (1700000040, "start")]
+    assert len(session.records) == 30 and session.records[19]["timestamp"] == 1700000019
+
+def test_export_keeps_pauses_and_incline(tmp_path):
+    """Test that a regenerated FIT file keeps the auto-pause timer events, moving time and incline."""
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    generator = FitFileGenerator(filename=str(sessions / "p.fit"), archive_dir=None, journal_dir=None)
+    generator.records = make_records(1700000000, 60)
+    generator.timer_events = [(1700000019, "stop"), (1700000040, "start")]
+    generator.records = [r for r in generator.records if not 1700000019 < r["timestamp"] < 1700000040]
+    generator.save_fit_file()
+
+    output = tmp_path / "exports"
+    assert BatchExporter(str(output), formats=("fit", "csv"), workers=1).run(str(sessions))["exported"] == 1
+    original, exported = read_session(str(sessions / "p.fit")), read_session(str(output / "p.fit"))
+    assert exported.timer_events == original.timer_events
+    assert ("stop", "start") == tuple(kind for _, kind in exported.timer_events[1:3])
+    assert [r["incline"] for r in exported.records] == [1.0] * len(original.records)
+
+def test_fit_without_incline_exports_empty_incline(tmp_path):
+    """Test that FIT files without the grade field export incline as unavailable instead of 0 %."""
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    records = make_records(1700000000, 30)
+    for record in records:
+        del record["incline"]
+    write_fit(sessions / "old.fit", records)
+
+    output = tmp_path / "exports"
+    assert BatchExporter(str(output), formats=("csv", "png"), workers=1).run(str(sessions))["exported"] == 1
+    with open(output / "old.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["incline"] == "" and float(rows[0]["speed"]) == 2.5
+
+def test_sessions_with_the_same_output_name_are_rejected(session_dir, tmp_path):
+    """Test that a.fit and a.journal do not overwrite each other's outputs."""
+    journal = SampleJournal(str(session_dir / "a.journal"), 1700300000, fsync_interval=60)
+    for record in make_records(1700300000, 10):
+        journal.append(record)
+    journal.close()
+
+    output = tmp_path / "exports"
+    stats = BatchExporter(str(output), formats=("csv",), workers=1).run(str(session_dir))
+    assert (stats["exported"], stats["failed"]) == (3, 2)  # a.journal and the broken file
+    with open(output / "a.csv") as f:
+        assert len(list(csv.DictReader(f))) == 120  # a.fit's outputs
+
+def test_batch_export_writes_outputs_and_skips_current_sessions(session_dir, tmp_path):
+    """Test a parallel export, an incremental rerun, and re-export after an input change."""
+    output = tmp_path / "exports"
+    exporter = BatchExporter(str(output), formats=("fit", "csv"), workers=2, chunk_size=1)
+    stats = exporter.run(str(session_dir))
+    assert (stats["exported"], stats["skipped"], stats["failed"]) == (3, 0, 1)
+    assert stats["samples"] == 120 + 60 + 30
+    assert (output / "2024" / "b.fit").exists() and (output / "c.csv").exists()
+
+    with open(output / "a.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 120 and float(rows[1]["speed"]) == 2.5
+
+    stats = exporter.run(str(session_dir))
+    assert (stats["exported"], stats["skipped"], stats["failed"]) == (0, 3, 1)  # The broken file is retried
+
+    write_fit(session_dir / "a.fit", make_records(1700000000, 90))
+    os.remove(output / "c.csv")
+    stats = exporter.run(str(session_dir))
+    assert stats["exported"] == 2  # Changed input and missing output
+    assert BatchExporter(str(output), formats=("fit", "csv"), force=True).run(str(session_dir))["exported"] == 3
+
+def test_requesting_new_format_reexports(session_dir, tmp_path):
+    """Test that outputs built without a requested format are not treated as current."""
+    output = tmp_path / "exports"
+    BatchExporter(str(output), formats=("csv",), workers=1).run(str(session_dir))
+    stats = BatchExporter(str(output), formats=("csv", "fit"), workers=1).run(str(session_dir))
+    assert stats["exported"] == 3
+
+def test_cli_rejects_unknown_format(capsys):
+    """Test that an unknown output format is a usage error."""
+    with pytest.raises(SystemExit):
+        main(["--formats", "xlsx"])
+    assert "unknown formats" in capsys.readouterr().err
@@ -0,0 +1,72 @@
+from clock import VirtualClock
+from belt_state import BeltStateDetector, RUNNING, PAUSED
+from data_processor import reset_metrics
+from session_simulator import SessionSimulator
+from treadmill_service import TreadmillService, parse_machine_status, parse_training_status
+
+def make_detector():
+    clock = VirtualClock(start=1000.0)
+    detector = BeltStateDetector(stop_speed_mps=0.3, pause_delay_s=3.0, clock=clock)
+    changes = []
+    detector.add_listener(lambda state, timestamp, reason: changes.append((state, timestamp)))
+    return clock, detector, changes
+
+def test_stopped_belt_pauses_from_the_moment_it_stopped():
+    """Test that a belt below the stop speed pauses after the delay, dated back to when it stopped."""
+    clock, detector, changes = make_detector()
+    for second, speed in enumerate([2.5, 2.5, 0.0, 0.1, 0.0, 0.0, 0.0, 2.0]):
+        clock.now = 1000.0 + second
+        detector.update_speed(speed)
+
+    assert changes == [(PAUSED, 1002.0), (RUNNING, 1007.0)]
+    assert detector.stats == {"pauses": 1, "paused_s": 5.0}
+
+def test_short_speed_dip_does_not_pause():
+    """Test that the pause delay filters a momentary speed glitch."""
+    clock, detector, changes = make_detector()
+    for second, speed in enumerate([2.5, 0.0, 0.0, 2.5, 2.5]):
+        clock.now = 1000.0 + second
+        detector.update_speed(speed)
+    assert changes == [] and detector.state == RUNNING
+
+def test_machine_pause_holds_until_the_belt_has_slowed_down():
+    """Test that an FTMS pause applies at once and the decelerating belt does not resume the session."""
+    clock, detector, changes = make_detector()
+    detector.update_machine_status(*parse_machine_status(bytes([0x02, 0x02])))
+    detector.update_speed(1.5)  # Still spinning down
+    assert detector.paused
+
+    detector.update_speed(0.0)
+    clock.now += 20
+    detector.update_speed(2.0)
+    assert changes == [(PAUSED, 1000.0), (RUNNING, 1020.0)]
+
+def test_ftms_status_parsing():
+    """Test the Machine Status and Training Status events that change the belt state."""
+    assert parse_machine_status(bytes([0x02, 0x01])) == (False, "treadmill stopped")
+    assert parse_machine_status(bytes([0x03])) == (False, "safety key pulled")
+    assert parse_machine_status(bytes([0x04])) == (True, "treadmill started")
+    assert parse_machine_status(bytes([0x05, 0x2C, 0x01]))[0] is None  # Target speed changed
+    assert parse_training_status(bytes([0x00, 0x01])) == (False, "training status idle")
+    assert parse_training_status(bytes([0x00, 0x0D]))[0] is None  # Manual mode
+
+    events = []
+    service = TreadmillService(status_callback=lambda running, reason: events.append(running))
+    service.machine_status_handler(0, bytes([0x04]))
+    service.training_status_handler(0, bytes([0x00, 0x0F]))
+    service.machine_status_handler(0, bytes([0x06, 0x0A, 0x00]))
+    assert events == [True, False]
+
+def test_simulated_session_excludes_belt_stops_from_moving_time():
+    """Test auto-pause end to end: FIT records, laps and the ANT+ idle pattern follow the belt."""
+    simulator = SessionSimulator(600, start_time=1_700_000_000, belt_stops=((200, 100),))
+    simulator.fit_generator.lap_mode = "pauses"
+    try:
+        generator = simulator.run()
+    finally:
+        reset_metrics()
+
+    assert generator.timer_segments() == [(1_700_000_000, 1_700_000_200), (1_700_000_300, 1_700_000_600)]
+    assert generator.build_summary()["duration"] == 500
+    assert [lap["lap_trigger"] for lap in generator.build_laps()] == ["fitness_equipment", "session_end"]
+    assert simulator.tx_sent < simulator.tx_count  # Fewer new pages while paused
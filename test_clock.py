@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from clock import VirtualClock
+from data_processor import compute_metrics, reset_metrics
+from fit_generator import FitFileGenerator
+from session_simulator import SessionSimulator
+
+@pytest.mark.asyncio
+async def test_virtual_clock_wakes_sleepers_in_time_order():
+    """Sleepers wake in deadline order and see the simulated time of their deadline."""
+    clock = VirtualClock(start=1000.0)
+    woken = []
+
+    async def sleeper(name, seconds):
+        await clock.sleep(seconds)
+        woken.append((name, clock.time()))
+
+    tasks = [asyncio.create_task(sleeper("slow", 5)), asyncio.create_task(sleeper("fast", 0.5))]
+    await clock.run(until=1003.0)
+    assert woken == [("fast", 1000.5)]
+    assert clock.time() == 1003.0 and clock.monotonic() == 3.0
+
+    await clock.run(until=1010.0)
+    assert woken[-1] == ("slow", 1005.0)
+    await asyncio.gather(*tasks)
+
+def test_metrics_and_fit_records_follow_the_injected_clock():
+    """Distance integrates over simulated time and FIT records carry simulated timestamps."""
+    clock = VirtualClock(start=1_700_000_000)
+    generator = FitFileGenerator(archive_dir=None, journal_dir=None, clock=clock)
+    sensor_data = {"speed": 2.0, "cadence": 120, "incline": 0.0, "heart_rate": 130}
+    try:
+        reset_metrics(clock)
+        clock.now += 10
+        metrics = compute_metrics(sensor_data, clock)
+        generator.add_record(sensor_data)
+    finally:
+        reset_metrics()
+
+    assert metrics["distance"] == pytest.approx(20.0)
+    assert metrics["stride_count"] == pytest.approx(20.0)
+    assert generator.start_time == 1_700_000_000
+    assert generator.records[-1]["timestamp"] == 1_700_000_010
+
+def test_simulated_session_runs_faster_than_real_time():
+    """A 10-minute mock workout is replayed in simulated time with one FIT record per second."""
+    simulator = SessionSimulator(600, start_time=1_700_000_000)
+    try:
+        generator = simulator.run()
+    finally:
+        reset_metrics()
+
+    assert len(generator.records) == 601
+    assert generator.records[-1]["timestamp"] - generator.start_time == 600
+    assert len(generator.rr_intervals) == 601
+    assert simulator.sensor_data["distance"] == pytest.approx(600 * 3.0 / 3.6, rel=0.01)
@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import os
+from unittest.mock import MagicMock
+import pytest
+from dashboard_server import (DashboardServer, DashboardClient, encode_frame, decode_frame, quantize,
+                              websocket_accept, KEYFRAME, DELTA)
+
+def test_websocket_accept_matches_rfc_example():
+    """Test the handshake key from RFC 6455 section 1.3."""
+    assert websocket_accept("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+def test_delta_frame_only_carries_changed_fields():
+    """Test that a delta contains only changed fields and decodes onto the previous state."""
+    base = {1: quantize({"speed": 2.5, "heart_rate": 140, "cadence": 80, "distance": 100.0, "incline": 1.0})}
+    current = {1: quantize({"speed": 2.5, "heart_rate": 142, "cadence": 80, "distance": 101.2, "incline": 1.0}),
+               2: quantize({"speed": 3.0, "heart_rate": 150, "cadence": 84, "distance": 50.0, "incline": -1.5})}
+
+    lanes = {}
+    assert decode_frame(encode_frame({}, base, 0, 1), lanes)[0] == KEYFRAME
+    delta = encode_frame(base, current, 1, 2)
+    assert decode_frame(delta, lanes) == (DELTA, 1, 2)
+
+    assert len(delta) == 9 + 2 + 1 + 4 + 2 + 10  # Header, lane 1 (HR + distance), lane 2 (all fields)
+    assert lanes[1] == {"speed": 2.5, "heart_rate": 142, "cadence": 80, "distance": 101.2, "incline": 1.0}
+    assert lanes[2]["incline"] == -1.5
+
+def fake_client(buffered=0):
+    writer = MagicMock()
+    writer.transport.get_write_buffer_size.return_value = buffered
+    return DashboardClient(writer)
+
+def test_slow_clients_get_coalesced_updates():
+    """Test that a client with a full send buffer is skipped and later receives one combined delta."""
+    snapshot = {"speed": 2.0, "heart_rate": 120, "cadence": 80, "distance": 0.0, "incline": 0.0}
+    server = DashboardServer(lambda: {1: snapshot}, buffer_limit=1000)
+    fast, slow = fake_client(), fake_client()
+    server.clients = {fast, slow}
+
+    server.tick()  # Both receive the keyframe
+    slow.writer.transport.get_write_buffer_size.return_value = 5000
+    for distance in (10.0, 20.0, 30.0):
+        snapshot["distance"] = distance
+        server.tick()
+
+    assert fast.writer.write.call_count == 4
+    assert slow.writer.write.call_count == 1
+    assert slow.skipped == 3
+
+    slow.writer.transport.get_write_buffer_size.return_value = 0
+    server.tick()  # Nothing new for the fast client, one combined delta for the slow one
+    assert fast.writer.write.call_count == 4
+    assert slow.writer.write.call_count == 2
+
+    lanes = {}
+    for call in slow.writer.write.call_args_list:
+        decode_frame(call.args[0][2:], lanes)  # Strip the 2-byte WebSocket header
+    assert lanes[1]["distance"] == 30.0
+
+def test_identical_frames_are_encoded_once():
+    """Test that clients at the same version share one encoded frame."""
+    server = DashboardServer(lambda: {1: {"speed": 1.0}})
+    server.clients = {fake_client() for _ in range(20)}
+    server.tick()
+    assert server.stats["encodes"] == 1 and server.stats["frames"] == 20
+
+@pytest.mark.asyncio
+async def test_websocket_end_to_end():
+    """Test the HTTP page and a WebSocket client receiving a keyframe then a delta."""
+    snapshot = {"speed": 2.0, "heart_rate": 120, "cadence": 80, "distance": 0.0, "incline": 0.0}
+    server = DashboardServer(lambda: {7: snapshot}, host="127.0.0.1", port=0, max_rate_hz=50).start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")
+        assert b"FootPod Live" in await reader.read()
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(f"GET /ws HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+        assert websocket_accept(key).encode() in await reader.readuntil(b"\r\n\r\n")
+
+        lanes = {}
+        for expected in (KEYFRAME, DELTA):
+            if expected == DELTA:
+                snapshot["heart_rate"] = 130
+            header = await reader.readexactly(2)
+            frame_type = decode_frame(await reader.readexactly(header[1]), lanes)[0]
+            assert frame_type == expected
+        assert lanes[7]["heart_rate"] == 130
+
+        writer.write(bytes([0x88, 0x80]) + b"\0\0\0\0")  # Masked close frame
+        await writer.drain()
+        writer.close()
+    finally:
+        server.stop()
+
+@pytest.mark.asyncio
+async def test_oversized_client_frame_is_refused():
+    """Test that a frame announcing a huge payload closes the connection with 1009 instead of being read."""
+    server = DashboardServer(lambda: {}, host="127.0.0.1", port=0, max_client_frame=125)
+    reader = asyncio.StreamReader()
+    reader.feed_data(bytes([0x89, 0xFF]) + (1 << 40).to_bytes(8, "big") + b"\0\0\0\0")
+    writer = MagicMock()
+    await server.read_client_frames(reader, writer)
+    writer.write.assert_called_once_with(bytes([0x88, 0x02]) + (1009).to_bytes(2, "big"))
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from unittest.mock import patch
+from diagnostics import IntervalTracker, LoopLagProbe, HealthMonitor, thread_census, top_allocations
+
+class LoopThread:
+    """Runs an asyncio loop on a thread, like the BLE services do."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="hrm-service", daemon=True)
+        self.thread.start()
+
+    def block(self, seconds):
+        self.loop.call_soon_threadsafe(time.sleep, seconds)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(1)
+        self.loop.close()
+
+def test_interval_tracker_reports_rate_and_jitter():
+    """Test that one late tick shows up as jitter and the window resets on take()."""
+    tracker = IntervalTracker(expected_s=0.01)
+    times = iter([0.0, 0.01, 0.02, 0.05, 0.06])
+    with patch("diagnostics.time.perf_counter", lambda: next(times)):
+        for _ in range(5):
+            tracker.tick()
+
+    stats = tracker.take()
+    assert stats["count"] == 4
+    assert stats["rate_hz"] == 4 / 0.06
+    assert round(stats["jitter_max_ms"]) == 20
+    assert round(stats["jitter_p50_ms"]) == 0 and round(stats["jitter_p99_ms"]) == 20
+    assert tracker.take()["count"] == 0
+
+def test_loop_lag_probe_detects_blocked_loop():
+    """Test that a blocking call inside the loop is reported as lag."""
+    runner = LoopThread()
+    try:
+        probe = LoopLagProbe(runner.loop, interval=0.01)
+        time.sleep(0.05)
+        assert probe.take() < 50
+        runner.block(0.15)
+        time.sleep(0.25)
+        assert probe.take() >= 100
+    finally:
+        runner.close()
+    assert not probe.alive
+
+def test_thread_census_flags_leaked_respawns():
+    """Test that duplicate service threads are counted by name and raise a warning."""
+    runners = [LoopThread(), LoopThread(), LoopThread()]
+    try:
+        assert thread_census()["hrm-service"] == 3
+        monitor = HealthMonitor(intervals={}, threads_per_name_warn=2)
+        snapshot = monitor.sample()
+        assert any("hrm-service" in warning for warning in snapshot["warnings"])
+    finally:
+        for runner in runners:
+            runner.close()
+
+def test_monitor_probes_new_loops_after_respawn():
+    """Test that loops from the source are probed, and a replaced loop gets a new probe."""
+    first, second = LoopThread(), LoopThread()
+    loops = {"hrm": first.loop}
+    monitor = HealthMonitor(lambda: dict(loops), gauges={"fit_records": lambda: 42}, intervals={})
+    try:
+        monitor.sample()
+        assert monitor.probes["hrm"].loop is first.loop
+        loops["hrm"] = second.loop
+        snapshot = monitor.sample()
+        assert monitor.probes["hrm"].loop is second.loop
+        assert snapshot["gauges"] == {"fit_records": 42}
+        assert "lag hrm=" in HealthMonitor.format_line(monitor.sample())
+        assert monitor.snapshot() is monitor.last
+    finally:
+        monitor.stop()
+        first.close()
+        second.close()
+
+def test_report_does_not_consume_the_sample_window():
+    """Test that an on-demand report shows the last sample instead of resetting the jitter window."""
+    tracker = IntervalTracker(expected_s=0.01)
+    times = iter([0.0, 0.01, 0.05, 0.2])
+    monitor = HealthMonitor(intervals={"ant_tx": tracker})
+    with patch("diagnostics.time.perf_counter", lambda: next(times)), patch("diagnostics.top_allocations", return_value=[]):
+        for _ in range(3):
+            tracker.tick()
+        monitor.log_report()  # No sample yet: takes the first one
+        assert round(monitor.last["intervals"]["ant_tx"]["jitter_max_ms"]) == 30
+
+        tracker.tick()  # 140 ms late
+        monitor.log_report()
+
+    assert round(monitor.sample()["intervals"]["ant_tx"]["jitter_max_ms"]) == 140
+
+def test_allocation_tracing_stops_after_the_second_report():
+    """Test that tracemalloc only runs between a pair of reports."""
+    assert top_allocations() == [] and tracemalloc.is_tracing()
+    blocks = [bytearray(1024) for _ in range(100)]
+    assert top_allocations(limit=5) and not tracemalloc.is_tracing()
+    del blocks
+
+def test_shutdown_stops_the_health_monitor():
+    """Test that main keeps the monitor it starts and stops it explicitly during shutdown."""
+    import signal
+    import main
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        with patch.object(main, "DIAG_ENABLED", True), patch.object(main, "DASHBOARD_ENABLED", False), \
+                patch.object(main, "TELEMETRY_ENABLED", False):
+            assert main.start_optional_services() == []
+        monitor = main.health_monitor
+        assert monitor.thread.is_alive()
+
+        ant_thread = threading.Thread(target=lambda: None)
+        ant_thread.start()
+        with patch.object(main, "stop_services", return_value=0.0), patch.object(main, "stop_broadcasting"):
+            main.shutdown(ant_thread)
+        assert main.health_monitor is None and not monitor.thread.is_alive()
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
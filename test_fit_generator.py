@@ -0,0 +1,65 @@
+import fitparse
+import pytest
+from clock import VirtualClock
+from fit_generator import FitFileGenerator
+
+def test_save_fit_file_with_records_and_hrv(tmp_path):
+    """Test that saved FIT files contain records and HRV messages readable by fitparse."""
+    generator = FitFileGenerator(filename=str(tmp_path / "workout.fit"), archive_dir=None)
+    generator.add_record({"speed": 2.5, "distance": 100.0, "cadence": 80, "heart_rate": 140})
+    generator.add_hrv([800, 810, 790, 805, 800, 820])
+    generator.save_fit_file()
+
+    fit = fitparse.FitFile(generator.filename, check_crc=True)
+    records = [message.get_values() for message in fit.get_messages("record")]
+    hrv = [value for message in fit.get_messages("hrv") for value in message.get_value("time") if value is not None]
+
+    assert records[0]["heart_rate"] == 140
+    assert records[0]["speed"] == 2.5
+    assert records[0]["distance"] == 100.0
+    assert hrv == [0.8, 0.81, 0.79, 0.805, 0.8, 0.82]
+
+def test_auto_pause_writes_timer_events_and_laps(tmp_path):
+    """Test that a pause drops the stopped seconds, brackets the records with timer events and closes a lap."""
+    clock = VirtualClock(start=1760000000)
+    generator = FitFileGenerator(filename=str(tmp_path / "workout.fit"), archive_dir=None, journal_dir=None, clock=clock,
+                                 lap_mode="pauses")
+    for second in range(40):
+        clock.now = 1760000000 + second
+        if second == 13:
+            generator.pause(1760000010)  # Belt stopped at t=10, detected 3 s later
+        elif second == 30:
+            generator.resume()
+        generator.add_record({"speed": 2.5, "distance": 2.5 * min(second, 10) + 2.5 * max(second - 30, 0),
+                              "cadence": 80, "heart_rate": 140})
+    generator.save_fit_file()
+
+    assert generator.build_summary()["duration"] == 19  # Moving time: 0-10 s and 30-39 s
+    fit = fitparse.FitFile(generator.filename, check_crc=True)
+    events = [(m.get_value("event_type"), m.get_value("timer_trigger")) for m in fit.get_messages("event")]
+    laps = [m.get_values() for m in fit.get_messages("lap")]
+
+    assert events == [("start", "manual"), ("stop_all", "auto"), ("start", "auto"), ("stop_all", "manual")]
+    assert [lap["total_timer_time"] for lap in laps] == [10.0, 9.0]
+    assert [lap["total_distance"] for lap in laps] == [25.0, 22.5]
+    assert [lap["lap_trigger"] for lap in laps] == ["fitness_equipment", "session_end"]
+    assert len(list(fit.get_messages("record"))) == 21
+
+def test_split_laps_and_session_messages(tmp_path):
+    """Test that per-km splits are written as laps and the session totals as a session message."""
+    generator = FitFileGenerator(filename=str(tmp_path / "workout.fit"), archive_dir=None, journal_dir=None,
+                                 lap_mode="splits")
+    generator.records = [{"timestamp": 1760000000 + t, "speed": 3.0, "distance": 3.0 * t, "cadence": 84,
+                          "heart_rate": 150, "incline": 0.0} for t in range(1001)]
+    generator.save_fit_file()
+
+    fit = fitparse.FitFile(generator.filename, check_crc=True)
+    laps = [m.get_values() for m in fit.get_messages("lap")]
+    session = next(fit.get_messages("session")).get_values()
+
+    assert [lap["total_distance"] for lap in laps] == [1000.0, 1000.0, 1000.0]
+    assert laps[0]["total_timer_time"] == pytest.approx(333.333, abs=0.001)
+    assert [lap["lap_trigger"] for lap in laps] == ["distance", "distance", "session_end"]
+    assert session["total_distance"] == 3000.0 and session["total_timer_time"] == 1000.0
+    assert session["num_laps"] == 3 and session["avg_heart_rate"] == 150
+    assert len(list(fit.get_messages("activity"))) == 1
@@ -1,7 +1,9 @@
 import asyncio
 import pytest
 from unittest.mock import MagicMock
-from heartrate_service import GarminHRMService
+from clock import VirtualClock
+import struct
+from heartrate_service import GarminHRMService, parse_heart_rate_measurement, parse_rsc_measurement
 
 @pytest.mark.asyncio
 async def test_hrm_parsing_heart_rate():
@@ -35,19 +37,50 @@ async def test_hrm_parsing_cadence():
     cadence_callback_mock.assert_called_once_with(cadence_value)
     hr_callback_mock.assert_not_called()
 
+def test_rsc_parsing_all_fields():
+    """Test decoding of speed, cadence, stride length, total distance and the running bit."""
+    data = struct.pack("<BHBHI", 0x07, 3 * 256 + 64, 170, 106, 123456)
+    measurement = parse_rsc_measurement(data)
+    assert measurement.speed == pytest.approx(3.25)
+    assert measurement.cadence == 170
+    assert measurement.stride_length == pytest.approx(1.06)
+    assert measurement.total_distance == pytest.approx(12345.6)
+    assert measurement.running is True
+
+    # Total distance without stride length sits right after the cadence
+    measurement = parse_rsc_measurement(memoryview(struct.pack("<BHBI", 0x02, 512, 160, 50)))
+    assert measurement.stride_length is None and measurement.total_distance == pytest.approx(5.0)
+    assert measurement.running is False
+
+    with pytest.raises(struct.error):
+        parse_rsc_measurement(struct.pack("<BHB", 0x03, 512, 160))  # Fields announced but missing
+
+def test_rsc_handler_passes_the_full_measurement():
+    """Test that the RSC handler reports cadence and hands the decoded measurement to rsc_callback."""
+    cadence_callback_mock = MagicMock()
+    rsc_callback_mock = MagicMock()
+    service = GarminHRMService(cadence_callback=cadence_callback_mock, rsc_callback=rsc_callback_mock)
+
+    service.cadence_handler(0, bytearray(struct.pack("<BHBHI", 0x03, 768, 172, 98, 1000)))
+
+    cadence_callback_mock.assert_called_once_with(172)
+    measurement = rsc_callback_mock.call_args.args[0]
+    assert measurement.stride_length == pytest.approx(0.98) and measurement.total_distance == pytest.approx(100.0)
+
 @pytest.mark.asyncio
 async def test_mock_hrm_data():
     """Test HRM mock data generation."""
     hr_callback_mock = MagicMock()
     cadence_callback_mock = MagicMock()
-    service = GarminHRMService(hr_callback=hr_callback_mock, cadence_callback=cadence_callback_mock)
+    clock = VirtualClock()
+    service = GarminHRMService(hr_callback=hr_callback_mock, cadence_callback=cadence_callback_mock, clock=clock)
 
-    # Run the mock HRM data generator for 2 seconds
+    # Run the mock HRM data generator for 2 simulated seconds
     mock_task = asyncio.create_task(service.mock_hrm_data())
-    await asyncio.sleep(2)
+    await clock.run(until=2)
     mock_task.cancel()
 
-    assert hr_callback_mock.call_count > 0
+    assert hr_callback_mock.call_count == 3  # Updates at t = 0, 1 and 2 s
     assert cadence_callback_mock.call_count > 0
 
     hr_callback_mock.assert_called_with(pytest.approx(117, abs=10))
@@ -62,3 +95,37 @@ async def test_hrm_reconnection():
     service.on_disconnect(None)
 
     disconnect_mock.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_hrm_parsing_uint16_heart_rate_and_rr_intervals():
+    """Test decoding of 16-bit HR, energy expended and RR intervals."""
+    hr_callback_mock = MagicMock()
+    rr_callback_mock = MagicMock()
+    service = GarminHRMService(hr_callback=hr_callback_mock, rr_callback=rr_callback_mock)
+
+    # Flags: UINT16 HR (bit 0), contact supported + detected (bits 1-2), energy (bit 3), RR (bit 4)
+    data = bytes([0b00011111]) + (260).to_bytes(2, "little") + (42).to_bytes(2, "little") \
+        + (1024).to_bytes(2, "little") + (512).to_bytes(2, "little")
+
+    service.hr_handler(0, data)
+
+    hr_callback_mock.assert_called_once_with(260)
+    rr_callback_mock.assert_called_once_with((1000, 500))
+
+def test_parse_heart_rate_measurement_fields():
+    """Test the full Heart Rate Measurement decoder."""
+    data = bytearray([0b00011000, 72]) + (15).to_bytes(2, "little") + (845).to_bytes(2, "little")
+    measurement = parse_heart_rate_measurement(memoryview(data))
+
+    assert measurement.heart_rate == 72
+    assert measurement.sensor_contact is None
+    assert measurement.energy_expended == 15
+    assert measurement.rr_intervals == (825,)  # 845/1024 s rounded to ms
+
+def test_parse_heart_rate_measurement_without_rr():
+    """Test that RR intervals are empty when the flag is not set."""
+    measurement = parse_heart_rate_measurement(bytes([0b00000110, 150]))
+
+    assert measurement.heart_rate == 150
+    assert measurement.sensor_contact is True
+    assert measurement.rr_intervals == ()
@@ -0,0 +1,56 @@
+import math
+import numpy as np
+import pytest
+from hrv_analyzer import HRVAnalyzer, rolling_hrv
+
+def brute_force_hrv(rr, valid):
+    """Reference RMSSD/SDNN over a window slice."""
+    accepted = [r for r, v in zip(rr, valid) if v]
+    diffs = [(rr[i] - rr[i - 1]) ** 2 for i in range(1, len(rr)) if valid[i] and valid[i - 1]]
+    rmssd = math.sqrt(sum(diffs) / len(diffs)) if diffs else None
+    sdnn = float(np.std(accepted, ddof=1)) if len(accepted) >= 2 else None
+    return rmssd, sdnn
+
+def test_streaming_matches_brute_force():
+    """Test that the O(1) rolling sums match a full recomputation of the window."""
+    rng = np.random.default_rng(1)
+    rr = (800 + rng.normal(0, 40, 500)).astype(int)
+    rr[[50, 51, 200, 350]] = [400, 1300, 2500, 100]  # Ectopic pair and out-of-range beats
+
+    analyzer = HRVAnalyzer(window=30)
+    valid_flags = []
+    for i, value in enumerate(rr):
+        analyzer.add_rr(value)
+        valid_flags.append(bool(analyzer.valid[i % 30]))
+        start = max(0, i - 29)
+        window_valid = valid_flags[start:i + 1]
+        expected_rmssd, expected_sdnn = brute_force_hrv(list(rr[start:i + 1]), window_valid)
+        assert analyzer.rmssd == pytest.approx(expected_rmssd)
+        assert analyzer.sdnn == pytest.approx(expected_sdnn)
+
+    rejected = {i for i, valid in enumerate(valid_flags) if not valid}
+    assert {50, 51, 52, 200, 350} <= rejected
+    assert analyzer.artifact_count == len(rejected)
+
+def test_vectorized_matches_streaming():
+    """Test that the NumPy replay path agrees with the streaming analyzer."""
+    rng = np.random.default_rng(2)
+    rr = (700 + rng.normal(0, 60, 2000)).astype(int)
+    rr[::97] = 250  # Inject artifacts
+
+    rmssd, sdnn, valid = rolling_hrv(rr, window=60)
+    analyzer = HRVAnalyzer(window=60)
+    for i, value in enumerate(rr):
+        analyzer.add_rr(value)
+        assert analyzer.rmssd == pytest.approx(rmssd[i], nan_ok=True) if analyzer.rmssd is not None else math.isnan(rmssd[i])
+        assert analyzer.sdnn == pytest.approx(sdnn[i]) if analyzer.sdnn is not None else math.isnan(sdnn[i])
+
+    assert analyzer.artifact_count == int((~valid).sum())
+
+def test_artifact_rejection_does_not_lock_out_step_changes():
+    """Test that a genuine HR step only rejects the beat at the step."""
+    analyzer = HRVAnalyzer(window=10)
+    analyzer.add_rr_intervals([1000] * 5 + [600] * 5)
+
+    assert analyzer.artifact_count == 1
+    assert analyzer.snapshot()["artifact_ratio"] == pytest.approx(0.1)
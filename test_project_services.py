@@ -1,8 +1,12 @@
 import pytest
 import asyncio
+import threading
+import time
 from unittest.mock import MagicMock, patch
+import service_manager
 from service_manager import start_services, stop_services, update_hrm_data, update_stride_cadence, update_treadmill_data
-from data_processor import compute_metrics
+from clock import VirtualClock
+from data_processor import compute_metrics, add_sensor_distance, reset_metrics
 from workout_image_generator import generate_workout_image
 
 @pytest.mark.asyncio
@@ -28,6 +32,65 @@ async def test_compute_metrics():
     assert "stride_count" in result
     assert "elevation_gain" in result
 
+def test_sensor_distance_replaces_the_stride_estimate():
+    """Test that strides come from the RSC sensor's distance / stride length while it reports, and from cadence after."""
+    clock = VirtualClock(start=1000.0)
+    sensor_data = {"speed": 3.0, "cadence": 170, "incline": 0.0, "heart_rate": 150}
+    try:
+        reset_metrics(clock)
+        for total in (100.0, 101.0, 102.0, 103.0):
+            add_sensor_distance(total, 1.0, clock, use_distance=False)
+            clock.now += 1
+        add_sensor_distance(50.0, 1.0, clock, use_distance=False)  # Sensor reset: new baseline
+        add_sensor_distance(52.0, 0.5, clock, use_distance=False)
+        metrics = compute_metrics(sensor_data, clock)
+        assert metrics["stride_count"] == pytest.approx(3 + 4)  # Nothing estimated from cadence
+        assert metrics["distance"] == pytest.approx(3.0 * 4)  # Distance still follows the belt
+
+        clock.now += 10  # Sensor silent past RSC_SENSOR_TIMEOUT_S: back to the cadence estimate
+        metrics = compute_metrics(sensor_data, clock)
+        assert metrics["stride_count"] == pytest.approx(7 + 170 / 60 * 10)
+    finally:
+        reset_metrics()
+
+def test_sensor_distance_can_drive_the_distance_field():
+    """Test that use_distance broadcasts the sensor's distance, and that nothing is counted while paused."""
+    clock = VirtualClock(start=1000.0)
+    try:
+        reset_metrics(clock)
+        add_sensor_distance(10.0, 1.0, clock, use_distance=True)
+        clock.now += 1
+        add_sensor_distance(12.5, 1.0, clock, use_distance=True)
+        add_sensor_distance(20.0, 1.0, clock, moving=False, use_distance=True)
+        metrics = compute_metrics({"speed": 3.0, "cadence": 170}, clock)
+        assert metrics["distance"] == pytest.approx(2.5)
+        assert metrics["stride_count"] == pytest.approx(2.5)
+    finally:
+        reset_metrics()
+
+def test_sensor_strides_and_metrics_from_two_threads():
+    """Test that concurrent RSC updates and ANT+ metric builds neither lose strides nor move them backwards."""
+    clock = VirtualClock(start=1000.0)
+    done = threading.Event()
+    seen = []
+
+    def build_pages():
+        while not done.is_set():
+            seen.append(compute_metrics({"speed": 3.0, "cadence": 170}, clock)["stride_count"])
+
+    try:
+        reset_metrics(clock)
+        builder = threading.Thread(target=build_pages)
+        builder.start()
+        for total in range(20001):
+            add_sensor_distance(float(total), 1.0, clock, use_distance=False)
+        done.set()
+        builder.join()
+        assert compute_metrics({"speed": 3.0, "cadence": 170}, clock)["stride_count"] == pytest.approx(20000)
+        assert all(a <= b for a, b in zip(seen, seen[1:]))
+    finally:
+        reset_metrics()
+
 @pytest.mark.asyncio
 async def test_generate_workout_image():
     """Test workout summary image generation."""
@@ -35,3 +98,26 @@ async def test_generate_workout_image():
     with patch("matplotlib.pyplot.savefig") as mock_save:
         generate_workout_image(workout_summary)
         mock_save.assert_called
+
+def test_stop_services_is_bounded_by_io():
+    """Test that shutdown cancels the mock BLE services and finishes well under the old 2 s sleep."""
+    with patch("service_manager.fit_generator") as fit_mock:
+        start_services()
+        threads = [service.thread for service in service_manager.services.values()]
+        time.sleep(0.2)  # Let the mock services deliver data
+
+        elapsed = stop_services(timeout=1.0)
+
+    assert elapsed < 0.5
+    assert not any(thread.is_alive() for thread in threads)
+    fit_mock.end_workout.assert_called_once()
+    # The FIT file is written before the slow summary image render
+    finalize = [call[0] for call in fit_mock.method_calls if call[0] in ("end_workout", "write_summary_image")]
+    assert finalize == ["end_workout", "write_summary_image"]
+
+def test_disconnect_during_shutdown_does_not_respawn():
+    """Test that disconnect callbacks fired by shutdown do not start new services."""
+    with patch("service_manager.run_garmin_hrm_service") as hrm_mock, patch("service_manager.fit_generator"):
+        stop_services(timeout=0.1)
+        service_manager.on_hrm_disconnected()
+    hrm_mock.assert_not_called()
@@ -0,0 +1,125 @@
+import os
+import threading
+from unittest.mock import patch
+import fitparse
+from clock import VirtualClock
+from fit_generator import FitFileGenerator, recover_unfinished_sessions
+from sample_journal import SampleJournal, read_journal, find_unfinished_journals, HEADER, RECORD
+
+RECORD_DATA = {"timestamp": 1760000000, "speed": 2.5, "distance": 10.0, "cadence": 82, "heart_rate": 140, "incline": 1.5}
+
+def test_journal_round_trip(tmp_path):
+    """Test that appended samples are read back intact."""
+    journal = SampleJournal(str(tmp_path / "a.journal"), 1760000000, fsync_interval=0.01)
+    for i in range(3):
+        journal.append(dict(RECORD_DATA, timestamp=1760000000 + i, distance=10.0 * i))
+    journal.close()
+
+    start_time, records, timer_events = read_journal(journal.path)
+    assert start_time == 1760000000 and timer_events == []
+    assert [r["distance"] for r in records] == [0.0, 10.0, 20.0]
+    assert records[0]["heart_rate"] == 140 and records[0]["incline"] == 1.5
+
+def test_journal_ignores_torn_tail(tmp_path):
+    """Test that a partially written last record (power loss mid-write) is dropped."""
+    journal = SampleJournal(str(tmp_path / "a.journal"), 1760000000)
+    journal.append(RECORD_DATA)
+    journal.append(RECORD_DATA)
+    journal.close()
+
+    with open(journal.path, "r+b") as f:
+        f.truncate(HEADER.size + RECORD.size + 5)
+
+    assert len(read_journal(journal.path)[1]) == 1
+
+def test_group_commit_runs_in_background(tmp_path):
+    """Test that fsync happens on the interval and not per append."""
+    journal = SampleJournal(str(tmp_path / "a.journal"), 1760000000, fsync_interval=3600)
+    with patch("sample_journal.os.fsync") as fsync_mock:
+        for _ in range(100):
+            journal.append(RECORD_DATA)
+        fsync_mock.assert_not_called()
+        journal.close()
+        fsync_mock.assert_called_once()
+
+def test_generator_journals_completed_seconds(tmp_path):
+    """Test that records are resampled to 1 Hz and sealed seconds reach the journal."""
+    clock = VirtualClock(start=100.0)
+    generator = FitFileGenerator(filename=str(tmp_path / "w.fit"), archive_dir=None, journal_dir=str(tmp_path), clock=clock)
+    sensor = {"speed": 2.5, "cadence": 80, "heart_rate": 120, "incline": 1.0, "distance": 0.0}
+    for now, distance in ((100.1, 1.0), (100.6, 2.0), (101.2, 3.0), (102.0, 4.0)):
+        clock.now = now
+        generator.add_record(dict(sensor, distance=distance))
+
+    assert [r["distance"] for r in generator.records] == [2.0, 3.0, 4.0]
+    generator.journal.close()
+    assert [r["distance"] for r in read_journal(generator.journal.path)[1]] == [2.0, 3.0]
+
+def test_generator_resamples_from_two_threads(tmp_path):
+    """Test that HRM and FTMS updates racing on the same seconds still give one record and one journal entry per second."""
+    clock = VirtualClock(start=100.0)
+    generator = FitFileGenerator(filename=str(tmp_path / "w.fit"), archive_dir=None, journal_dir=str(tmp_path), clock=clock)
+    sensor = {"speed": 2.5, "cadence": 80, "heart_rate": 120, "incline": 1.0, "distance": 0.0}
+    barrier = threading.Barrier(2)
+
+    def notify(source):
+        barrier.wait()
+        for step in range(4000):
+            if source == "ftms":
+                clock.now = 100.0 + step / 20
+            generator.add_record(dict(sensor, distance=float(step)))
+
+    threads = [threading.Thread(target=notify, args=(source,)) for source in ("hrm", "ftms")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    seconds = [r["timestamp"] for r in generator.records]
+    assert seconds == sorted(set(seconds))
+    generator.journal.close()
+    journaled = [r["timestamp"] for r in read_journal(generator.journal.path)[1]]
+    assert journaled == seconds[:-1]
+
+def test_recover_unfinished_sessions(tmp_path):
+    """Test that an abandoned journal is turned into a FIT file and summary image on startup."""
+    journal_dir = tmp_path / "journal"
+    journal_dir.mkdir()
+    journal = SampleJournal(str(journal_dir / "session_20251009_085320.journal"), 1760000000)
+    for i in range(60):
+        journal.append(dict(RECORD_DATA, timestamp=1760000000 + i, distance=2.5 * i))
+    journal.close()  # Closed but never finalized, like a killed process
+
+    recovered = recover_unfinished_sessions(str(journal_dir), str(tmp_path), archive_dir=str(tmp_path / "sessions"))
+
+    assert recovered == [str(tmp_path / "recovered_session_20251009_085320.fit")]
+    assert os.path.exists(tmp_path / "recovered_session_20251009_085320.png")
+    assert find_unfinished_journals(str(journal_dir)) == []
+    assert len(os.listdir(tmp_path / "sessions")) == 1  # Archived for the session history
+    records = list(fitparse.FitFile(recovered[0]).get_messages("record"))
+    assert len(records) == 60
+
+def test_auto_pause_survives_a_crash(tmp_path):
+    """Test that a recovered session keeps the live pause: dropped belt-stopped seconds and the stop/start pair."""
+    journal_dir = tmp_path / "journal"
+    clock = VirtualClock(start=1760000000)
+    generator = FitFileGenerator(filename=str(tmp_path / "w.fit"), archive_dir=None, journal_dir=str(journal_dir), clock=clock)
+    for second in range(80):
+        clock.now = 1760000000 + second
+        if second == 28:
+            generator.pause(1760000025)  # Belt stopped at t=25, detected 3 s later
+        elif second == 50:
+            generator.resume()
+        generator.add_record(dict(RECORD_DATA, distance=2.5 * second))
+    generator.journal.close()  # Killed: the journal is never finalized
+
+    recovered = FitFileGenerator.from_journal(generator.journal.path, str(tmp_path / "r.fit"), archive_dir=None)
+    live = [r["timestamp"] for r in generator.records]
+    assert [r["timestamp"] for r in recovered.records] == live[:-1]  # The last second was still open
+    assert recovered.timer_events == generator.timer_events == [(1760000025, "stop"), (1760000050, "start")]
+    assert recovered.timer_segments() == [(1760000000, 1760000025), (1760000050, 1760000078)]
+
+    recover_unfinished_sessions(str(journal_dir), str(tmp_path), archive_dir=None)
+    fit = fitparse.FitFile(str(tmp_path / ("recovered_" + os.path.basename(generator.journal.path)[:-8] + ".fit")))
+    events = [m.get_value("event_type") for m in fit.get_messages("event") if m.get_value("event") == "timer"]
+    assert events == ["start", "stop_all", "start", "stop_all"]
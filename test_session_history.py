@@ -0,0 +1,101 @@
+import os
+from unittest.mock import patch
+import pytest
+from fit_encoder import FitEncoder
+from session_history import SessionIndex, main, parse_distance
+
+START = 1760000000  # 2025-10-09 08:53:20 UTC
+
+def write_session(path, start, speed_mps, seconds, heart_rate=150):
+    """Writes a constant-speed FIT session with one record per second."""
+    with open(path, "wb") as f:
+        encoder = FitEncoder(f)
+        encoder.start_file()
+        encoder.write_file_id(time_created=start)
+        for i in range(seconds + 1):
+            encoder.write_record({
+                "timestamp": start + i, "speed": speed_mps, "distance": speed_mps * i,
+                "cadence": 80, "heart_rate": heart_rate,
+            })
+        encoder.finish_file()
+
+@pytest.fixture
+def history(tmp_path):
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    write_session(sessions / "a.fit", START, 10 / 3.6, 1900, heart_rate=140)  # 10 km/h, ~5.3 km
+    write_session(sessions / "b.fit", START + 7 * 86400, 12 / 3.6, 1600, heart_rate=165)  # 12 km/h, ~5.3 km
+    index = SessionIndex(str(tmp_path / "history.sqlite"))
+    yield index, sessions
+    index.close()
+
+def test_scan_is_incremental(history):
+    """Test that a rescan only touches new or changed files."""
+    index, sessions = history
+    assert index.scan(str(sessions), workers=2)["indexed"] == 2
+
+    with patch("session_history.file_sha256") as hash_mock:
+        stats = index.scan(str(sessions), workers=2)
+    assert stats["skipped"] == 2 and stats["indexed"] == 0
+    hash_mock.assert_not_called()
+
+    # Renamed file: hashed again but not re-parsed
+    os.rename(sessions / "b.fit", sessions / "c.fit")
+    stats = index.scan(str(sessions), workers=2)
+    assert stats["relinked"] == 1 and stats["removed"] == 1 and stats["indexed"] == 0
+
+    os.remove(sessions / "a.fit")
+    assert index.scan(str(sessions))["removed"] == 1
+    assert len(index.weekly_distance()) == 1
+
+def test_rewritten_file_replaces_its_session(history):
+    """Test that a file rewritten at the same path (e.g. regenerated by batch_export) is not counted twice."""
+    index, sessions = history
+    index.scan(str(sessions), workers=1)
+
+    write_session(sessions / "a.fit", START, 10 / 3.6, 1000, heart_rate=140)
+    os.utime(sessions / "a.fit", ns=(1, 1))  # Make sure size/mtime change even on coarse filesystem clocks
+    assert index.scan(str(sessions), workers=1)["indexed"] == 1
+
+    assert index.db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 2
+    assert index.db.execute("SELECT COUNT(DISTINCT sha256) FROM samples").fetchone()[0] == 2
+    assert index.weekly_distance()[0][1:] == (pytest.approx(1000 * 10 / 3.6, rel=1e-3), 1)
+
+def test_iso_weeks():
+    """Test that weeks follow ISO 8601 numbering, where a Sunday belongs to the week that started on Monday."""
+    index = SessionIndex(":memory:")
+    sunday, monday = 1735430400, 1735516800  # 2024-12-29 (ISO 2024-W52) and 2024-12-30 (ISO 2025-W01)
+    for n, start_time in enumerate((sunday, monday)):
+        index.db.execute("INSERT INTO sessions VALUES (?, ?, 0, 1000, NULL, NULL, NULL, NULL, NULL, 1)", (str(n), start_time))
+    assert [week for week, _, _ in index.weekly_distance()] == ["2024-W52", "2025-W01"]
+    index.close()
+
+def test_history_queries(history):
+    """Test weekly distance, PR and average HR at speed queries."""
+    index, sessions = history
+    index.scan(str(sessions), workers=1)
+
+    weeks = index.weekly_distance()
+    assert len(weeks) == 2
+    assert weeks[0][1] == pytest.approx(1900 * 10 / 3.6, rel=1e-3)
+
+    time_s, start_time = index.personal_record(5000)
+    assert time_s == pytest.approx(5000 / (12 / 3.6), abs=1.5)
+    assert start_time == START + 7 * 86400
+
+    avg_hr, count = index.avg_heart_rate_at_speed(10)
+    assert avg_hr == pytest.approx(140)
+    assert count > 0
+
+def test_cli_queries(history, capsys):
+    """Test the command line front end."""
+    index, sessions = history
+    db_path = index.db.execute("PRAGMA database_list").fetchone()[2]
+    main(["--db", db_path, "scan", str(sessions), "--workers", "1"])
+    main(["--db", db_path, "pr", "5k"])
+    assert "PR 5000 m: 25:00" in capsys.readouterr().out
+
+def test_parse_distance():
+    assert parse_distance("5k") == 5000
+    assert parse_distance("1.5km") == 1500
+    assert parse_distance("400") == 400
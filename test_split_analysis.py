@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from split_analysis import compute_splits, moving_time, SPLIT_DISTANCES_M
+
+def make_series(speed, heart_rate=150.0, cadence=170.0, incline=1.0, moving=None):
+    """One sample per second at the given speeds (m/s)."""
+    speed = np.asarray(speed, dtype=np.float64)
+    n = len(speed)
+    time = np.arange(n, dtype=np.float64)
+    return {
+        "time": time,
+        "moving_time": time if moving is None else moving,
+        "distance": np.concatenate(([0.0], np.cumsum(speed[1:]))),
+        "heart_rate": np.broadcast_to(heart_rate, n).astype(np.float64),
+        "cadence": np.broadcast_to(cadence, n).astype(np.float64),
+        "incline": np.broadcast_to(incline, n).astype(np.float64),
+    }
+
+def reference_split_times(series, split_m):
+    """Crossing times found by walking the samples one by one."""
+    times, mark = [], split_m
+    distance, time = series["distance"], series["time"]
+    for i in range(1, len(distance)):
+        while distance[i] >= mark:
+            times.append(time[i - 1] + (mark - distance[i - 1]) / (distance[i] - distance[i - 1]) * (time[i] - time[i - 1]))
+            mark += split_m
+    return times
+
+def test_constant_pace_splits_interpolate_crossings():
+    """Test split boundaries between samples, per-split averages and the partial last split."""
+    splits = compute_splits(make_series(np.full(3601, 3.0)), SPLIT_DISTANCES_M["km"])
+
+    assert splits["end_time"][:3] == pytest.approx([1000 / 3, 2000 / 3, 1000.0])
+    assert splits["distance"][-1] == pytest.approx(800.0)  # 10.8 km in total
+    assert splits["avg_speed"] == pytest.approx(np.full(11, 3.0))
+    assert splits["avg_heart_rate"] == pytest.approx(np.full(11, 150.0))
+    assert splits["climb"][0] == pytest.approx(10.0)  # 1% of 1 km
+
+def test_variable_pace_matches_sample_by_sample_reference():
+    """Test the vectorized crossings against a straightforward loop, for km and mile splits."""
+    rng = np.random.default_rng(7)
+    series = make_series(rng.uniform(1.5, 4.5, 20000))
+    for unit, split_m in SPLIT_DISTANCES_M.items():
+        splits = compute_splits(series, split_m)
+        assert splits["end_time"][:-1] == pytest.approx(reference_split_times(series, split_m)), unit
+
+def test_pauses_count_as_elapsed_but_not_timer_time():
+    """Test that an auto-pause inside a split adds elapsed time only."""
+    timestamps = np.concatenate((np.arange(0, 201), np.arange(500, 701))).astype(np.float64)
+    moving = moving_time(timestamps, [(0, 200), (500, 700)])
+    assert moving[200] == moving[201] == 200
+
+    speed = np.full(len(timestamps), 4.0)
+    speed[201] = 0.0  # The first sample after the pause adds no distance
+    series = make_series(speed, moving=moving)
+    series["time"] = timestamps
+    splits = compute_splits(series, 1000.0)
+
+    assert splits["timer_time"][0] == pytest.approx(250.0)
+    assert splits["elapsed_time"][0] == pytest.approx(550.0)
+    assert splits["avg_speed"][0] == pytest.approx(4.0)
+
+def test_missing_sensor_samples_are_left_out_of_averages():
+    """Test that 0 HR (no strap) does not drag the split average down, and a split without HR is NaN."""
+    heart_rate = np.where(np.arange(1001) < 500, 0.0, 160.0)
+    splits = compute_splits(make_series(np.full(1001, 1.0), heart_rate=heart_rate), 250.0)
+    assert np.isnan(splits["avg_heart_rate"][0])
+    assert splits["avg_heart_rate"][2:] == pytest.approx([160.0, 160.0])
@@ -0,0 +1,82 @@
+import socket
+import time
+import pytest
+from telemetry_protocol import PacketEncoder, decode_packet, HEADER, RECORD, MAGIC, VERSION
+from telemetry_exporter import TelemetryExporter
+
+SNAPSHOT = {"speed": 3.05, "heart_rate": 152, "cadence": 84, "distance": 1234.56, "incline": -1.5,
+            "rmssd": 32.4, "stride_count": 70001}
+
+def test_round_trip_preserves_lane_values():
+    """Test that a decoded lane matches the snapshot within wire resolution."""
+    header, lanes = decode_packet(PacketEncoder().encode({7: SNAPSHOT}, 41, 1700000000123)[0])
+
+    assert header == (VERSION, 41, 1700000000123)
+    lane = lanes[0]
+    assert lane.lane_id == 7 and lane.heart_rate == 152 and lane.cadence == 84
+    assert lane.speed == pytest.approx(3.05) and lane.distance == pytest.approx(1234.56)
+    assert lane.incline == -1.5 and lane.rmssd == pytest.approx(32.4)
+    assert lane.stride_count == 70001 & 0xFFFF
+
+def test_missing_values_decode_as_none():
+    """Test that an unconnected HRM and unknown HRV are flagged rather than sent as zeros."""
+    _, lanes = decode_packet(PacketEncoder().encode({1: {"speed": 2.0}}, 0, 0)[0])
+    assert lanes[0].heart_rate is None and lanes[0].rmssd is None
+
+def test_lanes_are_batched_into_fixed_size_datagrams():
+    """Test batching: every datagram is header + n fixed-size records with consecutive sequence numbers."""
+    packets = PacketEncoder(lanes_per_packet=4).encode({lane: SNAPSHOT for lane in range(10)}, 0xFFFFFFFF, 0)
+
+    assert [len(p) for p in packets] == [HEADER.size + n * RECORD.size for n in (4, 4, 2)]
+    decoded = [decode_packet(p) for p in packets]
+    assert [h.sequence for h, _ in decoded] == [0xFFFFFFFF, 0, 1]
+    assert [lane.lane_id for _, lanes in decoded for lane in lanes] == list(range(10))
+
+def test_decoder_skips_fields_appended_by_newer_senders():
+    """Test that the record size from the header is used as the stride."""
+    record = RECORD.pack(3, 1, 2500, 140, 80, 100, 5, 0xFFFF, 9) + b"\xAA\xBB"
+    packet = HEADER.pack(MAGIC, VERSION + 1, len(record), 2, 5, 0) + record * 2
+    _, lanes = decode_packet(packet)
+    assert [lane.lane_id for lane in lanes] == [3, 3]
+    assert lanes[1].speed == 2.5
+
+def test_decoder_rejects_foreign_and_truncated_datagrams():
+    """Test that unrelated or cut-off datagrams raise ValueError."""
+    packet = PacketEncoder().encode({1: SNAPSHOT}, 0, 0)[0]
+    with pytest.raises(ValueError):
+        decode_packet(b"XXXX" + packet[4:])
+    with pytest.raises(ValueError):
+        decode_packet(packet[:-1])
+
+def test_exporter_sends_snapshots_at_its_rate():
+    """Test the exporter end to end over loopback UDP."""
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2)
+    exporter = TelemetryExporter(lambda: {1: SNAPSHOT}, group="127.0.0.1", port=receiver.getsockname()[1],
+                                 rate_hz=50).start()
+    try:
+        sequences = [decode_packet(receiver.recv(2048))[0].sequence for _ in range(5)]
+    finally:
+        exporter.stop()
+        receiver.close()
+
+    assert sequences == list(range(sequences[0], sequences[0] + 5))
+    assert exporter.stats["errors"] == 0
+
+def test_exporter_does_not_burst_after_a_stall():
+    """Test that a stalled source delays the schedule instead of being followed by back-to-back catch-up sends."""
+    sent = []
+
+    def source():
+        sent.append(time.monotonic())
+        if len(sent) == 2:
+            time.sleep(0.3)  # Stall of 15 intervals
+        return {}
+
+    exporter = TelemetryExporter(source, group="127.0.0.1", port=9, rate_hz=50).start()
+    time.sleep(0.5)
+    exporter.stop()
+
+    resumed = sent[2]
+    assert sum(resumed <= t < resumed + 0.1 for t in sent) <= 6  # 50 Hz after the stall, not 15 catch-up sends first
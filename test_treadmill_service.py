@@ -1,6 +1,7 @@
 import asyncio
 import pytest
 from unittest.mock import MagicMock
+from clock import VirtualClock
 from treadmill_service import TreadmillService
 
 @pytest.mark.asyncio
@@ -82,13 +83,14 @@ async def test_ftms_parsing_full_packet():
 async def test_mock_ftms_data():
     """Test FTMS mock treadmill data."""
     callback_mock = MagicMock()
-    service = TreadmillService(callback=callback_mock)
+    clock = VirtualClock()
+    service = TreadmillService(callback=callback_mock, clock=clock)
 
     mock_task = asyncio.create_task(service.mock_ftms_data())
-    await asyncio.sleep(2)
+    await clock.run(until=1.5)
     mock_task.cancel()
 
-    assert callback_mock.call_count > 0
+    assert callback_mock.call_count == 2  # Updates at t = 0 and 1 s
 
     # Mock should return stable, consistent values (no need for approx)
     callback_mock.assert_called_with(
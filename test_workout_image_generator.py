@@ -0,0 +1,64 @@
+import numpy as np
+from fit_generator import FitFileGenerator
+from workout_image_generator import lttb, generate_workout_image
+
+def lttb_reference(x, y, threshold):
+    """Straightforward per-bucket LTTB, as in the original paper."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n - 1)
+        if i == threshold - 3:
+            end, avg_x, avg_y = n - 1, x[-1], y[-1]
+        else:
+            avg_x, avg_y = np.mean(x[next_start:next_end]), np.mean(y[next_start:next_end])
+        areas = [abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) for j in range(start, end)]
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+    selected.append(n - 1)
+    return x[selected], y[selected]
+
+def test_lttb_matches_reference_implementation():
+    """Test the vectorized LTTB against a plain loop implementation."""
+    rng = np.random.default_rng(3)
+    x = np.arange(5003, dtype=float)
+    y = np.cumsum(rng.normal(size=len(x)))
+    for threshold in (3, 10, 777, 1800):
+        fast_x, fast_y = lttb(x, y, threshold)
+        ref_x, ref_y = lttb_reference(x, y, threshold)
+        assert len(fast_x) == threshold
+        np.testing.assert_array_equal(fast_x, ref_x)
+        np.testing.assert_array_equal(fast_y, ref_y)
+
+def test_lttb_keeps_endpoints_and_spikes():
+    """Test that the first/last points and an isolated spike survive downsampling."""
+    x = np.arange(10000, dtype=float)
+    y = np.full(len(x), 140.0)
+    y[6543] = 185.0
+    out_x, out_y = lttb(x, y, 100)
+    assert out_x[0] == 0 and out_x[-1] == 9999
+    assert 185.0 in out_y
+
+def test_lttb_returns_short_series_unchanged():
+    """Test that series not longer than the threshold are not resampled."""
+    x, y = np.arange(5.0), np.arange(5.0)
+    out_x, out_y = lttb(x, y, 10)
+    np.testing.assert_array_equal(out_x, x)
+
+def test_summary_image_with_charts(tmp_path):
+    """Test rendering a summary with chart panels from recorded samples."""
+    generator = FitFileGenerator(filename=str(tmp_path / "w.fit"), archive_dir=None, journal_dir=None)
+    generator.records = [
+        {"timestamp": 1000 + t, "speed": 2.8, "distance": 2.8 * t, "cadence": 82 if t > 5 else 0,
+         "heart_rate": 120 + t % 40, "incline": 1.0}
+        for t in range(3600)
+    ]
+    summary = generator.build_summary()
+    assert summary["series"]["time"][-1] == 3599
+    assert len(summary["splits"]["km"]["distance"]) == 11  # 10 full km and a partial split, drawn as pace bars
+
+    output = generate_workout_image(summary, output_path=str(tmp_path / "summary.png"), dpi=50)
+    assert (tmp_path / "summary.png").stat().st_size > 0
+    assert output.endswith("summary.png")
@@ -1,21 +1,72 @@
 import asyncio
 import threading
 from bleak import BleakClient, BleakError
+from clock import system_clock
 from logger_config import logger
-from config import BLE_TREADMILL_SENSOR_ADDRESS, MOCK_FTMS
+from config import BLE_TREADMILL_SENSOR_ADDRESS, MOCK_FTMS, BLE_STOP_TIMEOUT_S
+
+# Fitness Machine Status (0x2ADA) op codes
+MACHINE_RESET = 0x01
+MACHINE_STOPPED_OR_PAUSED = 0x02  # Parameter: 0x01 stop, 0x02 pause
+MACHINE_STOPPED_BY_SAFETY_KEY = 0x03
+MACHINE_STARTED_OR_RESUMED = 0x04
+
+# Training Status (0x2AD3) values that mean nobody is running
+TRAINING_STATUS_IDLE = {0x01: "idle", 0x0E: "pre-workout", 0x0F: "post-workout"}
+
+def parse_machine_status(data):
+    """
+    Decodes a Fitness Machine Status (0x2ADA) notification into a belt event.
+    :return: (running, reason): running is True for a start/resume, False for a stop, pause or reset,
+             None for events that do not change the belt state (e.g. target speed changed).
+    """
+    if not data:
+        return None, "empty machine status"
+    op_code = data[0]
+    if op_code == MACHINE_STOPPED_OR_PAUSED:
+        return False, "treadmill paused" if len(data) > 1 and data[1] == 0x02 else "treadmill stopped"
+    if op_code == MACHINE_STOPPED_BY_SAFETY_KEY:
+        return False, "safety key pulled"
+    if op_code == MACHINE_RESET:
+        return False, "treadmill reset"
+    if op_code == MACHINE_STARTED_OR_RESUMED:
+        return True, "treadmill started"
+    return None, f"machine status 0x{op_code:02X}"
+
+def parse_training_status(data):
+    """
+    Decodes a Training Status (0x2AD3) notification (flags byte, status byte) into a belt event.
+    :return: (running, reason): running is False for idle, pre- and post-workout, otherwise None.
+    """
+    if len(data) < 2:
+        return None, "short training status"
+    status = data[1]
+    if status in TRAINING_STATUS_IDLE:
+        return False, f"training status {TRAINING_STATUS_IDLE[status]}"
+    return None, f"training status 0x{status:02X}"
 
 class TreadmillService:
     """Fetches treadmill speed, incline, and other metrics from BLE FTMS service OR returns mock data."""
 
     FTMS_UUID = "00002acd-0000-1000-8000-00805f9b34fb"  # FTMS UUID
+    MACHINE_STATUS_UUID = "00002ada-0000-1000-8000-00805f9b34fb"  # Fitness Machine Status UUID
+    TRAINING_STATUS_UUID = "00002ad3-0000-1000-8000-00805f9b34fb"  # Training Status UUID
 
-    def __init__(self, callback=None, disconnect_callback=None, connection_event=None):
+    def __init__(self, callback=None, disconnect_callback=None, connection_event=None, clock=system_clock, status_callback=None):
         self.ble_address = BLE_TREADMILL_SENSOR_ADDRESS
         self.callback = callback
+        self.status_callback = status_callback  # status_callback(running, reason) for belt start/stop events
         self.disconnect_callback = disconnect_callback
         self.connection_event = connection_event
+        self.clock = clock  # Paces the mock; a VirtualClock replays sessions faster than real time
         self.client = None
 
+        # Lifecycle (set once the service runs in its own event loop)
+        self.loop = None
+        self.task = None
+        self.thread = None
+        self.stopping = False
+
         # Store last known values for combining messages
         self.last_speed_mps = 0.0
         self.last_incline = 0.0
@@ -28,12 +79,48 @@ class TreadmillService:
         self.energy_per_minute = 0
 
     async def connect_and_listen(self):
-        """Continuously tries to connect to BLE treadmill and listens for updates OR mocks data."""
-        if MOCK_FTMS:
-            logger.info("🟢 FTMS Mocking Enabled - Simulating BLE Treadmill Data")
-            await self.mock_ftms_data()
-        else:
-            await self.real_ftms_data()
+        """Continuously tries to connect to BLE treadmill and listens for updates OR mocks data, until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        if self.stopping:
+            return
+
+        try:
+            if MOCK_FTMS:
+                logger.info("🟢 FTMS Mocking Enabled - Simulating BLE Treadmill Data")
+                await self.mock_ftms_data()
+            else:
+                await self.real_ftms_data()
+        except asyncio.CancelledError:
+            logger.info("🛑 FTMS Treadmill service stopped")
+
+    def stop(self):
+        """Stops the service from any thread. Cancelling the task unsubscribes and disconnects the BLE client."""
+        self.stopping = True
+        if self.loop and self.task:
+            try:
+                self.loop.call_soon_threadsafe(self.task.cancel)
+            except RuntimeError:
+                pass  # Event loop already finished
+
+    async def stop_notifications(self, client, uuids):
+        """Unsubscribes from FTMS notifications, bounded by BLE_STOP_TIMEOUT_S."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(client.stop_notify(uuid) for uuid in uuids)), BLE_STOP_TIMEOUT_S)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not stop FTMS notifications: {e}")
+
+    async def start_status_notifications(self, client):
+        """Subscribes to Machine Status and Training Status where the treadmill has them (both are optional in FTMS)."""
+        subscribed = []
+        for uuid, handler in ((self.MACHINE_STATUS_UUID, self.machine_status_handler),
+                              (self.TRAINING_STATUS_UUID, self.training_status_handler)):
+            try:
+                await client.start_notify(uuid, handler)
+                subscribed.append(uuid)
+            except Exception as e:
+                logger.info(f"ℹ️ FTMS status characteristic {uuid[4:8]} not available: {e}")
+        return subscribed
 
     async def real_ftms_data(self):
         """Handles real FTMS BLE communication."""
@@ -49,9 +136,13 @@ class TreadmillService:
                         self.connection_event.set()  # Notify service_manager that connection is established
 
                     await client.start_notify(self.FTMS_UUID, self.notification_handler)
+                    subscribed = [self.FTMS_UUID] + await self.start_status_notifications(client)
 
-                    while True:
-                        await asyncio.sleep(1)
+                    try:
+                        while True:
+                            await asyncio.sleep(1)
+                    finally:
+                        await self.stop_notifications(client, subscribed)
 
             except Exception as e:
                 logger.error(f"❌ BLE FTMS connection error: {e}. Retrying in 10 sec...")
@@ -142,8 +233,23 @@ class TreadmillService:
             logger.error(f"❌ Error processing FTMS data: {e}")
 
 
+    def machine_status_handler(self, sender, data):
+        """Handles Fitness Machine Status notifications (belt started, stopped, paused)."""
+        self._status_event(*parse_machine_status(data))
+
+    def training_status_handler(self, sender, data):
+        """Handles Training Status notifications (idle, pre- and post-workout)."""
+        self._status_event(*parse_training_status(data))
+
+    def _status_event(self, running, reason):
+        logger.debug(f"🔍 FTMS status: {reason}")
+        if running is not None and self.status_callback:
+            self.status_callback(running, reason)
+
     def on_disconnect(self, client):
         """Handles BLE disconnection."""
+        if self.stopping:
+            return  # Disconnect requested by stop()
         logger.warning(f"⚠️ FTMS Treadmill Disconnected! Reconnecting...")
         if self.disconnect_callback:
             self.disconnect_callback()
@@ -176,10 +282,11 @@ class TreadmillService:
                 f"Energy/minute: {self.energy_per_minute} kcal/min"
             )
 
-            await asyncio.sleep(1)  # Simulate FTMS update every second
+            await self.clock.sleep(1)  # Simulate FTMS update every second
 
-def run_treadmill_service(callback, disconnect_callback, connection_event):
-    """Starts the FTMS treadmill BLE service in a separate thread OR runs a mock."""
-    treadmill_service = TreadmillService(callback, disconnect_callback, connection_event)
-    thread = threading.Thread(target=asyncio.run, args=(treadmill_service.connect_and_listen(),), daemon=True)
-    thread.start()
+def run_treadmill_service(callback, disconnect_callback, connection_event, status_callback=None):
+    """Starts the FTMS treadmill BLE service in a separate thread OR runs a mock. Returns the service (see stop())."""
+    treadmill_service = TreadmillService(callback, disconnect_callback, connection_event, status_callback=status_callback)
+    treadmill_service.thread = threading.Thread(target=asyncio.run, args=(treadmill_service.connect_and_listen(),), name="ftms-service", daemon=True)
+    treadmill_service.thread.start()
+    return treadmill_service
@@ -1,13 +1,136 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 from datetime import datetime
 from logger_config import logger
+from split_analysis import SPLIT_DISTANCES_M
+from config import HR_MAX_BPM, HR_ZONES, HR_ZONE_COLORS, SPLIT_UNIT
 
-def generate_workout_image(workout_summary, output_path="workout_summary.png"):
+# Chart panels: (series key, label, color, scale applied to the raw value)
+CHART_PANELS = (
+    ("heart_rate", "HR (BPM)", "#E74C3C", 1),
+    ("speed", "Speed (km/h)", "#3498DB", 3.6),
+    ("incline", "Incline (%)", "#2ECC71", 1),
+    ("cadence", "Cadence (SPM)", "#F1C40F", 1),
+)
+
+def lttb(x, y, threshold):
+    """
+    Downsamples a series with Largest-Triangle-Three-Buckets, keeping its visual shape.
+    Bucket bounds, next-bucket averages and the candidate matrix are computed with NumPy; only the
+    per-bucket argmax, which depends on the point picked in the previous bucket, runs in a loop.
+    :param x: Increasing 1-D array of x values.
+    :param y: 1-D array of y values (no NaN).
+    :param threshold: Number of points to keep (>= 3).
+    :return: (x, y) arrays of at most `threshold` points, including the first and last point.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Middle points split into threshold - 2 buckets; the first and last points are always kept
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average of each following bucket (the last bucket looks at the final point)
+    counts = ends - starts
+    avg_x = np.append(np.add.reduceat(x[:-1], starts)[1:] / counts[1:], x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], starts)[1:] / counts[1:], y[-1])
+
+    # Candidates of every bucket as padded rows; padding points at the bucket's first point
+    offsets = np.arange(counts.max())
+    index = starts[:, None] + offsets
+    index = np.where(offsets < counts[:, None], index, starts[:, None])
+    cand_x, cand_y = x[index], y[index]
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev_x, prev_y = x[0], y[0]
+    for i in range(threshold - 2):
+        # Twice the triangle area (previous pick, candidate, next-bucket average), up to sign
+        area = np.abs((prev_x - avg_x[i]) * (cand_y[i] - prev_y) - (prev_x - cand_x[i]) * (avg_y[i] - prev_y))
+        best = area.argmax()
+        selected[i + 1] = index[i, best]
+        prev_x, prev_y = cand_x[i, best], cand_y[i, best]
+
+    return x[selected], y[selected]
+
+def draw_hr_zones(ax, max_hr=HR_MAX_BPM):
+    """Shades the heart rate zones (fractions of max_hr from HR_ZONES) as horizontal bands."""
+    for zone, (low, high) in enumerate(zip(HR_ZONES, HR_ZONES[1:])):
+        ax.axhspan(low * max_hr, high * max_hr, color=HR_ZONE_COLORS[zone], alpha=0.18, linewidth=0)
+        ax.text(1.0, (low + high) / 2 * max_hr, f" Z{zone + 1}", transform=ax.get_yaxis_transform(),
+                va="center", fontsize=6, color=HR_ZONE_COLORS[zone])
+
+def draw_charts(fig, axes, series):
+    """
+    Plots the session series, each downsampled to the pixel width of its panel.
+    :param series: Dictionary of equal-length arrays: "time" (s since start) and the CHART_PANELS keys.
+    """
+    time_min = np.asarray(series["time"], dtype=np.float64) / 60
+    for ax, (key, label, color, scale) in zip(axes, CHART_PANELS):
+        values = np.asarray(series.get(key, ()), dtype=np.float64) * scale
+        ax.set_facecolor('#3E3E3E')
+        ax.tick_params(colors="white", labelsize=7)
+        ax.set_ylabel(label, color="white", fontsize=8)
+        for spine in ax.spines.values():
+            spine.set_color("#777777")
+
+        if len(values) != len(time_min):
+            continue
+        present = values > 0 if key in ("heart_rate", "cadence") else np.isfinite(values)  # 0 = sensor not connected
+        pixels = int(ax.get_position().width * fig.get_figwidth() * fig.dpi)
+        ax.plot(*lttb(time_min[present], values[present], max(pixels, 3)), color=color, linewidth=0.8)
+
+        if key == "heart_rate":
+            draw_hr_zones(ax)
+            low = min(values[present].min(), HR_ZONES[0] * HR_MAX_BPM) if present.any() else HR_ZONES[0] * HR_MAX_BPM
+            ax.set_ylim(low - 5, HR_MAX_BPM + 5)
+
+    axes[-1].set_xlabel("Time (min)", color="white", fontsize=8)
+
+def draw_splits(ax, splits, unit=SPLIT_UNIT, max_hr=HR_MAX_BPM):
+    """
+    Plots the pace of each split as a bar colored by its average HR zone; a partial last split gets a narrower bar.
+    :param splits: Per-split arrays from split_analysis.compute_splits.
+    """
+    length = SPLIT_DISTANCES_M[unit]
+    fraction = splits["distance"] / length
+    left = np.concatenate(([0.0], np.cumsum(fraction)[:-1]))
+    with np.errstate(divide="ignore"):
+        pace_min = np.where(splits["avg_speed"] > 0, length / splits["avg_speed"] / 60, 0.0)
+    hr = splits["avg_heart_rate"]
+    zones = np.clip(np.searchsorted(HR_ZONES, np.nan_to_num(hr) / max_hr, side="right") - 1, 0, len(HR_ZONE_COLORS) - 1)
+    colors = [HR_ZONE_COLORS[zone] if np.isfinite(value) else "#95A5A6" for zone, value in zip(zones, hr)]
+
+    ax.set_facecolor('#3E3E3E')
+    ax.tick_params(colors="white", labelsize=7)
+    for spine in ax.spines.values():
+        spine.set_color("#777777")
+    ax.bar(left, pace_min, width=fraction * 0.9, align="edge", color=colors)
+    if len(pace_min) <= 25:
+        for x, width, pace in zip(left, fraction, pace_min):
+            if pace > 0:
+                ax.text(x + width * 0.45, pace, f"{int(pace)}:{int(pace % 1 * 60):02d}", ha="center", va="bottom", fontsize=5, color="white")
+
+    moving = pace_min[pace_min > 0]
+    if len(moving):
+        ax.set_ylim(0, min(moving.max(), 3 * np.median(moving)) * 1.2)  # Keep a near-standstill split from flattening the rest
+    ax.set_ylabel(f"Pace (min/{unit})", color="white", fontsize=8)
+    ax.set_xlabel(f"Split ({unit}), colored by avg HR zone", color="white", fontsize=8)
+
+def generate_workout_image(workout_summary, output_path="workout_summary.png", dpi=300):
     """
     Generates a workout summary image.
-    :param workout_summary: Dictionary with workout stats (distance, time, HR, cadence, incline, elevation).
+    :param workout_summary: Dictionary with workout stats (distance, time, HR, cadence, incline, elevation;
+                            None incline/elevation are shown as unavailable),
+                            optionally "series" (see draw_charts) for full-session chart panels
+                            and "splits" ({unit: split arrays}) for the SPLIT_UNIT pace panel.
     :param output_path: Path to save the generated image.
+    :param dpi: Output resolution; charts are downsampled to the resulting pixel width.
     """
     logger.info("🎨 Generating workout summary image...")
 
@@ -18,9 +141,22 @@ def generate_workout_image(workout_summary, output_path="workout_summary.png"):
     avg_cadence = workout_summary.get("avg_cadence", 0)
     avg_incline = workout_summary.get("avg_incline", 0)
     total_elevation = workout_summary.get("total_elevation", 0)
+    series = workout_summary.get("series")
+    splits = (workout_summary.get("splits") or {}).get(SPLIT_UNIT)
+    splits = splits if splits and len(splits["distance"]) else None
 
-    # Create a figure
-    fig, ax = plt.subplots(figsize=(6, 4))
+    # Create a figure: the text summary on top, one chart panel per series below, then the split paces
+    if series is not None and len(series.get("time", ())) > 1:
+        ratios = [4] + [1.4] * len(CHART_PANELS) + ([1.8] if splits is not None else [])
+        fig, axes = plt.subplots(len(ratios), 1, figsize=(6, sum(ratios)), dpi=dpi, gridspec_kw={"height_ratios": ratios, "hspace": 0.35})
+        ax, chart_axes = axes[0], axes[1:1 + len(CHART_PANELS)]
+        splits_ax = axes[-1] if splits is not None else None
+        for chart_ax in chart_axes[:-1]:
+            chart_ax.sharex(chart_axes[-1])
+            chart_ax.tick_params(labelbottom=False)
+    else:
+        fig, ax = plt.subplots(figsize=(6, 4), dpi=dpi)
+        chart_axes = splits_ax = None
     fig.patch.set_facecolor('#2E2E2E')  # Background color
     ax.set_facecolor('#3E3E3E')
 
@@ -31,8 +167,8 @@ def generate_workout_image(workout_summary, output_path="workout_summary.png"):
         f"⏳ Duration: {duration_min:.1f} min",
         f"❤️ Avg HR: {avg_hr} BPM",
         f"🏃 Cadence: {avg_cadence} SPM",
-        f"📈 Avg Incline: {avg_incline}%",
-        f"⛰️ Elevation Gain: {total_elevation:.2f} m"
+        f"📈 Avg Incline: {avg_incline}%" if avg_incline is not None else "📈 Avg Incline: n/a",
+        f"⛰️ Elevation Gain: {total_elevation:.2f} m" if total_elevation is not None else "⛰️ Elevation Gain: n/a"
     ]
 
     ax.text(0.5, 0.85, title, fontsize=14, fontweight='bold', ha='center', color="white")
@@ -43,9 +179,14 @@ def generate_workout_image(workout_summary, output_path="workout_summary.png"):
     ax.set_yticks([])
     ax.set_frame_on(False)
 
+    if chart_axes is not None:
+        draw_charts(fig, chart_axes, series)
+    if splits_ax is not None:
+        draw_splits(splits_ax, splits)
+
     # Save the image
-    plt.savefig(output_path, dpi=300, bbox_inches="tight", facecolor=fig.get_facecolor())
-    plt.close()
+    plt.savefig(output_path, dpi=dpi, bbox_inches="tight", facecolor=fig.get_facecolor())
+    plt.close(fig)
 
     logger.info(f"✅ Workout summary image saved: {output_path}")
 